@@ -1,17 +1,36 @@
 from flask import Flask
 from flask_login import LoginManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from models import db, Business
 from config import Config
+from json_provider import FastJSONProvider
+from cache import result_cache
+from jobs import job_runner
+from ratelimit import rate_limiter
+from tenants import tenant_cache
+from principals import principal_cache
+from columnar import columnar_cache
+from ingest import ingest_queue
 from auth import auth_bp
 from feedback_routes import feedback_bp
 from dashboard_routes import dashboard_bp
+from migrations import run_migrations
 import os
 
 app = Flask(__name__)
 app.config.from_object(Config)
+app.json = FastJSONProvider(app)
+if app.config["PROXY_COUNT"]:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_COUNT"])
 
 # Initialize extensions
 db.init_app(app)
+result_cache.init_app(app)
+job_runner.init_app(app)
+rate_limiter.init_app(app)
+tenant_cache.init_app(app)
+principal_cache.init_app(app)
+columnar_cache.init_app(app)
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "auth.login"
@@ -19,7 +38,7 @@ login_manager.login_view = "auth.login"
 
 @login_manager.user_loader
 def load_user(user_id):
-    return Business.query.get(int(user_id))
+    return principal_cache.load_user(user_id)
 
 
 # Register blueprints
@@ -36,6 +55,9 @@ def init_db():
         db.create_all()
         print("✓ Database tables created")
 
+        # Bring existing tables up to date
+        run_migrations()
+
         # Create default business account if none exists
         if Business.query.count() == 0:
             default_business = Business(
@@ -61,5 +83,8 @@ def init_db():
 # Initialize database when app starts
 init_db()
 
+# Start the write-behind ingestion queue once the tables exist
+ingest_queue.init_app(app)
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
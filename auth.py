@@ -1,10 +1,30 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import (
+    Blueprint,
+    render_template,
+    request,
+    redirect,
+    url_for,
+    flash,
+    current_app,
+)
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, Business
+from ratelimit import rate_limiter, client_ip, wait_minutes
+from tenants import tenant_cache
 
 auth_bp = Blueprint("auth", __name__)
 
 
+def login_limits(email):
+    """Failed-login buckets: per IP and account, and per IP overall"""
+    attempts = current_app.config["LOGIN_ATTEMPTS"]
+    window = current_app.config["LOGIN_WINDOW_MINUTES"] * 60
+    return [
+        (f"login:{client_ip()}:{email.lower()}", attempts, window),
+        (f"login-ip:{client_ip()}", attempts * 4, window),
+    ]
+
+
 @auth_bp.route("/login", methods=["GET", "POST"])
 def login():
     """Business login page and handler"""
@@ -20,9 +40,23 @@ def login():
             flash("Please provide both email and password", "error")
             return render_template("dashboard/login.html")
 
+        # Every attempt spends up front, so parallel guesses cannot all pass
+        # the check; a successful login gives its tokens back
+        limits = login_limits(email)
+        retry_after = rate_limiter.acquire(limits)
+        if retry_after:
+            flash(
+                "Too many failed login attempts. Please try again in "
+                f"{wait_minutes(retry_after)} minute(s)",
+                "error",
+            )
+            return render_template("dashboard/login.html"), 429
+
         business = Business.query.filter_by(email=email).first()
 
         if business and business.check_password(password):
+            rate_limiter.reset(limits[0][0])
+            rate_limiter.refund(limits[1:])
             login_user(business, remember=bool(remember))
 
             # Redirect to next page or dashboard
@@ -86,6 +120,7 @@ def register():
         try:
             db.session.add(business)
             db.session.commit()
+            tenant_cache.invalidate()
             flash("Account created successfully! Please login.", "success")
             return redirect(url_for("auth.login"))
         except Exception as e:
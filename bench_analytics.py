@@ -0,0 +1,124 @@
+"""
+Benchmark /dashboard/api/analytics per section at growing table sizes
+
+Usage: python bench_analytics.py [sizes] [repeats]
+       ANALYTICS_ENGINE=columnar python bench_analytics.py ...
+
+sizes is a comma-separated list of feedback row counts (default
+10000,100000,1000000), spread over the last two years. For each size it
+prints the median time to compute every section at once and each section on
+its own (fields=...), for the 30-day and all-time periods. With the
+columnar engine it also prints how long the first request took to load the
+snapshot.
+
+Runs against a throwaway SQLite file (or BENCH_DATABASE_URL), never the
+configured database.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+workdir = tempfile.mkdtemp(prefix="feedback-bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", "sqlite:///" + os.path.join(workdir, "bench.db")
+)
+os.environ["JOB_DIR"] = os.path.join(workdir, "jobs")
+
+from app import app  # noqa: E402
+from models import db, Business, Feedback  # noqa: E402
+import rollup  # noqa: E402
+import stats  # noqa: E402
+import columnar  # noqa: E402
+
+
+def seed(business_id, count, rng, now, chunk=50000):
+    """Add count random feedback rows from the last two years"""
+
+    def rating():
+        return rng.choice([None, 1, 2, 3, 4, 5])
+
+    for offset in range(0, count, chunk):
+        db.session.bulk_insert_mappings(
+            Feedback,
+            [
+                dict(
+                    business_id=business_id,
+                    timestamp=now - timedelta(seconds=rng.randint(0, 730 * 86400)),
+                    overall_rating=rng.choice([1, 2, 3]),
+                    food_rating=rating(),
+                    service_rating=rating(),
+                    staff_rating=rating(),
+                    cleanliness_rating=rating(),
+                    value_rating=rating(),
+                    nps_score=rng.choice([None] + list(range(11))),
+                    comment=rng.choice([None, "Great coffee", "Slow service", "ok"]),
+                    reviewed=rng.random() < 0.3,
+                )
+                for _ in range(min(chunk, count - offset))
+            ],
+        )
+        db.session.commit()
+
+
+def engine():
+    if app.config["ANALYTICS_ENGINE"] == "columnar":
+        return columnar.analytics
+    return stats.analytics
+
+
+def timed(business_id, period, fields, repeats):
+    analytics = engine()
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        analytics(business_id, period, fields=fields)
+        samples.append(time.perf_counter() - started)
+        db.session.rollback()
+    return statistics.median(samples) * 1000
+
+
+def main():
+    sizes = [
+        int(s)
+        for s in (sys.argv[1] if len(sys.argv) > 1 else "10000,100000,1000000").split(
+            ","
+        )
+    ]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(1)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        business_id = Business.query.order_by(Business.id).first().id
+        Feedback.query.delete()
+        db.session.commit()
+
+        rows = 0
+        sections = [("all fields", stats.ANALYTICS_FIELDS)] + [
+            (field, [field]) for field in stats.ANALYTICS_FIELDS
+        ]
+        for size in sorted(sizes):
+            started = time.perf_counter()
+            seed(business_id, size - rows, rng, now)
+            rollup.rebuild(business_id)
+            rows = size
+            print(f"\n{rows:,} rows (seeded in {time.perf_counter() - started:.1f}s)")
+            if app.config["ANALYTICS_ENGINE"] == "columnar":
+                started = time.perf_counter()
+                columnar.columnar_cache.get(business_id)
+                loaded = time.perf_counter() - started
+                print(f"  snapshot loaded in {loaded * 1000:.0f}ms")
+            print(f"  {'section':<18} {'30 days':>10} {'all time':>10}")
+            for label, fields in sections:
+                month = timed(business_id, "30", fields, repeats)
+                all_time = timed(business_id, "all", fields, repeats)
+                print(f"  {label:<18} {month:>8.1f}ms {all_time:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
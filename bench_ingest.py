@@ -0,0 +1,77 @@
+"""
+Benchmark feedback submissions per second, synchronous vs write-behind queue
+
+Usage: python bench_ingest.py [submissions] [threads]
+
+Runs against a throwaway SQLite file (or BENCH_DATABASE_URL), never the
+configured database.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+workdir = tempfile.mkdtemp(prefix="feedback-bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", "sqlite:///" + os.path.join(workdir, "bench.db")
+)
+os.environ["JOB_DIR"] = os.path.join(workdir, "jobs")
+os.environ["FEEDBACK_INGEST_SPILL"] = os.path.join(workdir, "spill.ndjson")
+os.environ["FEEDBACK_INGEST_MODE"] = "sync"
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+from app import app  # noqa: E402
+from models import db, Feedback  # noqa: E402
+from ingest import ingest_queue  # noqa: E402
+
+
+def submit(i):
+    client = app.test_client()
+    response = client.post(
+        "/api/feedback",
+        json={
+            "overall_rating": i % 3 + 1,
+            "food_rating": i % 5 + 1,
+            "nps_score": i % 11,
+            "comment": f"benchmark {i}",
+        },
+    )
+    return response.status_code
+
+
+def run(label, count, threads):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        codes = list(pool.map(submit, range(count)))
+    accepted = time.perf_counter() - started
+
+    if ingest_queue.enabled:
+        ingest_queue.stop()
+    written = time.perf_counter() - started
+
+    print(
+        f"{label:<6} {count / accepted:>9.0f} accepted/s {count / written:>9.0f} "
+        f"written/s  statuses={sorted(set(codes))}"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+    with app.app_context():
+        Feedback.query.delete()
+        db.session.commit()
+
+    run("sync", count, threads)
+    ingest_queue.start(app.config["FEEDBACK_INGEST_QUEUE_SIZE"])
+    run("queue", count, threads)
+
+    with app.app_context():
+        print(f"rows written: {Feedback.query.count()} (expected {2 * count})")
+
+
+if __name__ == "__main__":
+    main()
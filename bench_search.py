@@ -0,0 +1,116 @@
+"""
+Benchmark comment search (/dashboard/api/feedback?q=...)
+
+Usage: python bench_search.py [rows] [repeats]
+
+Seeds rows feedback entries (default 1000000) with generated comments of 3
+to 25 words drawn from a Zipf-like vocabulary, so terms range from very
+common to rare, then prints the median response time of the search endpoint
+for a mix of queries. The "matches" column is the number of comments each
+query finds.
+
+Runs against a throwaway SQLite file (or BENCH_DATABASE_URL), never the
+configured database.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+workdir = tempfile.mkdtemp(prefix="feedback-bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", "sqlite:///" + os.path.join(workdir, "bench.db")
+)
+os.environ["JOB_DIR"] = os.path.join(workdir, "jobs")
+
+from app import app  # noqa: E402
+from models import db, Business, Feedback  # noqa: E402
+
+# Most frequent first; the rest of the vocabulary is made-up words
+COMMON_WORDS = (
+    "the was and very great food service coffee staff good friendly slow "
+    "waiter table clean price cold lovely music terrace breakfast dessert"
+).split()
+QUERIES = [
+    ("common word", {"q": "coffee"}),
+    ("two common words", {"q": "great service"}),
+    ("mid-frequency", {"q": "terrace"}),
+    ("rare word", {"q": "zorvath"}),
+    ("prefix", {"q": "breakf"}),
+    ("+ rating filter", {"q": "coffee", "filter": 1}),
+    ("+ newest sort", {"q": "coffee", "sort": "newest"}),
+    ("newest, page 50", {"q": "coffee", "sort": "newest", "page": 50}),
+]
+
+
+def vocabulary(rng, size=20000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = list(COMMON_WORDS)
+    while len(words) < size:
+        words.append("".join(rng.choice(letters) for _ in range(rng.randint(4, 9))))
+    words[5000] = "zorvath"
+    return words
+
+
+def seed(business_id, count, rng, now, chunk=50000):
+    words = vocabulary(rng)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    for offset in range(0, count, chunk):
+        size = min(chunk, count - offset)
+        lengths = [rng.randint(3, 25) for _ in range(size)]
+        drawn = iter(rng.choices(words, weights, k=sum(lengths)))
+        db.session.bulk_insert_mappings(
+            Feedback,
+            [
+                dict(
+                    business_id=business_id,
+                    timestamp=now - timedelta(seconds=rng.randint(0, 730 * 86400)),
+                    overall_rating=rng.choice([1, 2, 3]),
+                    comment=" ".join(next(drawn) for _ in range(length))[:200],
+                    reviewed=rng.random() < 0.3,
+                )
+                for length in lengths
+            ],
+        )
+        db.session.commit()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+
+    with app.app_context():
+        business = Business.query.order_by(Business.id).first()
+        Feedback.query.delete()
+        db.session.commit()
+        started = time.perf_counter()
+        seed(business.id, size, random.Random(1), datetime.utcnow())
+        seeded = time.perf_counter() - started
+        email = business.email
+
+    client = app.test_client()
+    client.post("/login", data={"email": email, "password": "admin123"})
+
+    print(f"{size:,} comments (seeded and indexed in {seeded:.1f}s)")
+    print(f"  {'query':<20} {'matches':>9} {'median':>9}")
+    for label, params in QUERIES:
+        total = client.get(
+            "/dashboard/api/feedback", query_string=params
+        ).get_json()["total"]
+        samples = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            response = client.get("/dashboard/api/feedback", query_string=params)
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200
+        print(
+            f"  {label:<20} {total:>9,} {statistics.median(samples) * 1000:>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
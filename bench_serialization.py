@@ -0,0 +1,122 @@
+"""
+Benchmark feedback listing and JSON export serialization
+
+Usage: python bench_serialization.py [rows] [repeats]
+
+Compares the ORM path (hydrated Feedback instances, to_dict(), Flask's
+stdlib JSON provider) with the tuple path the endpoints use (EXPORT_COLUMNS
+rows, exports.row_dict(), FastJSONProvider) for a 100-row page and a full
+JSON export of rows feedback entries (default 100000). For each it prints
+the median time end to end (query + serialization) and per row for the
+serialization step alone.
+
+Runs against a throwaway SQLite file (or BENCH_DATABASE_URL), never the
+configured database.
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+workdir = tempfile.mkdtemp(prefix="feedback-bench-")
+os.environ["DATABASE_URL"] = os.environ.get(
+    "BENCH_DATABASE_URL", "sqlite:///" + os.path.join(workdir, "bench.db")
+)
+os.environ["JOB_DIR"] = os.path.join(workdir, "jobs")
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app import app  # noqa: E402
+from bench_analytics import seed  # noqa: E402
+from models import db, Business, Feedback  # noqa: E402
+import exports  # noqa: E402
+import json_provider  # noqa: E402
+
+PAGE_SIZE = 100
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+        db.session.rollback()
+    return statistics.median(samples) * 1000
+
+
+def orm_rows(business_id, limit):
+    query = Feedback.query.filter_by(business_id=business_id).order_by(
+        Feedback.timestamp.desc()
+    )
+    return query.limit(limit).all() if limit else query.all()
+
+
+def tuple_rows(business_id, limit):
+    stmt = (
+        select(*exports.EXPORT_COLUMNS)
+        .where(Feedback.business_id == business_id)
+        .order_by(Feedback.timestamp.desc())
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.session.execute(stmt).all()
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    stdlib = DefaultJSONProvider(app)
+    fast = json_provider.FastJSONProvider(app)
+
+    def orm_serialize(rows):
+        return stdlib.response({"feedback": [f.to_dict() for f in rows]})
+
+    def tuple_serialize(rows):
+        return fast.response({"feedback": [exports.row_dict(row) for row in rows]})
+
+    with app.app_context():
+        business_id = Business.query.order_by(Business.id).first().id
+        Feedback.query.delete()
+        db.session.commit()
+        seed(business_id, size, random.Random(1), datetime.utcnow())
+
+        encoder = "orjson" if json_provider.orjson else "stdlib fallback"
+        print(f"{size:,} rows, FastJSONProvider using {encoder}")
+        print(
+            f"  {'':<12} {'ORM + to_dict':>16} {'tuples + fast':>16} {'speedup':>8}"
+        )
+        for label, limit in (("page of 100", PAGE_SIZE), ("JSON export", None)):
+            rows_out = limit or size
+            orm_total = median_ms(
+                lambda: orm_serialize(orm_rows(business_id, limit)), repeats
+            )
+            tuple_total = median_ms(
+                lambda: tuple_serialize(tuple_rows(business_id, limit)), repeats
+            )
+            print(
+                f"  {label:<12} {orm_total:>14.1f}ms {tuple_total:>14.1f}ms"
+                f" {orm_total / tuple_total:>7.1f}x"
+            )
+
+            # Serialization alone, on rows fetched up front
+            instances = orm_rows(business_id, limit)
+            # Detached, so the rollbacks between runs do not expire them
+            db.session.expunge_all()
+            tuples = tuple_rows(business_id, limit)
+            orm_row = median_ms(lambda: orm_serialize(instances), repeats)
+            tuple_row = median_ms(lambda: tuple_serialize(tuples), repeats)
+            print(
+                f"  {'  per row':<12} {orm_row * 1000 / rows_out:>14.2f}us"
+                f" {tuple_row * 1000 / rows_out:>14.2f}us"
+                f" {orm_row / tuple_row:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
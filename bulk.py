@@ -0,0 +1,146 @@
+"""
+Bulk review and delete
+
+A bulk request selects feedback either by id or by filter:
+
+    {"ids": [12, 15, 19]}
+    {"filter": {"rating": 1, "from": "2024-05-01", "to": "2024-05-31",
+                "reviewed": false}}
+
+Filters combine with AND; from/to are inclusive UTC dates. Whatever the
+scope, the change is a single UPDATE or DELETE limited to the business, and
+the affected rows come back through RETURNING so the daily rollup can be
+adjusted in the same transaction, one statement per affected day.
+"""
+
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import delete, select, update
+
+from models import db, Feedback
+import rollup
+
+MAX_IDS = 1000
+
+feedback_table = Feedback.__table__
+
+
+class BulkError(ValueError):
+    pass
+
+
+def _ids(value):
+    if not isinstance(value, list) or not value:
+        raise BulkError("ids must be a non-empty list")
+    if len(value) > MAX_IDS:
+        raise BulkError(f"At most {MAX_IDS} ids per request")
+    if any(isinstance(i, bool) or not isinstance(i, int) for i in value):
+        raise BulkError("ids must be integers")
+    return [Feedback.id.in_(set(value))]
+
+
+def _day(name, value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise BulkError(f"{name} must be a date (YYYY-MM-DD)") from None
+
+
+def _filter(value):
+    if not isinstance(value, dict) or not value:
+        raise BulkError("filter must be a non-empty object")
+    unknown = set(value) - {"rating", "from", "to", "reviewed"}
+    if unknown:
+        raise BulkError(f"Unknown filter: {', '.join(sorted(unknown))}")
+
+    conditions = []
+    if "rating" in value:
+        if value["rating"] not in (1, 2, 3) or isinstance(value["rating"], bool):
+            raise BulkError("rating must be 1, 2 or 3")
+        conditions.append(Feedback.overall_rating == value["rating"])
+    if "from" in value:
+        start = datetime.combine(_day("from", value["from"]), time.min)
+        conditions.append(Feedback.timestamp >= start)
+    if "to" in value:
+        end = datetime.combine(_day("to", value["to"]) + timedelta(days=1), time.min)
+        conditions.append(Feedback.timestamp < end)
+    if "reviewed" in value:
+        if not isinstance(value["reviewed"], bool):
+            raise BulkError("reviewed must be true or false")
+        # Literal true/false so the partial unreviewed index can match
+        conditions.append(
+            Feedback.reviewed == (db.true() if value["reviewed"] else db.false())
+        )
+    return conditions
+
+
+def parse_scope(data):
+    """
+    WHERE conditions for the feedback a bulk request body selects
+
+    Raises BulkError unless the body has exactly one of ids and filter.
+    """
+    if not isinstance(data, dict) or ("ids" in data) == ("filter" in data):
+        raise BulkError("Send either ids or filter")
+    if "ids" in data:
+        return _ids(data["ids"])
+    return _filter(data["filter"])
+
+
+def _returning(stmt, columns):
+    """Run stmt and return the affected rows' columns"""
+    dialect = db.session.get_bind().dialect
+    supported = dialect.delete_returning if stmt.is_delete else dialect.update_returning
+    if supported:
+        return db.session.execute(stmt.returning(*columns)).all()
+
+    # No RETURNING: read the rows first, then change exactly those. The
+    # requested columns keep their positions; id is appended if missing.
+    extra = [] if any(c is Feedback.id for c in columns) else [Feedback.id]
+    rows = db.session.execute(
+        select(*columns, *extra).where(stmt.whereclause).with_for_update()
+    ).all()
+    ids = [row.id for row in rows]
+    for i in range(0, len(ids), MAX_IDS):
+        db.session.execute(stmt.where(Feedback.id.in_(ids[i : i + MAX_IDS])))
+    return rows
+
+
+def set_reviewed(business_id, conditions, reviewed=True):
+    """
+    Mark the selected feedback reviewed (or unreviewed)
+
+    Only rows whose flag changes are updated and counted. Returns the
+    number of rows changed; the caller commits.
+    """
+    changing = (
+        Feedback.reviewed.isnot(True) if reviewed else Feedback.reviewed == db.true()
+    )
+    stmt = (
+        update(feedback_table)
+        .where(Feedback.business_id == business_id, changing, *conditions)
+        .values(reviewed=reviewed)
+    )
+    rows = _returning(stmt, [Feedback.business_id, Feedback.timestamp])
+    rollup.record_review_changes(rows, reviewed)
+    return len(rows)
+
+
+def delete_rows(business_id, conditions, columns=rollup.ROW_COLUMNS):
+    """
+    Delete the selected feedback and return the deleted rows' columns
+
+    columns must include everything rollup.record_rows() reads. The caller
+    commits.
+    """
+    stmt = delete(feedback_table).where(
+        Feedback.business_id == business_id, *conditions
+    )
+    rows = _returning(stmt, columns)
+    rollup.record_rows(rows, sign=-1)
+    return rows
+
+
+def delete_feedback(business_id, conditions):
+    """Delete the selected feedback. Returns the count; the caller commits."""
+    return len(delete_rows(business_id, conditions))
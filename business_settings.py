@@ -0,0 +1,178 @@
+"""
+Typed per-business settings
+
+Business.settings_json holds only the settings a business has changed.
+parse_settings() turns it into a frozen BusinessSettings with defaults filled
+in; results are memoized by the JSON text, so each stored version is parsed
+once per process. Updates are JSON merge patches (RFC 7396) applied in the
+database, so a save only sends the changed keys and concurrent saves of
+different keys do not overwrite each other.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from sqlalchemy import text
+
+from models import db, CATEGORIES
+
+
+class SettingsError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class BusinessSettings:
+    welcome_message: str = "We'd love to hear from you!"
+    thank_you_message: str = "Your feedback helps us improve"
+    # Rating categories shown on the customer page, in display order
+    categories: Tuple[str, ...] = tuple(CATEGORIES)
+    # None means the app default (FEEDBACK_COOLDOWN_MINUTES)
+    feedback_cooldown_minutes: Optional[int] = None
+
+    def to_dict(self):
+        data = asdict(self)
+        data["categories"] = list(self.categories)
+        return data
+
+
+def _message(value):
+    if not isinstance(value, str) or not value.strip():
+        raise SettingsError("must be a non-empty string")
+    if len(value) > 200:
+        raise SettingsError("must be at most 200 characters")
+    return value.strip()
+
+
+def _categories(value):
+    if not isinstance(value, list) or not value:
+        raise SettingsError("must be a non-empty list")
+    unknown = [c for c in value if c not in CATEGORIES]
+    if unknown:
+        raise SettingsError(f"unknown categories: {', '.join(map(str, unknown))}")
+    return list(dict.fromkeys(value))
+
+
+def _cooldown(value):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise SettingsError("must be a whole number of minutes")
+    if not 0 <= value <= 1440:
+        raise SettingsError("must be between 0 and 1440")
+    return value
+
+
+# field name -> validator returning the cleaned (JSON) value
+SCHEMA = {
+    "welcome_message": _message,
+    "thank_you_message": _message,
+    "categories": _categories,
+    "feedback_cooldown_minutes": _cooldown,
+}
+
+
+@lru_cache(maxsize=1024)
+def parse_settings(settings_json):
+    """
+    BusinessSettings for a stored settings_json value
+
+    Unreadable JSON and invalid values fall back to the defaults rather than
+    breaking the customer page; unknown keys are ignored.
+    """
+    try:
+        stored = json.loads(settings_json or "{}")
+    except ValueError:
+        print(f"Ignoring unreadable business settings: {settings_json[:100]!r}")
+        stored = {}
+    if not isinstance(stored, dict):
+        stored = {}
+
+    values = {}
+    for name, validate in SCHEMA.items():
+        if name not in stored:
+            continue
+        try:
+            values[name] = validate(stored[name])
+        except SettingsError as e:
+            print(f"Ignoring invalid business setting {name}: {e}")
+    if "categories" in values:
+        values["categories"] = tuple(values["categories"])
+    return BusinessSettings(**values)
+
+
+def validate_patch(patch):
+    """
+    Clean a merge patch of settings
+
+    null resets a setting to its default. Raises SettingsError naming the
+    first invalid or unknown setting.
+    """
+    if not isinstance(patch, dict) or not patch:
+        raise SettingsError("Settings patch must be a non-empty object")
+
+    cleaned = {}
+    for name, value in patch.items():
+        if name not in SCHEMA:
+            raise SettingsError(f"Unknown setting: {name}")
+        if value is None:
+            cleaned[name] = None
+            continue
+        try:
+            cleaned[name] = SCHEMA[name](value)
+        except SettingsError as e:
+            raise SettingsError(f"{name} {e}") from e
+    return cleaned
+
+
+def patch_settings(business_id, patch):
+    """
+    Apply a validated merge patch to a business's stored settings
+
+    The merge runs inside the UPDATE statement; the caller commits.
+    """
+    conn = db.session.connection()
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        conn.execute(
+            text(
+                "UPDATE business SET settings_json = json_patch("
+                "CASE WHEN json_valid(settings_json) THEN settings_json "
+                "ELSE '{}' END, :patch) WHERE id = :id"
+            ),
+            {"patch": json.dumps(patch), "id": business_id},
+        )
+    elif dialect == "postgresql":
+        conn.execute(
+            text(
+                "UPDATE business SET settings_json = "
+                "((COALESCE(NULLIF(settings_json, ''), '{}')::jsonb "
+                "|| CAST(:set AS jsonb)) - CAST(:reset AS text[]))::text "
+                "WHERE id = :id"
+            ),
+            {
+                "set": json.dumps({k: v for k, v in patch.items() if v is not None}),
+                "reset": [k for k, v in patch.items() if v is None],
+                "id": business_id,
+            },
+        )
+    else:
+        stored = conn.execute(
+            text("SELECT settings_json FROM business WHERE id = :id"),
+            {"id": business_id},
+        ).scalar()
+        try:
+            merged = json.loads(stored or "{}")
+        except ValueError:
+            merged = {}
+        for name, value in patch.items():
+            if value is None:
+                merged.pop(name, None)
+            else:
+                merged[name] = value
+        conn.execute(
+            text("UPDATE business SET settings_json = :settings WHERE id = :id"),
+            {"settings": json.dumps(merged), "id": business_id},
+        )
@@ -0,0 +1,172 @@
+"""
+Versioned result cache for the statistics endpoints
+
+Cached payloads are keyed by (name, business id, params, data version).
+Writes to a business's feedback bump its data version, so stale entries are
+simply never looked up again and age out of the LRU. Writes that change or
+remove existing rows (deletes, review changes) also bump a separate rewrite
+version, for caches that can apply inserts incrementally (columnar.py).
+Versions live either in process memory or in a small SQLite file shared by
+every worker on the host.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class MemoryVersionStore:
+    """Per-process data versions"""
+
+    def __init__(self):
+        self._versions = {}
+        self._changed = {}
+        self._lock = threading.Lock()
+        # Versions restart at 0 with the process; stamps must not repeat
+        self.generation = uuid.uuid4().hex[:8]
+
+    def get(self, business_id):
+        return self._versions.get(business_id, 0)
+
+    def bump(self, business_id):
+        with self._lock:
+            self._versions[business_id] = self._versions.get(business_id, 0) + 1
+            self._changed[business_id] = time.time()
+
+    def stamp(self, business_id):
+        """(version token, time of the last bump or None) for validators"""
+        with self._lock:
+            version = self._versions.get(business_id, 0)
+            return f"{self.generation}.{version}", self._changed.get(business_id)
+
+
+class SQLiteVersionStore:
+    """Data versions shared between worker processes through a SQLite file"""
+
+    def __init__(self, path, table="data_versions"):
+        self.path = path
+        self.table = table
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(business_id INTEGER PRIMARY KEY, version INTEGER NOT NULL, "
+                "changed_at REAL)"
+            )
+            columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            if "changed_at" not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN changed_at REAL")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, business_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT version FROM {self.table} WHERE business_id = ?",
+                (business_id,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, business_id):
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT INTO {self.table} (business_id, version, changed_at) "
+                "VALUES (?, 1, ?) ON CONFLICT(business_id) DO UPDATE SET "
+                "version = version + 1, changed_at = excluded.changed_at",
+                (business_id, time.time()),
+            )
+
+    def stamp(self, business_id):
+        """(version token, time of the last bump or None) for validators"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT version, changed_at FROM {self.table} WHERE business_id = ?",
+                (business_id,),
+            ).fetchone()
+        return (str(row[0]), row[1]) if row else ("0", None)
+
+
+class ResultCache:
+    """In-process LRU + TTL cache of JSON payloads"""
+
+    def __init__(self, maxsize=256, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = True
+        self.versions = MemoryVersionStore()
+        self.rewrites = MemoryVersionStore()
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("RESULT_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("RESULT_CACHE_TTL", self.ttl)
+        self.enabled = self.maxsize > 0 and self.ttl > 0
+
+        if app.config.get("RESULT_CACHE_BACKEND") == "sqlite":
+            path = app.config.get("RESULT_CACHE_PATH") or os.path.join(
+                app.instance_path, "cache_versions.db"
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.versions = SQLiteVersionStore(path)
+            self.rewrites = SQLiteVersionStore(path, table="rewrite_versions")
+
+    def get_or_compute(self, name, business_id, params, compute):
+        """Return the cached payload for the key, calling compute() on a miss"""
+        if not self.enabled:
+            return compute()
+
+        key = (name, business_id, params, self.versions.get(business_id))
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, business_id, rewrite=False):
+        """
+        Bump the business's data version after its feedback changes
+
+        Pass rewrite=True when existing rows were deleted or changed rather
+        than only new ones inserted.
+        """
+        self.versions.bump(business_id)
+        if rewrite:
+            self.rewrites.bump(business_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "backend": type(self.versions).__name__,
+        }
+
+
+result_cache = ResultCache()
@@ -0,0 +1,13 @@
+from app import app
+import idempotency
+
+
+def cleanup_idempotency_keys():
+    """Delete idempotency keys older than IDEMPOTENCY_KEY_TTL_HOURS"""
+    with app.app_context():
+        removed = idempotency.purge_expired()
+        print(f"✓ {removed} expired idempotency key(s) removed")
+
+
+if __name__ == "__main__":
+    cleanup_idempotency_keys()
@@ -0,0 +1,278 @@
+"""
+Columnar in-memory analytics (ANALYTICS_ENGINE=columnar)
+
+Keeps a per-business snapshot of the feedback table as NumPy arrays: epoch
+microseconds (int64, sorted), one int8 array per rating with -1 for "not
+answered", and reviewed. The analytics sections are then computed with
+vectorized operations (searchsorted for the period and day boundaries,
+bincount for histograms and per-day sums) and match stats.analytics
+exactly. Recent comments still come from SQL.
+
+Snapshots are refreshed on each request. A snapshot remembers the
+business's rewrite version (result_cache.rewrites, bumped by deletes and
+review changes but not inserts); when it has moved on, or the snapshot is
+older than RESULT_CACHE_TTL, the snapshot is reloaded, since those changes
+cannot be applied incrementally. Otherwise rows above the snapshot's max-id
+watermark are appended, which covers every insert, including those by other
+workers. The TTL bounds staleness from other workers' deletes under the
+per-process memory version backend.
+
+Requires numpy. A snapshot costs about 16 bytes per feedback row; at most
+COLUMNAR_CACHE_SIZE businesses are kept per process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+import stats
+from cache import result_cache
+from models import db, Feedback, CATEGORIES
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+RATING_COLUMNS = ["overall"] + CATEGORIES + ["nps"]
+HOUR = 3600 * 10**6
+DAY = 24 * HOUR
+EPOCH = datetime(1970, 1, 1)
+WEEKDAYS = [
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+    "Sunday",
+]
+
+
+def _epoch(dt):
+    """Microseconds since the epoch for a naive UTC datetime"""
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+class Snapshot:
+    """Column arrays for one business's feedback, sorted by timestamp"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.watermark = 0
+        self.version = None
+        self.loaded_at = time.monotonic()
+        self.timestamps = np.empty(0, dtype=np.int64)
+        self.columns = {name: np.empty(0, dtype=np.int8) for name in RATING_COLUMNS}
+        self.reviewed = np.empty(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, rows):
+        """Add (id, timestamp, overall, *categories, nps, reviewed) rows"""
+        if not rows:
+            return
+        columns = list(zip(*rows))
+        self.watermark = max(self.watermark, max(columns[0]))
+        timestamps = np.fromiter(map(_epoch, columns[1]), np.int64, len(rows))
+        in_order = (
+            len(self.timestamps) == 0 or timestamps.min() >= self.timestamps[-1]
+        ) and bool(np.all(np.diff(timestamps) >= 0))
+
+        self.timestamps = np.concatenate([self.timestamps, timestamps])
+        for i, name in enumerate(RATING_COLUMNS, start=2):
+            values = np.array(
+                [-1 if v is None else v for v in columns[i]], dtype=np.int8
+            )
+            self.columns[name] = np.concatenate([self.columns[name], values])
+        reviewed = np.array([bool(v) for v in columns[-1]], dtype=bool)
+        self.reviewed = np.concatenate([self.reviewed, reviewed])
+
+        # Late rows (offline batches with client timestamps) break the order
+        if not in_order:
+            order = np.argsort(self.timestamps, kind="stable")
+            self.timestamps = self.timestamps[order]
+            self.columns = {name: col[order] for name, col in self.columns.items()}
+            self.reviewed = self.reviewed[order]
+
+
+SNAPSHOT_COLUMNS = [
+    Feedback.id,
+    Feedback.timestamp,
+    Feedback.overall_rating,
+    *[getattr(Feedback, f"{cat}_rating") for cat in CATEGORIES],
+    Feedback.nps_score,
+    Feedback.reviewed,
+]
+
+
+class ColumnarCache:
+    """LRU of business id -> Snapshot"""
+
+    def __init__(self, maxsize=16):
+        self.maxsize = maxsize
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("COLUMNAR_CACHE_SIZE", self.maxsize)
+        if app.config.get("ANALYTICS_ENGINE") == "columnar" and np is None:
+            raise RuntimeError("ANALYTICS_ENGINE=columnar requires numpy")
+
+    def get(self, business_id):
+        """
+        (timestamps, columns, reviewed) for a business, up to date with the
+        database
+
+        Refreshes replace the arrays rather than changing them, so the
+        returned arrays stay consistent while other requests refresh.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(business_id)
+            if snapshot is None:
+                snapshot = self._snapshots[business_id] = Snapshot()
+            self._snapshots.move_to_end(business_id)
+            while len(self._snapshots) > self.maxsize:
+                self._snapshots.popitem(last=False)
+
+        with snapshot.lock:
+            self._refresh(business_id, snapshot)
+            return snapshot.timestamps, snapshot.columns, snapshot.reviewed
+
+    def _refresh(self, business_id, snapshot):
+        # Read the version before the rows, so a write racing the load
+        # leaves the snapshot behind and it is reloaded next time
+        version = result_cache.rewrites.get(business_id)
+        expired = time.monotonic() - snapshot.loaded_at > result_cache.ttl
+        if snapshot.version != version or expired:
+            snapshot.clear()
+            snapshot.version = version
+        snapshot.append(self._rows(business_id, snapshot.watermark))
+
+    def _rows(self, business_id, after_id):
+        return db.session.execute(
+            select(*SNAPSHOT_COLUMNS)
+            .where(Feedback.business_id == business_id, Feedback.id > after_id)
+            .order_by(Feedback.id)
+        ).all()
+
+    def invalidate(self, business_id=None):
+        with self._lock:
+            if business_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(business_id, None)
+
+
+columnar_cache = ColumnarCache()
+
+
+def _average(total, count):
+    return round(total / count, 2) if count else 0
+
+
+def analytics(business_id, period="30", now=None, fields=stats.ANALYTICS_FIELDS):
+    """Same payload as stats.analytics, computed from the columnar snapshot"""
+    now = now or datetime.utcnow()
+    fields = set(fields)
+    start_date = stats.period_start(period, now)
+
+    timestamps, columns, reviewed = columnar_cache.get(business_id)
+    first = int(np.searchsorted(timestamps, _epoch(start_date), "left"))
+    timestamps = timestamps[first:]
+    columns = {name: col[first:] for name, col in columns.items()}
+    count = len(timestamps)
+
+    if not count:
+        return stats.empty_analytics(fields)
+
+    payload = {}
+    overall = columns["overall"]
+
+    if "sentiment" in fields:
+        sentiment = np.bincount(overall, minlength=4)
+        payload["sentiment"] = {
+            "happy": int(sentiment[3]),
+            "neutral": int(sentiment[2]),
+            "sad": int(sentiment[1]),
+        }
+
+    if "trends" in fields or "category_trends" in fields:
+        days_to_show, first_day = stats.trend_days(period, now)
+        # Day boundaries -> index of each day's first row
+        edges = np.searchsorted(
+            timestamps, _epoch(first_day) + DAY * np.arange(days_to_show + 1)
+        )
+        in_trend = slice(int(edges[0]), int(edges[-1]))
+        day_of_row = np.repeat(np.arange(days_to_show), np.diff(edges))
+
+        def per_day(values):
+            answered = values >= 0
+            days = day_of_row[answered]
+            counts = np.bincount(days, minlength=days_to_show)
+            sums = np.bincount(days, weights=values[answered], minlength=days_to_show)
+            return [_average(int(s), int(c)) for s, c in zip(sums, counts)]
+
+        labels = [
+            (first_day + timedelta(days=i)).strftime("%m/%d")
+            for i in range(days_to_show)
+        ]
+        if "trends" in fields:
+            averages = per_day(overall[in_trend])
+            payload["trends"] = [
+                {"date": label, "avg_rating": avg}
+                for label, avg in zip(labels, averages)
+            ]
+        if "category_trends" in fields:
+            by_category = {cat: per_day(columns[cat][in_trend]) for cat in CATEGORIES}
+            payload["category_trends"] = [
+                dict(
+                    {"date": label}, **{cat: by_category[cat][i] for cat in CATEGORIES}
+                )
+                for i, label in enumerate(labels)
+            ]
+
+    if "nps_distribution" in fields:
+        nps = columns["nps"]
+        payload["nps_distribution"] = [
+            int(n) for n in np.bincount(nps[nps >= 0], minlength=11)
+        ]
+
+    if "activity" in fields:
+        days = timestamps // DAY
+        # 1970-01-01 was a Thursday
+        weekdays = (days + 3) % 7
+        weekday_counts = np.bincount(weekdays, minlength=7)
+        # Ties go to the weekday seen first, as when walking the days in order
+        first_seen = np.full(7, len(weekdays))
+        np.minimum.at(first_seen, weekdays, np.arange(len(weekdays)))
+        busiest = np.flatnonzero(weekday_counts == weekday_counts.max())
+        busiest_day = WEEKDAYS[int(busiest[np.argmin(first_seen[busiest])])]
+
+        hours = (timestamps % DAY) // HOUR
+        hour_counts = np.bincount(hours, minlength=24)
+        hour_first_seen = np.full(24, len(hours))
+        np.minimum.at(hour_first_seen, hours, np.arange(len(hours)))
+        busiest = np.flatnonzero(hour_counts == hour_counts.max())
+        busiest_hour = int(busiest[np.argmin(hour_first_seen[busiest])])
+
+        days_in_period = (now - start_date).days or 1
+        reviewed_count = int(reviewed[first:].sum())
+        payload["activity"] = {
+            "busiest_day": busiest_day,
+            "busiest_hour": f"{busiest_hour}:00 - {busiest_hour + 1}:00",
+            "avg_per_day": round(count / days_in_period, 1),
+            "response_rate": round((reviewed_count / count) * 100),
+        }
+
+    if "recent_comments" in fields:
+        payload["recent_comments"] = stats.recent_comments(business_id, start_date)
+
+    return payload
@@ -0,0 +1,106 @@
+"""
+Conditional GETs for the statistics endpoints
+
+Statistics only change when a business's feedback does, so responses carry
+a strong ETag and a Last-Modified derived from the business's data version:
+the newest feedback id and timestamp, plus the result cache's mutation
+counter (bumped by every write, including deletes and review toggles). A
+request whose If-None-Match (or If-Modified-Since) still matches gets a 304
+before the view runs any aggregation.
+
+The statistics also cover rolling windows ("last 7 days"), which move with
+the clock rather than the data, so validators additionally roll over every
+STATS_ETAG_WINDOW seconds.
+
+With the default in-memory version store each worker has its own counter:
+a delete handled by one worker only changes the other workers' validators
+at the next window. Deployments with several workers should use
+RESULT_CACHE_BACKEND=sqlite, which shares the counter.
+"""
+
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from cache import result_cache
+from models import db, Feedback
+
+
+def data_version(business_id):
+    """(etag, last_modified) for a business's statistics"""
+    max_id, newest = db.session.execute(
+        select(
+            select(func.max(Feedback.id))
+            .where(Feedback.business_id == business_id)
+            .scalar_subquery(),
+            select(func.max(Feedback.timestamp))
+            .where(Feedback.business_id == business_id)
+            .scalar_subquery(),
+        )
+    ).one()
+    version, changed_at = result_cache.versions.stamp(business_id)
+
+    now = time.time()
+    window = current_app.config["STATS_ETAG_WINDOW"]
+    window_start = int(now - now % window)
+
+    token = f"{business_id}:{max_id or 0}:{version}:{window_start}"
+    etag = hashlib.sha1(token.encode()).hexdigest()[:20]
+
+    # Feedback timestamps are naive UTC
+    times = [window_start, changed_at]
+    if newest is not None:
+        times.append(newest.replace(tzinfo=timezone.utc).timestamp())
+    last_modified = max(t for t in times if t is not None)
+    return etag, datetime.fromtimestamp(int(last_modified), timezone.utc)
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional(business_id_for, cache_control="private, no-cache"):
+    """
+    Answer GETs of a statistics view with 304 while its data is unchanged
+
+    business_id_for is called with the view's arguments and returns the
+    business whose data the response depends on, or None to skip validation
+    (the view then handles the miss itself). cache_control is a header value
+    or a function returning one. The default makes browsers revalidate on
+    every use instead of guessing a freshness lifetime from Last-Modified.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            business_id = business_id_for(*args, **kwargs)
+            if business_id is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = data_version(business_id)
+            if _not_modified(etag, last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.headers["Cache-Control"] = (
+                cache_control() if callable(cache_control) else cache_control
+            )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -27,4 +27,94 @@ class Config:
     SESSION_COOKIE_SECURE = os.environ.get("FLASK_ENV") == "production"
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = "Lax"
-    FEEDBACK_COOLDOWN_MINUTES = 5
+    FEEDBACK_COOLDOWN_MINUTES = int(os.environ.get("FEEDBACK_COOLDOWN_MINUTES", 5))
+
+    # Server-side rate limits (see ratelimit.py). Each device (or IP without a
+    # device token) may submit once per cooldown, each IP FEEDBACK_IP_LIMIT
+    # times. RATE_LIMIT_BACKEND=sqlite shares the buckets between workers.
+    # Behind a reverse proxy (e.g. Render) set PROXY_COUNT so the client IP is
+    # taken from X-Forwarded-For.
+    RATE_LIMIT_ENABLED = os.environ.get("RATE_LIMIT_ENABLED", "1") != "0"
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_PATH = os.environ.get("RATE_LIMIT_PATH")
+    PROXY_COUNT = int(os.environ.get("PROXY_COUNT", 0))
+    FEEDBACK_IP_LIMIT = int(os.environ.get("FEEDBACK_IP_LIMIT", 20))
+    FEEDBACK_BATCH_PER_MINUTE = int(os.environ.get("FEEDBACK_BATCH_PER_MINUTE", 10))
+    LOGIN_ATTEMPTS = int(os.environ.get("LOGIN_ATTEMPTS", 5))
+    LOGIN_WINDOW_MINUTES = int(os.environ.get("LOGIN_WINDOW_MINUTES", 15))
+
+    # Result cache for the statistics endpoints. RESULT_CACHE_BACKEND=sqlite
+    # shares data versions between workers through a file in instance/
+    RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 256))
+    RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 30))
+    RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+
+    # Statistics responses carry ETag/Last-Modified (see conditional.py).
+    # Validators roll over every STATS_ETAG_WINDOW seconds so rolling
+    # windows move on; proxies may reuse public stats for
+    # PUBLIC_STATS_MAX_AGE seconds.
+    STATS_ETAG_WINDOW = int(os.environ.get("STATS_ETAG_WINDOW", 300))
+    PUBLIC_STATS_MAX_AGE = int(os.environ.get("PUBLIC_STATS_MAX_AGE", 10))
+
+    # /dashboard/api/analytics engine: "rollup" sums the daily rollup in SQL;
+    # "columnar" keeps per-business NumPy snapshots in memory (requires numpy,
+    # see columnar.py) for up to COLUMNAR_CACHE_SIZE businesses per process
+    ANALYTICS_ENGINE = os.environ.get("ANALYTICS_ENGINE", "rollup")
+    COLUMNAR_CACHE_SIZE = int(os.environ.get("COLUMNAR_CACHE_SIZE", 16))
+
+    # Customer pages resolve their business through a per-process cache;
+    # other workers see business changes within TENANT_CACHE_TTL seconds
+    TENANT_CACHE_SIZE = int(os.environ.get("TENANT_CACHE_SIZE", 1024))
+    TENANT_CACHE_TTL = int(os.environ.get("TENANT_CACHE_TTL", 300))
+
+    # Logged-in businesses are cached per process (see principals.py);
+    # revoked sessions stop working on other workers within this TTL
+    PRINCIPAL_CACHE_SIZE = int(os.environ.get("PRINCIPAL_CACHE_SIZE", 1024))
+    PRINCIPAL_CACHE_TTL = int(os.environ.get("PRINCIPAL_CACHE_TTL", 60))
+
+    # Background jobs (large exports). Job files live in instance/jobs and
+    # are deleted JOB_TTL_HOURS after they last changed.
+    JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+    JOBS_PER_BUSINESS = int(os.environ.get("JOBS_PER_BUSINESS", 2))
+    JOB_TTL_HOURS = int(os.environ.get("JOB_TTL_HOURS", 24))
+    JOB_DIR = os.environ.get("JOB_DIR")
+
+    # Feedback ingestion. "queue" answers submissions with 202 and writes them
+    # in batches from a background thread (see ingest.py); "sync" writes each
+    # submission before responding.
+    FEEDBACK_INGEST_MODE = os.environ.get("FEEDBACK_INGEST_MODE", "sync")
+    FEEDBACK_INGEST_BATCH = int(os.environ.get("FEEDBACK_INGEST_BATCH", 200))
+    FEEDBACK_INGEST_INTERVAL = float(os.environ.get("FEEDBACK_INGEST_INTERVAL", 0.5))
+    FEEDBACK_INGEST_QUEUE_SIZE = int(
+        os.environ.get("FEEDBACK_INGEST_QUEUE_SIZE", 10000)
+    )
+    FEEDBACK_INGEST_SPILL = os.environ.get("FEEDBACK_INGEST_SPILL")
+
+    # Offline kiosks replay queued feedback through /api/feedback/batch
+    FEEDBACK_BATCH_MAX = int(os.environ.get("FEEDBACK_BATCH_MAX", 100))
+    FEEDBACK_BATCH_MAX_AGE_DAYS = int(os.environ.get("FEEDBACK_BATCH_MAX_AGE_DAYS", 30))
+
+    # Retried submissions carrying the same Idempotency-Key within this window
+    # get the original response back (see idempotency.py)
+    IDEMPOTENCY_KEY_TTL_HOURS = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", 48))
+
+    # Live dashboard stream (see events.py). Streams end after
+    # STREAM_MAX_SECONDS, below gunicorn's default 30s worker timeout, and the
+    # browser reconnects; rows written by other workers show up within
+    # STREAM_POLL_SECONDS.
+    STREAM_MAX_SECONDS = int(os.environ.get("STREAM_MAX_SECONDS", 25))
+    STREAM_POLL_SECONDS = float(os.environ.get("STREAM_POLL_SECONDS", 2))
+
+    # Delete-all and the retention purge delete PURGE_CHUNK_SIZE rows per
+    # transaction, pausing PURGE_CHUNK_PAUSE seconds between chunks so
+    # submissions are not locked out (see purge.py)
+    PURGE_CHUNK_SIZE = int(os.environ.get("PURGE_CHUNK_SIZE", 1000))
+    PURGE_CHUNK_PAUSE = float(os.environ.get("PURGE_CHUNK_PAUSE", 0.05))
+
+    # Retention: purge_old_feedback.py removes feedback older than
+    # RETENTION_MONTHS (0 keeps everything). RETENTION_MODE=archive first
+    # appends it to gzipped NDJSON files in RETENTION_ARCHIVE_DIR
+    # (default instance/archive); "delete" just deletes it.
+    RETENTION_MONTHS = int(os.environ.get("RETENTION_MONTHS", 0))
+    RETENTION_MODE = os.environ.get("RETENTION_MODE", "delete")
+    RETENTION_ARCHIVE_DIR = os.environ.get("RETENTION_ARCHIVE_DIR")
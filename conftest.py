@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+# Never run the tests against the configured (possibly production) database.
+# Set TEST_DATABASE_URL to run them against PostgreSQL instead of SQLite.
+os.environ["DATABASE_URL"] = os.environ.get("TEST_DATABASE_URL", "sqlite://")
+os.environ["JOB_DIR"] = tempfile.mkdtemp(prefix="feedback-jobs-")
+
+from app import app as flask_app  # noqa: E402
+from models import db, Business, Feedback, IdempotencyKey  # noqa: E402
+import rollup  # noqa: E402
+from cache import result_cache  # noqa: E402
+from ratelimit import rate_limiter  # noqa: E402
+from tenants import tenant_cache  # noqa: E402
+from principals import principal_cache  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        yield flask_app
+        db.session.rollback()
+        Feedback.query.delete()
+        IdempotencyKey.query.delete()
+        rollup.FeedbackDailyRollup.query.delete()
+        Business.query.filter(Business.email != "admin@business.com").delete()
+        Business.query.update({"settings_json": "{}"})
+        db.session.commit()
+        result_cache.clear()
+        rate_limiter.reset()
+        tenant_cache.invalidate()
+        principal_cache.invalidate(1)
+
+
+@pytest.fixture
+def business(app):
+    return Business.query.filter_by(email="admin@business.com").one()
+
+
+@pytest.fixture
+def client(app, business):
+    client = app.test_client()
+    client.post("/login", data={"email": business.email, "password": "admin123"})
+    return client
+
+
+def seed_feedback(business_id, count, now=None, days=120, seed=1):
+    """Insert count random feedback rows spread over the last `days` days"""
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+
+    def rating():
+        return rng.choice([None, 1, 2, 3, 4, 5])
+
+    rows = [
+        dict(
+            business_id=business_id,
+            timestamp=now - timedelta(seconds=rng.randint(0, days * 86400)),
+            overall_rating=rng.choice([1, 2, 3]),
+            food_rating=rating(),
+            service_rating=rating(),
+            staff_rating=rating(),
+            cleanliness_rating=rating(),
+            value_rating=rating(),
+            nps_score=rng.choice([None] + list(range(11))),
+            comment=rng.choice([None, "Great coffee", "Slow service", "ok"]),
+            reviewed=rng.random() < 0.3,
+        )
+        for _ in range(count)
+    ]
+    db.session.bulk_insert_mappings(Feedback, rows)
+    db.session.commit()
+    rollup.rebuild(business_id)
+    result_cache.invalidate(business_id)
+    return rows
@@ -7,17 +7,38 @@ from flask import (
     redirect,
     url_for,
     flash,
+    Response,
+    stream_with_context,
+    current_app,
 )
-from flask_login import login_required, current_user
-from models import db, Feedback, Business
-from datetime import datetime, timedelta
-from collections import defaultdict
-import csv
-from io import BytesIO, StringIO
+from flask_login import login_required, login_user, current_user
+from models import db, Feedback, Business, SENTIMENT
+from sqlalchemy import select
+from datetime import datetime
+from io import BytesIO
 import qrcode
+import rollup
+import stats
+import columnar
+import pagination
+import exports
+import search
+from cache import result_cache
+from tenants import tenant_cache
+from principals import principal_cache
+import business_settings
+import bulk
+import purge
+import events
+from conditional import conditional
+from jobs import job_runner, TooManyJobs
+import os
 
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
+# Upper bound for per_page on the feedback listing
+MAX_PER_PAGE = 100
+
 
 @dashboard_bp.route("/")
 @login_required
@@ -47,6 +68,11 @@ def settings():
     return render_template("dashboard/settings.html", business=current_user)
 
 
+def current_business():
+    """The logged-in Business row, for routes that modify it"""
+    return db.session.get(Business, current_user.id)
+
+
 @dashboard_bp.route("/change-password", methods=["POST"])
 @login_required
 def change_password():
@@ -73,9 +99,13 @@ def change_password():
             flash("Password must be at least 8 characters long", "error")
             return redirect(url_for("dashboard.settings"))
 
-        # Update password
-        current_user.set_password(new_password)
+        # Update password, revoking every other session of this business
+        business = current_business()
+        business.set_password(new_password)
+        business.auth_version += 1
         db.session.commit()
+        principal_cache.invalidate(business.id)
+        login_user(business)
 
         flash("Password changed successfully!", "success")
         return redirect(url_for("dashboard.settings"))
@@ -108,10 +138,17 @@ def update_business():
             flash("Email already in use by another business", "error")
             return redirect(url_for("dashboard.settings"))
 
-        # Update business info
-        current_user.name = business_name
-        current_user.email = email
+        # Update business info. A new login email revokes other sessions.
+        business = current_business()
+        if email != business.email:
+            business.auth_version += 1
+        business.name = business_name
+        business.email = email
         db.session.commit()
+        result_cache.invalidate(business.id)
+        tenant_cache.invalidate()
+        principal_cache.invalidate(business.id)
+        login_user(business)
 
         flash("Business information updated successfully!", "success")
         return redirect(url_for("dashboard.settings"))
@@ -126,22 +163,62 @@ def update_business():
 @dashboard_bp.route("/api/feedback/delete-all", methods=["DELETE"])
 @login_required
 def delete_all_feedback():
-    """Delete all feedback (danger zone action)"""
+    """
+    Delete all feedback (danger zone action)
+
+    Runs as a background job that deletes in chunks (see purge.py), so
+    customer submissions keep flowing meanwhile. Feedback that arrives after
+    the request is kept. Poll the returned status_url for progress.
+    """
     try:
-        count = Feedback.query.filter_by(business_id=current_user.id).delete()
-        db.session.commit()
-        return jsonify({"success": True, "message": f"{count} feedback items deleted"})
+        job = job_runner.submit(
+            "delete",
+            current_user.id,
+            purge.delete_all_params(current_user.id),
+            purge.run_delete_all_job,
+        )
+    except TooManyJobs as e:
+        return jsonify({"error": str(e)}), 429
     except Exception as e:
         db.session.rollback()
         print(f"Error deleting feedback: {e}")
         return jsonify({"error": "Error deleting feedback"}), 500
 
+    return jsonify(_delete_job_response(job)), 202
+
+
+@dashboard_bp.route("/api/feedback/delete-all/<job_id>")
+@login_required
+def delete_job_status(job_id):
+    """Status and progress of a delete-all job"""
+    job = job_runner.store.get(job_id)
+    if not job or job["kind"] != "delete" or job["business_id"] != current_user.id:
+        return jsonify({"error": "Delete job not found"}), 404
+
+    return jsonify(_delete_job_response(job))
+
+
+def _delete_job_response(job):
+    return {
+        "success": job["status"] != "failed",
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "deleted": job["progress"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "status_url": url_for("dashboard.delete_job_status", job_id=job["id"]),
+    }
+
 
 # ==================== API ROUTES ====================
 
 
 @dashboard_bp.route("/api/stats")
 @login_required
+@conditional(lambda: current_user.id)
 def dashboard_stats():
     """
     Get dashboard statistics
@@ -155,110 +232,160 @@ def dashboard_stats():
     - NPS score for the last 30 days
     """
     try:
-        # Today's stats
-        today_start = datetime.utcnow().replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        today_feedback = Feedback.query.filter(
-            Feedback.business_id == current_user.id, Feedback.timestamp >= today_start
-        ).all()
-
-        # Last 7 days
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        week_feedback = (
-            Feedback.query.filter(
-                Feedback.business_id == current_user.id, Feedback.timestamp >= week_ago
-            )
-            .order_by(Feedback.timestamp.asc())
-            .all()
+        payload = result_cache.get_or_compute(
+            "stats",
+            current_user.id,
+            (),
+            lambda: stats.dashboard_stats(current_user.id),
         )
+        return jsonify(payload)
 
-        # Last 30 days
-        month_ago = datetime.utcnow() - timedelta(days=30)
-        month_feedback = Feedback.query.filter(
-            Feedback.business_id == current_user.id, Feedback.timestamp >= month_ago
-        ).all()
-
-        # Calculate averages
-        def calc_avg(feedback_list, field):
-            values = [
-                getattr(f, field)
-                for f in feedback_list
-                if getattr(f, field) is not None
-            ]
-            return round(sum(values) / len(values), 2) if values else 0
-
-        # Daily breakdown for chart (last 7 days)
-        daily_data = defaultdict(lambda: {"count": 0, "avg_rating": []})
-        for f in week_feedback:
-            day_key = f.timestamp.strftime("%Y-%m-%d")
-            daily_data[day_key]["count"] += 1
-            if f.overall_rating:
-                daily_data[day_key]["avg_rating"].append(f.overall_rating)
-
-        daily_chart = []
-        for i in range(7):
-            day = today_start - timedelta(days=6 - i)
-            day_key = day.strftime("%Y-%m-%d")
-            data = daily_data[day_key]
-            avg = (
-                round(sum(data["avg_rating"]) / len(data["avg_rating"]), 2)
-                if data["avg_rating"]
-                else 0
-            )
-            daily_chart.append(
-                {
-                    "date": day.strftime("%a %m/%d"),
-                    "count": data["count"],
-                    "avg_rating": avg,
+    except Exception as e:
+        print(f"Error getting dashboard stats: {e}")
+        return jsonify({"error": "Error loading statistics"}), 500
+
+
+def _choices_param(name, choices):
+    """
+    Comma-separated subset of choices from a query param, in choices order
+
+    A missing or empty param means all of them; unknown values raise
+    ValueError.
+    """
+    requested = {v.strip() for v in request.args.get(name, "").split(",")} - {""}
+    if requested - set(choices):
+        raise ValueError(f"{name} must be chosen from {', '.join(choices)}")
+    if not requested:
+        return tuple(choices)
+    # Canonical order, so equivalent requests share a result cache entry
+    return tuple(c for c in choices if c in requested)
+
+
+BOOTSTRAP_SECTIONS = ("stats", "summary", "feedback")
+
+
+@dashboard_bp.route("/api/bootstrap")
+@login_required
+def bootstrap():
+    """
+    Everything a dashboard page needs on load, in one response
+
+    Query params:
+    - sections: comma-separated subset of stats, summary and feedback
+      (default: all). stats and summary come from one query (see
+      stats.overview); feedback is the first page of /api/feedback.
+    - per_page: feedback page size (default: 20, max: 100)
+
+    last_id is the newest feedback id the response covers; pass it to
+    /api/stream to receive only later rows.
+    """
+    try:
+        sections = _choices_param("sections", BOOTSTRAP_SECTIONS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        payload = {}
+        if "stats" in sections or "summary" in sections:
+
+            def compute():
+                last_id = events.latest_feedback_id(current_user.id)
+                return {
+                    "last_id": last_id,
+                    **stats.overview(current_user.id, max_id=last_id),
                 }
-            )
 
-        # Category breakdown (last 30 days)
-        categories = {
-            "food": calc_avg(month_feedback, "food_rating"),
-            "service": calc_avg(month_feedback, "service_rating"),
-            "staff": calc_avg(month_feedback, "staff_rating"),
-            "cleanliness": calc_avg(month_feedback, "cleanliness_rating"),
-            "value": calc_avg(month_feedback, "value_rating"),
-        }
-
-        # NPS calculation (last 30 days)
-        nps_scores = [f.nps_score for f in month_feedback if f.nps_score is not None]
-        if nps_scores:
-            promoters = len([s for s in nps_scores if s >= 9])
-            detractors = len([s for s in nps_scores if s <= 6])
-            nps = round(((promoters - detractors) / len(nps_scores)) * 100, 1)
+            overview = result_cache.get_or_compute(
+                "overview", current_user.id, (), compute
+            )
+            payload["last_id"] = overview["last_id"]
+            for section in ("stats", "summary"):
+                if section in sections:
+                    payload[section] = overview[section]
         else:
-            nps = 0
+            payload["last_id"] = events.latest_feedback_id(current_user.id)
+
+        if "feedback" in sections:
+            per_page = request.args.get("per_page", 20, type=int)
+            if per_page < 1:
+                per_page = 20
+            payload["feedback"] = _feedback_offset_page(
+                Feedback.query.filter_by(business_id=current_user.id),
+                "newest",
+                1,
+                min(per_page, MAX_PER_PAGE),
+            )
+        return jsonify(payload)
 
-        # Total responses ever
-        total_responses = Feedback.query.filter_by(business_id=current_user.id).count()
+    except Exception as e:
+        print(f"Error loading dashboard bootstrap: {e}")
+        return jsonify({"error": "Error loading dashboard"}), 500
 
-        return jsonify(
-            {
-                "today": {
-                    "count": len(today_feedback),
-                    "avg_rating": calc_avg(today_feedback, "overall_rating"),
-                },
-                "week": {
-                    "count": len(week_feedback),
-                    "avg_rating": calc_avg(week_feedback, "overall_rating"),
-                },
-                "month": {
-                    "count": len(month_feedback),
-                    "avg_rating": calc_avg(month_feedback, "overall_rating"),
-                },
-                "daily_chart": daily_chart,
-                "categories": categories,
-                "nps": nps,
-                "total_responses": total_responses,
-            }
-        )
 
+@dashboard_bp.route("/api/stream")
+@login_required
+def stream():
+    """
+    Live dashboard updates as Server-Sent Events (see events.py)
+
+    Starts with a snapshot of the stats, then sends each new feedback row.
+    A reconnect with Last-Event-ID resumes after that row without a snapshot.
+    """
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+
+    generator = events.stream(
+        current_user.id,
+        last_id,
+        max_seconds=current_app.config["STREAM_MAX_SECONDS"],
+        poll_seconds=current_app.config["STREAM_POLL_SECONDS"],
+    )
+    return Response(
+        stream_with_context(generator),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@dashboard_bp.route("/api/settings", methods=["GET"])
+@login_required
+def get_settings():
+    """Customer page settings, with defaults filled in"""
+    return jsonify(current_business().get_settings())
+
+
+@dashboard_bp.route("/api/settings", methods=["PATCH"])
+@login_required
+def patch_settings():
+    """
+    Change some settings (JSON merge patch)
+
+    Only the keys sent are changed; null resets a setting to its default.
+    """
+    try:
+        patch = business_settings.validate_patch(request.get_json(silent=True))
+    except business_settings.SettingsError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        business_settings.patch_settings(current_user.id, patch)
+        db.session.commit()
+        tenant_cache.invalidate()
+        return jsonify(current_business().get_settings())
     except Exception as e:
-        print(f"Error getting dashboard stats: {e}")
-        return jsonify({"error": "Error loading statistics"}), 500
+        db.session.rollback()
+        print(f"Error updating settings: {e}")
+        return jsonify({"error": "Error updating settings"}), 500
+
+
+@dashboard_bp.route("/api/cache-stats")
+@login_required
+def cache_stats():
+    """Hit/miss counters for the statistics result cache"""
+    return jsonify(result_cache.stats())
 
 
 @dashboard_bp.route("/api/feedback")
@@ -269,15 +396,32 @@ def get_feedback():
 
     Query params:
     - page: Page number (default: 1)
-    - per_page: Items per page (default: 20)
+    - per_page: Items per page (default: 20, max: 100)
     - filter: Filter by rating (optional)
-    - sort: Sort order (default: newest)
+    - reviewed: 0 for unreviewed only, 1 for reviewed only (optional)
+    - sort: Sort order (default: newest, or relevance when searching)
+    - q: Search comments (optional); combines with the other filters
+    - cursor: Switch to keyset pagination. Pass an empty cursor for the first
+      page, then the next_cursor of the previous response. Not available
+      with sort=relevance.
+    - count: exact, estimate or none (cursor mode only, default: none).
+      estimate sums the daily rollup instead of running COUNT(*).
     """
     try:
         page = request.args.get("page", 1, type=int)
         per_page = request.args.get("per_page", 20, type=int)
         filter_rating = request.args.get("filter", type=int)
-        sort_order = request.args.get("sort", "newest")
+        words = search.terms(request.args.get("q"))
+        sort_order = request.args.get("sort", "relevance" if words else "newest")
+        cursor = request.args.get("cursor")
+
+        if sort_order not in pagination.SORT_KEYS and not (
+            words and sort_order == "relevance"
+        ):
+            sort_order = "newest"
+        if per_page < 1:
+            per_page = 20
+        per_page = min(per_page, MAX_PER_PAGE)
 
         # Base query
         query = Feedback.query.filter_by(business_id=current_user.id)
@@ -285,53 +429,140 @@ def get_feedback():
         # Apply filters
         if filter_rating and 1 <= filter_rating <= 3:
             query = query.filter_by(overall_rating=filter_rating)
-
-        # Apply sorting
-        if sort_order == "oldest":
-            query = query.order_by(Feedback.timestamp.asc())
-        elif sort_order == "rating_high":
-            query = query.order_by(
-                Feedback.overall_rating.desc(), Feedback.timestamp.desc()
-            )
-        elif sort_order == "rating_low":
-            query = query.order_by(
-                Feedback.overall_rating.asc(), Feedback.timestamp.desc()
+        else:
+            filter_rating = None
+
+        # Literal true/false so the partial unreviewed index can match
+        reviewed = request.args.get("reviewed")
+        if reviewed == "0":
+            query = query.filter(Feedback.reviewed == db.false())
+        elif reviewed == "1":
+            query = query.filter(Feedback.reviewed == db.true())
+        else:
+            reviewed = None
+
+        rank = None
+        if words:
+            query, rank = search.apply(query, words)
+        if sort_order != "relevance":
+            rank = None
+
+        if cursor is not None:
+            if rank is not None:
+                raise pagination.InvalidCursor(
+                    "Cursor pagination cannot sort by relevance"
+                )
+            return jsonify(
+                _feedback_keyset_page(
+                    query,
+                    sort_order,
+                    cursor,
+                    per_page,
+                    request.args.get("count", "none"),
+                    filter_rating,
+                    reviewed,
+                    searched=bool(words),
+                )
             )
-        else:  # newest (default)
-            query = query.order_by(Feedback.timestamp.desc())
 
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-
-        return jsonify(
-            {
-                "feedback": [f.to_dict() for f in pagination.items],
-                "total": pagination.total,
-                "pages": pagination.pages,
-                "current_page": page,
-                "per_page": per_page,
-                "has_next": pagination.has_next,
-                "has_prev": pagination.has_prev,
-            }
-        )
+        return jsonify(_feedback_offset_page(query, sort_order, page, per_page, rank))
 
+    except pagination.InvalidCursor as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         print(f"Error getting feedback: {e}")
         return jsonify({"error": "Error loading feedback"}), 500
 
 
+def _feedback_offset_page(query, sort_order, page, per_page, rank=None):
+    """
+    One page of /api/feedback in the default (page number) mode
+
+    rank, from search.apply(), orders the page by relevance instead of
+    sort_order.
+    """
+    if rank is None:
+        order = pagination.order_by_clauses(sort_order)
+    else:
+        order = [rank, Feedback.id.desc()]
+    query = query.with_entities(*exports.EXPORT_COLUMNS).order_by(*order)
+    page_obj = query.paginate(page=page, per_page=per_page, error_out=False)
+    return {
+        "feedback": [exports.row_dict(row) for row in page_obj.items],
+        "total": page_obj.total,
+        "pages": page_obj.pages,
+        "current_page": page,
+        "per_page": per_page,
+        "has_next": page_obj.has_next,
+        "has_prev": page_obj.has_prev,
+    }
+
+
+def _feedback_keyset_page(
+    query,
+    sort_order,
+    cursor,
+    per_page,
+    count,
+    filter_rating=None,
+    reviewed=None,
+    searched=False,
+):
+    """One page of a keyset-paginated feedback listing"""
+    total = None
+    if count == "exact" or (
+        count == "estimate" and (searched or (filter_rating and reviewed))
+    ):
+        # The rollup has no rating x reviewed breakdown, nor search matches
+        total = query.count()
+    elif count == "estimate":
+        totals = rollup.window_totals(current_user.id, datetime.min)
+        if reviewed == "1":
+            total = totals["reviewed"]
+        elif reviewed == "0":
+            total = totals["count"] - totals["reviewed"]
+        else:
+            total = totals[SENTIMENT.get(filter_rating, "count")]
+
+    if cursor:
+        values = pagination.decode_cursor(sort_order, cursor)
+        query = query.filter(pagination.after_cursor(sort_order, values))
+
+    # One extra row tells us whether there is a next page
+    rows = (
+        query.with_entities(*exports.EXPORT_COLUMNS)
+        .order_by(*pagination.order_by_clauses(sort_order))
+        .limit(per_page + 1)
+        .all()
+    )
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return {
+        "feedback": [exports.row_dict(row) for row in rows],
+        "next_cursor": (
+            pagination.encode_cursor(sort_order, rows[-1]) if has_next else None
+        ),
+        "has_next": has_next,
+        "per_page": per_page,
+        "total": total,
+    }
+
+
 @dashboard_bp.route("/api/feedback/<int:feedback_id>", methods=["GET"])
 @login_required
 def get_single_feedback(feedback_id):
     """Get single feedback entry details"""
-    feedback = Feedback.query.filter_by(
-        id=feedback_id, business_id=current_user.id
+    row = db.session.execute(
+        select(*exports.EXPORT_COLUMNS).where(
+            Feedback.id == feedback_id, Feedback.business_id == current_user.id
+        )
     ).first()
 
-    if not feedback:
+    if not row:
         return jsonify({"error": "Feedback not found"}), 404
 
-    return jsonify(feedback.to_dict())
+    return jsonify(exports.row_dict(row))
 
 
 @dashboard_bp.route("/api/feedback/<int:feedback_id>/review", methods=["POST"])
@@ -347,7 +578,9 @@ def mark_reviewed(feedback_id):
             return jsonify({"error": "Feedback not found"}), 404
 
         feedback.reviewed = not feedback.reviewed
+        rollup.record_review_toggle(feedback)
         db.session.commit()
+        result_cache.invalidate(current_user.id, rewrite=True)
 
         return jsonify(
             {"success": True, "reviewed": feedback.reviewed, "feedback_id": feedback.id}
@@ -371,8 +604,11 @@ def delete_feedback(feedback_id):
         if not feedback:
             return jsonify({"error": "Feedback not found"}), 404
 
+        rollup.record_feedback(feedback, sign=-1)
         db.session.delete(feedback)
         db.session.commit()
+        result_cache.invalidate(current_user.id, rewrite=True)
+        events.broker.publish(current_user.id, events.RESYNC)
 
         return jsonify({"success": True, "message": "Feedback deleted successfully"})
 
@@ -382,6 +618,65 @@ def delete_feedback(feedback_id):
         return jsonify({"error": "Error deleting feedback"}), 500
 
 
+@dashboard_bp.route("/api/feedback/bulk/review", methods=["POST"])
+@login_required
+def bulk_mark_reviewed():
+    """
+    Mark many feedback entries reviewed in one statement
+
+    JSON body: ids or filter (see bulk.py), and optionally
+    "reviewed": false to mark them unreviewed instead. Returns the number of
+    entries whose status changed.
+    """
+    data = request.get_json(silent=True)
+    try:
+        conditions = bulk.parse_scope(data)
+        reviewed = data.get("reviewed", True)
+        if not isinstance(reviewed, bool):
+            raise bulk.BulkError("reviewed must be true or false")
+    except bulk.BulkError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        updated = bulk.set_reviewed(current_user.id, conditions, reviewed)
+        db.session.commit()
+        if updated:
+            result_cache.invalidate(current_user.id, rewrite=True)
+        return jsonify({"success": True, "updated": updated, "reviewed": reviewed})
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error updating feedback: {e}")
+        return jsonify({"error": "Error updating feedback"}), 500
+
+
+@dashboard_bp.route("/api/feedback/bulk/delete", methods=["POST"])
+@login_required
+def bulk_delete_feedback():
+    """
+    Delete many feedback entries in one statement
+
+    JSON body: ids or filter (see bulk.py). Returns the number deleted.
+    """
+    try:
+        conditions = bulk.parse_scope(request.get_json(silent=True))
+    except bulk.BulkError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        deleted = bulk.delete_feedback(current_user.id, conditions)
+        db.session.commit()
+        if deleted:
+            result_cache.invalidate(current_user.id, rewrite=True)
+            events.broker.publish(current_user.id, events.RESYNC)
+        return jsonify({"success": True, "deleted": deleted})
+
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error deleting feedback: {e}")
+        return jsonify({"error": "Error deleting feedback"}), 500
+
+
 @dashboard_bp.route("/api/export")
 @login_required
 def export_feedback():
@@ -389,111 +684,147 @@ def export_feedback():
     Export feedback to CSV
 
     Query params:
-    - format: csv (default) or json
+    - format: csv (default), ndjson, csv.gz, ndjson.gz or json
     - period: all, today, week, month
+
+    csv and ndjson are streamed: the response starts immediately and rows
+    are read and written in batches. The .gz formats download a gzip file;
+    plain csv/ndjson are gzip-encoded on the wire when the client accepts it.
     """
     try:
         period = request.args.get("period", "all")
         export_format = request.args.get("format", "csv")
 
-        # Build query based on period
-        query = Feedback.query.filter_by(business_id=current_user.id)
-
-        if period == "today":
-            today_start = datetime.utcnow().replace(
-                hour=0, minute=0, second=0, microsecond=0
-            )
-            query = query.filter(Feedback.timestamp >= today_start)
-        elif period == "week":
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            query = query.filter(Feedback.timestamp >= week_ago)
-        elif period == "month":
-            month_ago = datetime.utcnow() - timedelta(days=30)
-            query = query.filter(Feedback.timestamp >= month_ago)
-
-        feedback_list = query.order_by(Feedback.timestamp.desc()).all()
-
         if export_format == "json":
+            feedback_list = [
+                exports.row_dict(row)
+                for row in exports.iter_rows(current_user.id, period)
+            ]
+
             return jsonify(
                 {
-                    "feedback": [f.to_dict() for f in feedback_list],
+                    "feedback": feedback_list,
                     "total": len(feedback_list),
                     "exported_at": datetime.utcnow().isoformat(),
                 }
             )
 
-        # CSV export
-        output = StringIO()
-        writer = csv.writer(output)
-
-        # Write header
-        writer.writerow(
-            [
-                "ID",
-                "Date",
-                "Time",
-                "Overall Rating",
-                "Food",
-                "Service",
-                "Staff",
-                "Cleanliness",
-                "Value",
-                "NPS Score",
-                "Comment",
-                "Reviewed",
-            ]
-        )
+        try:
+            encode, mimetype, extension, gz_file = exports.parse_format(export_format)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        # Write data
-        for f in feedback_list:
-            writer.writerow(
-                [
-                    f.id,
-                    f.timestamp.strftime("%Y-%m-%d"),
-                    f.timestamp.strftime("%H:%M:%S"),
-                    f.overall_rating,
-                    f.food_rating or "",
-                    f.service_rating or "",
-                    f.staff_rating or "",
-                    f.cleanliness_rating or "",
-                    f.value_rating or "",
-                    f.nps_score if f.nps_score is not None else "",
-                    f.comment or "",
-                    "Yes" if f.reviewed else "No",
-                ]
-            )
+        chunks = encode(exports.iter_rows(current_user.id, period))
+        headers = {"Vary": "Accept-Encoding"}
 
-        # Create BytesIO object
-        output.seek(0)
-        bytes_output = BytesIO()
-        bytes_output.write(
-            output.getvalue().encode("utf-8-sig")
-        )  # UTF-8 with BOM for Excel
-        bytes_output.seek(0)
+        if gz_file:
+            chunks = exports.gzip_chunks(chunks)
+        elif request.accept_encodings["gzip"]:
+            chunks = exports.gzip_chunks(chunks)
+            headers["Content-Encoding"] = "gzip"
 
-        filename = (
-            f'feedback_{period}_{datetime.utcnow().strftime("%Y%m%d_%H%M%S")}.csv'
+        headers["Content-Disposition"] = (
+            "attachment; filename=" + exports.export_filename(period, extension)
         )
 
-        return send_file(
-            bytes_output,
-            mimetype="text/csv",
-            as_attachment=True,
-            download_name=filename,
-        )
+        return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
 
     except Exception as e:
         print(f"Error exporting feedback: {e}")
         return jsonify({"error": "Error exporting feedback"}), 500
 
 
+@dashboard_bp.route("/api/export/jobs", methods=["POST"])
+@login_required
+def create_export_job():
+    """
+    Start a background export
+
+    Takes the same format (csv, ndjson, csv.gz, ndjson.gz) and period
+    parameters as /api/export, as JSON, form data or query params. Poll the
+    returned status_url, then fetch download_url once status is "done".
+    """
+    params = request.get_json(silent=True) or request.values
+    export_format = params.get("format", "csv")
+    period = params.get("period", "all")
+
+    try:
+        exports.parse_format(export_format)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job = job_runner.submit(
+            "export",
+            current_user.id,
+            {"format": export_format, "period": period},
+            exports.run_export_job,
+        )
+    except TooManyJobs as e:
+        return jsonify({"error": str(e)}), 429
+
+    return jsonify(_export_job_response(job)), 202
+
+
+@dashboard_bp.route("/api/export/jobs/<job_id>")
+@login_required
+def export_job_status(job_id):
+    """Status and progress of a background export"""
+    job = job_runner.store.get(job_id)
+    if not job or job["kind"] != "export" or job["business_id"] != current_user.id:
+        return jsonify({"error": "Export job not found"}), 404
+
+    return jsonify(_export_job_response(job))
+
+
+@dashboard_bp.route("/api/export/jobs/<job_id>/download")
+@login_required
+def download_export_job(job_id):
+    """Download the file written by a finished background export"""
+    job = job_runner.store.get(job_id)
+    if not job or job["kind"] != "export" or job["business_id"] != current_user.id:
+        return jsonify({"error": "Export job not found"}), 404
+
+    if job["status"] != "done":
+        return jsonify({"error": f"Export is {job['status']}"}), 409
+
+    _, mimetype, _, _ = exports.parse_format(job["params"]["format"])
+    return send_file(
+        os.path.join(job_runner.store.directory, job["output"]),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=job["filename"],
+    )
+
+
+def _export_job_response(job):
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "total": job["total"],
+        "error": job["error"],
+        "format": job["params"]["format"],
+        "period": job["params"]["period"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "status_url": url_for("dashboard.export_job_status", job_id=job["id"]),
+        "download_url": (
+            url_for("dashboard.download_export_job", job_id=job["id"])
+            if job["status"] == "done"
+            else None
+        ),
+    }
+
+
 @dashboard_bp.route("/api/qrcode")
 @login_required
 def generate_qr():
     """Generate QR code for feedback URL"""
     try:
-        # Get feedback URL (homepage)
-        feedback_url = request.url_root.rstrip("/")
+        feedback_url = url_for(
+            "feedback.index", slug=current_user.slug, _external=True
+        ).rstrip("/")
 
         # Generate QR code
         qr = qrcode.QRCode(
@@ -526,44 +857,14 @@ def generate_qr():
 
 @dashboard_bp.route("/api/summary")
 @login_required
+@conditional(lambda: current_user.id)
 def get_summary():
     """Get summary statistics for various time periods"""
     try:
-        now = datetime.utcnow()
-
-        def get_period_stats(start_date):
-            feedback_list = Feedback.query.filter(
-                Feedback.business_id == current_user.id,
-                Feedback.timestamp >= start_date,
-            ).all()
-
-            if not feedback_list:
-                return {"count": 0, "avg_rating": 0, "happy": 0, "neutral": 0, "sad": 0}
-
-            ratings = [f.overall_rating for f in feedback_list]
-            return {
-                "count": len(feedback_list),
-                "avg_rating": round(sum(ratings) / len(ratings), 2),
-                "happy": ratings.count(3),
-                "neutral": ratings.count(2),
-                "sad": ratings.count(1),
-            }
-
-        return jsonify(
-            {
-                "today": get_period_stats(
-                    now.replace(hour=0, minute=0, second=0, microsecond=0)
-                ),
-                "yesterday": get_period_stats(
-                    (now - timedelta(days=1)).replace(
-                        hour=0, minute=0, second=0, microsecond=0
-                    )
-                ),
-                "this_week": get_period_stats(now - timedelta(days=7)),
-                "this_month": get_period_stats(now - timedelta(days=30)),
-                "all_time": get_period_stats(datetime(2020, 1, 1)),
-            }
+        payload = result_cache.get_or_compute(
+            "summary", current_user.id, (), lambda: stats.summary(current_user.id)
         )
+        return jsonify(payload)
 
     except Exception as e:
         print(f"Error getting summary: {e}")
@@ -575,190 +876,36 @@ def get_summary():
 
 @dashboard_bp.route("/api/analytics")
 @login_required
+@conditional(lambda: current_user.id)
 def get_analytics():
     """
     Get detailed analytics data
 
     Query params:
     - period: 7, 30, 90, or 'all' (days)
+    - fields: comma-separated sections to compute (default: all of
+      stats.ANALYTICS_FIELDS)
     """
+    try:
+        fields = _choices_param("fields", stats.ANALYTICS_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         period = request.args.get("period", "30")
 
-        # Calculate date range
-        if period == "all":
-            start_date = datetime(2020, 1, 1)
+        if current_app.config["ANALYTICS_ENGINE"] == "columnar":
+            compute = columnar.analytics
         else:
-            days = int(period)
-            start_date = datetime.utcnow() - timedelta(days=days)
-
-        # Get feedback for period
-        feedback_list = (
-            Feedback.query.filter(
-                Feedback.business_id == current_user.id,
-                Feedback.timestamp >= start_date,
-            )
-            .order_by(Feedback.timestamp.asc())
-            .all()
-        )
-
-        if not feedback_list:
-            return jsonify(
-                {
-                    "sentiment": {"happy": 0, "neutral": 0, "sad": 0},
-                    "trends": [],
-                    "nps_distribution": [0] * 11,
-                    "category_trends": [],
-                    "activity": {
-                        "busiest_day": "N/A",
-                        "busiest_hour": "N/A",
-                        "avg_per_day": 0,
-                        "response_rate": 0,
-                    },
-                    "recent_comments": [],
-                }
-            )
+            compute = stats.analytics
 
-        # Sentiment breakdown
-        sentiment = {
-            "happy": len([f for f in feedback_list if f.overall_rating == 3]),
-            "neutral": len([f for f in feedback_list if f.overall_rating == 2]),
-            "sad": len([f for f in feedback_list if f.overall_rating == 1]),
-        }
-
-        # Daily trends (group by day)
-        daily_data = defaultdict(lambda: {"ratings": [], "count": 0})
-        for f in feedback_list:
-            day_key = f.timestamp.strftime("%Y-%m-%d")
-            daily_data[day_key]["ratings"].append(f.overall_rating)
-            daily_data[day_key]["count"] += 1
-
-        # Create trend data (last N days)
-        days_to_show = min(int(period) if period != "all" else 30, 30)
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        trends = []
-
-        for i in range(days_to_show):
-            day = today - timedelta(days=days_to_show - 1 - i)
-            day_key = day.strftime("%Y-%m-%d")
-            data = daily_data[day_key]
-
-            avg_rating = (
-                sum(data["ratings"]) / len(data["ratings"]) if data["ratings"] else 0
-            )
-            trends.append(
-                {"date": day.strftime("%m/%d"), "avg_rating": round(avg_rating, 2)}
-            )
-
-        # NPS distribution
-        nps_distribution = [0] * 11
-        for f in feedback_list:
-            if f.nps_score is not None:
-                nps_distribution[f.nps_score] += 1
-
-        # Category trends over time
-        category_daily = defaultdict(
-            lambda: {
-                "food": [],
-                "service": [],
-                "staff": [],
-                "cleanliness": [],
-                "value": [],
-            }
-        )
-
-        for f in feedback_list:
-            day_key = f.timestamp.strftime("%Y-%m-%d")
-            if f.food_rating:
-                category_daily[day_key]["food"].append(f.food_rating)
-            if f.service_rating:
-                category_daily[day_key]["service"].append(f.service_rating)
-            if f.staff_rating:
-                category_daily[day_key]["staff"].append(f.staff_rating)
-            if f.cleanliness_rating:
-                category_daily[day_key]["cleanliness"].append(f.cleanliness_rating)
-            if f.value_rating:
-                category_daily[day_key]["value"].append(f.value_rating)
-
-        category_trends = []
-        for i in range(days_to_show):
-            day = today - timedelta(days=days_to_show - 1 - i)
-            day_key = day.strftime("%Y-%m-%d")
-            data = category_daily[day_key]
-
-            def avg(lst):
-                return round(sum(lst) / len(lst), 2) if lst else 0
-
-            category_trends.append(
-                {
-                    "date": day.strftime("%m/%d"),
-                    "food": avg(data["food"]),
-                    "service": avg(data["service"]),
-                    "staff": avg(data["staff"]),
-                    "cleanliness": avg(data["cleanliness"]),
-                    "value": avg(data["value"]),
-                }
-            )
-
-        # Activity analysis
-        day_counts = defaultdict(int)
-        hour_counts = defaultdict(int)
-
-        for f in feedback_list:
-            day_name = f.timestamp.strftime("%A")
-            hour = f.timestamp.hour
-            day_counts[day_name] += 1
-            hour_counts[hour] += 1
-
-        busiest_day = (
-            max(day_counts.items(), key=lambda x: x[1])[0] if day_counts else "N/A"
-        )
-        busiest_hour = (
-            max(hour_counts.items(), key=lambda x: x[1])[0] if hour_counts else "N/A"
-        )
-
-        if busiest_hour != "N/A":
-            busiest_hour = f"{busiest_hour}:00 - {busiest_hour + 1}:00"
-
-        # Calculate days in period
-        days_in_period = (datetime.utcnow() - start_date).days or 1
-        avg_per_day = len(feedback_list) / days_in_period
-
-        # Response rate (feedback with reviewed status)
-        reviewed_count = len([f for f in feedback_list if f.reviewed])
-        response_rate = (
-            round((reviewed_count / len(feedback_list)) * 100) if feedback_list else 0
-        )
-
-        # Recent comments (last 10 with comments)
-        recent_with_comments = [
-            f for f in reversed(feedback_list) if f.comment and f.comment.strip()
-        ][:10]
-
-        recent_comments = [
-            {
-                "comment": f.comment,
-                "rating": f.overall_rating,
-                "timestamp": f.timestamp.isoformat(),
-            }
-            for f in recent_with_comments
-        ]
-
-        return jsonify(
-            {
-                "sentiment": sentiment,
-                "trends": trends,
-                "nps_distribution": nps_distribution,
-                "category_trends": category_trends,
-                "activity": {
-                    "busiest_day": busiest_day,
-                    "busiest_hour": busiest_hour,
-                    "avg_per_day": round(avg_per_day, 1),
-                    "response_rate": response_rate,
-                },
-                "recent_comments": recent_comments,
-            }
+        payload = result_cache.get_or_compute(
+            "analytics",
+            current_user.id,
+            (period, fields),
+            lambda: compute(current_user.id, period, fields=fields),
         )
+        return jsonify(payload)
 
     except Exception as e:
         print(f"Error getting analytics: {e}")
@@ -0,0 +1,147 @@
+"""
+Live dashboard updates over Server-Sent Events
+
+/dashboard/api/stream starts with a "snapshot" event (the /api/stats payload
+plus the raw counters behind it) and then sends one "feedback" event per new
+row; dashboard.js applies each row to its counters. Event ids are feedback
+ids, so a reconnecting EventSource resumes after the last row it saw
+(Last-Event-ID) instead of taking a new snapshot.
+
+New rows are found by reading feedback with an id above the stream's
+high-water mark. Writers in this process publish to the in-process broker to
+wake their business's streams immediately; rows written by other workers are
+picked up by polling every STREAM_POLL_SECONDS.
+
+Each stream holds a worker thread, so streams end after STREAM_MAX_SECONDS
+(below gunicorn's default 30s worker timeout) and the browser reconnects.
+Deployments with many open dashboards should run gunicorn with threaded
+(gthread) workers.
+"""
+
+import json
+import queue
+import threading
+import time
+
+from sqlalchemy import func, select
+
+from models import db, Feedback
+import exports
+import stats
+
+# Messages published to subscribers
+NEW_FEEDBACK = "feedback"
+RESYNC = "resync"
+
+
+class EventBroker:
+    """In-process pub/sub of per-business messages"""
+
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, business_id):
+        subscriber = queue.Queue(maxsize=self.maxsize)
+        with self._lock:
+            self._subscribers.setdefault(business_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, business_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(business_id, set())
+            subscribers.discard(subscriber)
+            if not subscribers:
+                self._subscribers.pop(business_id, None)
+
+    def publish(self, business_id, message=NEW_FEEDBACK):
+        with self._lock:
+            subscribers = list(self._subscribers.get(business_id, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                # A stream that far behind re-reads the table anyway
+                pass
+
+    def subscriber_count(self, business_id):
+        with self._lock:
+            return len(self._subscribers.get(business_id, ()))
+
+
+broker = EventBroker()
+
+
+def sse(event, data, event_id=None):
+    """Encode one Server-Sent Event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def latest_feedback_id(business_id):
+    return (
+        db.session.execute(
+            select(func.max(Feedback.id)).where(Feedback.business_id == business_id)
+        ).scalar()
+        or 0
+    )
+
+
+def feedback_after(business_id, last_id, limit=500):
+    """Rows with an id above the high-water mark, oldest first"""
+    return db.session.execute(
+        select(*exports.EXPORT_COLUMNS)
+        .where(Feedback.business_id == business_id, Feedback.id > last_id)
+        .order_by(Feedback.id)
+        .limit(limit)
+    ).all()
+
+
+def snapshot(business_id):
+    """(high-water mark, snapshot event) taken at the same row"""
+    last_id = latest_feedback_id(business_id)
+    payload = stats.dashboard_stats(business_id, max_id=last_id, counters=True)
+    db.session.rollback()
+    return last_id, sse("snapshot", payload, last_id)
+
+
+def stream(business_id, last_id=None, max_seconds=25, poll_seconds=2):
+    """Generate the event stream for one dashboard connection"""
+    subscriber = broker.subscribe(business_id)
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield "retry: 1000\n\n"
+        if last_id is None:
+            last_id, event = snapshot(business_id)
+            yield event
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                message = subscriber.get(timeout=min(poll_seconds, remaining))
+            except queue.Empty:
+                message = None
+
+            if message == RESYNC:
+                last_id, event = snapshot(business_id)
+                yield event
+                continue
+
+            rows = feedback_after(business_id, last_id)
+            # End the read transaction so the next poll sees new commits
+            db.session.rollback()
+            for row in rows:
+                last_id = row.id
+                yield sse("feedback", exports.row_dict(row), row.id)
+            if not rows:
+                yield ": keepalive\n\n"
+    finally:
+        broker.unsubscribe(business_id, subscriber)
+        db.session.rollback()
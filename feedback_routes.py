@@ -1,25 +1,140 @@
-from flask import Blueprint, render_template, request, jsonify, session
-from models import db, Business, Feedback
-from datetime import datetime, timedelta
+from flask import Blueprint, render_template, request, jsonify, current_app, url_for
+from models import db, Feedback
+from datetime import datetime, timedelta, timezone
+import math
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from types import SimpleNamespace
+import rollup
+from cache import result_cache
+from ingest import ingest_queue
+import idempotency
+from ratelimit import rate_limiter, client_ip, client_key, wait_minutes
+from tenants import tenant_cache
+from events import broker
+from conditional import conditional
 
 feedback_bp = Blueprint('feedback', __name__)
 
-@feedback_bp.route('/')
-def index():
+def validate_rating(value, min_val, max_val):
+    if value is None:
+        return None
+    try:
+        val = int(value)
+        if min_val <= val <= max_val:
+            return val
+    except:
+        pass
+    return None
+
+def feedback_values(data):
+    """
+    Validate a feedback payload
+
+    Returns (column values, None) or (None, error message)
+    """
+    # Validate required fields
+    overall_rating = data.get('overall_rating')
+    if not overall_rating or overall_rating not in [1, 2, 3]:
+        return None, 'Invalid overall rating'
+
+    # Validate optional ratings
+    return {
+        'overall_rating': overall_rating,
+        'food_rating': validate_rating(data.get('food_rating'), 1, 5),
+        'service_rating': validate_rating(data.get('service_rating'), 1, 5),
+        'staff_rating': validate_rating(data.get('staff_rating'), 1, 5),
+        'cleanliness_rating': validate_rating(data.get('cleanliness_rating'), 1, 5),
+        'value_rating': validate_rating(data.get('value_rating'), 1, 5),
+        'nps_score': validate_rating(data.get('nps_score'), 0, 10),
+        'comment': (data.get('comment') or '').strip()[:200] or None
+    }, None
+
+def client_timestamp(value, now, max_age):
+    """
+    Parse a client-recorded ISO timestamp into naive UTC
+
+    Returns (timestamp, None) or (None, error message). Missing timestamps
+    mean "now"; small clock skew into the future is clamped to now.
+    """
+    if value is None:
+        return now, None
+    try:
+        timestamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None, 'Invalid timestamp'
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    if timestamp > now + timedelta(minutes=5):
+        return None, 'Timestamp is in the future'
+    if timestamp < now - max_age:
+        return None, 'Timestamp is too old'
+    return min(timestamp, now), None
+
+def replayed_response(replay):
+    status_code, payload = replay
+    response = jsonify(payload)
+    response.status_code = status_code
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def feedback_limits(business):
+    """Rate limit buckets (key, limit, window) a submission spends from"""
+    minutes = business.settings.feedback_cooldown_minutes
+    if minutes is None:
+        minutes = current_app.config['FEEDBACK_COOLDOWN_MINUTES']
+    if not minutes:
+        return []
+    window = minutes * 60
+    return [
+        (f'feedback:{business.id}:{client_key()}', 1, window),
+        (f'feedback-ip:{business.id}:{client_ip()}', current_app.config['FEEDBACK_IP_LIMIT'], window)
+    ]
+
+def feedback_ip_limit(business):
+    """The per-IP submission bucket, which batched submissions also spend from"""
+    limits = feedback_limits(business)
+    return limits[1] if limits else None
+
+def too_many_requests(retry_after):
+    minutes_left = wait_minutes(retry_after)
+    response = jsonify({
+        'error': f'Please wait {minutes_left} more minute(s) before submitting again'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
+# Every customer route is also served under /b/<slug>/ for one business;
+# the bare URLs serve the first business (single-tenant installs)
+def tenant_route(rule, **options):
+    def register(view):
+        feedback_bp.route(rule, defaults={'slug': None}, **options)(view)
+        feedback_bp.route('/b/<slug>' + rule, **options)(view)
+        return view
+    return register
+
+@tenant_route('/')
+def index(slug):
     """Customer feedback landing page"""
-    business = Business.query.first()
+    business = tenant_cache.resolve(slug)
     if not business:
+        if slug:
+            return "Business not found", 404
         return "Business not configured", 500
-    return render_template('customer/index.html', business=business)
+    api_base = url_for('feedback.index', slug=slug).rstrip('/')
+    return render_template('customer/index.html', business=business, api_base=api_base)
 
-@feedback_bp.route('/thankyou')
-def thankyou():
+@tenant_route('/thankyou')
+def thankyou(slug):
     """Thank you page after feedback submission"""
-    business = Business.query.first()
-    return render_template('customer/thankyou.html', business=business)
+    business = tenant_cache.resolve(slug)
+    if not business:
+        return "Business not found", 404
+    return render_template('customer/thankyou.html', business=business, slug=slug)
 
-@feedback_bp.route('/api/feedback', methods=['POST'])
-def submit_feedback():
+@tenant_route('/api/feedback', methods=['POST'])
+def submit_feedback(slug):
     """
     Submit customer feedback
 
@@ -35,113 +150,266 @@ def submit_feedback():
         "comment": "optional text"
     }
     """
+    limits = []
     try:
         data = request.get_json()
 
         if not data:
             return jsonify({'error': 'No data provided'}), 400
 
-        # Rate limiting check using session
-        last_feedback = session.get('last_feedback_time')
-        if last_feedback:
-            try:
-                last_time = datetime.fromisoformat(last_feedback)
-                cooldown = timedelta(minutes=5)
-                if datetime.utcnow() - last_time < cooldown:
-                    minutes_left = 5 - int((datetime.utcnow() - last_time).total_seconds() / 60)
-                    return jsonify({
-                        'error': f'Please wait {minutes_left} more minute(s) before submitting again'
-                    }), 429
-            except:
-                pass
-
-        # Get business (for single-tenant, it's the first one)
-        business = Business.query.first()
+        try:
+            idempotency_key = idempotency.parse_key(request.headers.get('Idempotency-Key'))
+        except idempotency.InvalidKey as e:
+            return jsonify({'error': str(e)}), 400
+
+        business = tenant_cache.resolve(slug)
         if not business:
             return jsonify({'error': 'Business not found'}), 404
 
-        # Validate required fields
-        overall_rating = data.get('overall_rating')
-        if not overall_rating or overall_rating not in [1, 2, 3]:
-            return jsonify({'error': 'Invalid overall rating'}), 400
-
-        # Validate optional ratings
-        def validate_rating(value, min_val, max_val):
-            if value is None:
-                return None
-            try:
-                val = int(value)
-                if min_val <= val <= max_val:
-                    return val
-            except:
-                pass
-            return None
-
-        # Create feedback entry
-        feedback = Feedback(
-            business_id=business.id,
-            overall_rating=overall_rating,
-            food_rating=validate_rating(data.get('food_rating'), 1, 5),
-            service_rating=validate_rating(data.get('service_rating'), 1, 5),
-            staff_rating=validate_rating(data.get('staff_rating'), 1, 5),
-            cleanliness_rating=validate_rating(data.get('cleanliness_rating'), 1, 5),
-            value_rating=validate_rating(data.get('value_rating'), 1, 5),
-            nps_score=validate_rating(data.get('nps_score'), 0, 10),
-            comment=data.get('comment', '').strip()[:200] or None
-        )
+        # A retry of a submission that was already stored gets the original
+        # response, even though it now falls inside the cooldown
+        if idempotency_key:
+            replay = idempotency.lookup(business.id, idempotency_key)
+            if replay:
+                return replayed_response(replay)
 
-        db.session.add(feedback)
-        db.session.commit()
+        # Server-side cooldown per device/IP and business, spent up front so
+        # concurrent submissions cannot share one token. Only stored
+        # submissions keep it spent: a rejected one is refunded and can be
+        # corrected and resent straight away.
+        limits = feedback_limits(business)
+        retry_after = rate_limiter.acquire(limits)
+        if retry_after:
+            limits = []
+            return too_many_requests(retry_after)
 
-        # Update session to prevent spam
-        session['last_feedback_time'] = datetime.utcnow().isoformat()
-        session.permanent = True
+        values, error = feedback_values(data)
+        if error:
+            rate_limiter.refund(limits)
+            return jsonify({'error': error}), 400
+        values['business_id'] = business.id
 
-        return jsonify({
+        # Keyed submissions are written synchronously so the key and the
+        # feedback row commit together
+        if ingest_queue.enabled and not idempotency_key:
+            # Write-behind: the row is inserted by the next batch flush
+            provisional_id = ingest_queue.enqueue(values)
+            if provisional_id:
+                return jsonify({
+                    'success': True,
+                    'message': 'Thank you for your feedback!',
+                    'provisional_id': provisional_id
+                }), 202
+
+        feedback = Feedback(**values)
+        db.session.add(feedback)
+        db.session.flush()
+        rollup.record_feedback(feedback)
+
+        payload = {
             'success': True,
             'message': 'Thank you for your feedback!',
             'feedback_id': feedback.id
-        }), 201
+        }
+        try:
+            # The key's INSERT runs straight away, so a concurrent retry can
+            # fail here as well as at commit
+            if idempotency_key:
+                idempotency.remember(business.id, idempotency_key, 201, payload, feedback.id)
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key committed first
+            db.session.rollback()
+            replay = idempotency_key and idempotency.lookup(business.id, idempotency_key)
+            if not replay:
+                raise
+            rate_limiter.refund(limits)
+            return replayed_response(replay)
+        result_cache.invalidate(business.id)
+        broker.publish(business.id)
+
+        return jsonify(payload), 201
 
     except Exception as e:
         db.session.rollback()
+        rate_limiter.refund(limits)
         print(f"Error submitting feedback: {e}")
         return jsonify({'error': 'An error occurred while submitting feedback'}), 500
 
-@feedback_bp.route('/api/feedback/check-limit', methods=['GET'])
-def check_limit():
-    """Check if user can submit feedback (rate limiting check)"""
-    last_feedback = session.get('last_feedback_time')
+@tenant_route('/api/feedback/batch', methods=['POST'])
+def submit_feedback_batch(slug):
+    """
+    Submit feedback collected while a kiosk was offline
 
-    if not last_feedback:
-        return jsonify({'can_submit': True, 'wait_minutes': 0})
+    Expected JSON payload:
+    {
+        "submissions": [
+            {"client_id": "...", "timestamp": "ISO 8601", ...feedback fields},
+            ...
+        ]
+    }
 
+    Each submission is validated like /api/feedback; the valid ones are
+    inserted together in one statement. The response lists a result per
+    submission, in order, so the client can drop the ones that were stored
+    and keep (or discard) the rejected ones. New items spend from the same
+    per-IP bucket as single submissions; those beyond it come back as
+    "limited" with a retry_after, for the client to resend later (429 when
+    nothing was stored).
+    """
+    data = request.get_json(silent=True)
+    submissions = data.get('submissions') if isinstance(data, dict) else data
+    if not isinstance(submissions, list) or not submissions:
+        return jsonify({'error': 'No submissions provided'}), 400
+
+    max_batch = current_app.config['FEEDBACK_BATCH_MAX']
+    if len(submissions) > max_batch:
+        return jsonify({'error': f'At most {max_batch} submissions per batch'}), 413
+
+    business = tenant_cache.resolve(slug)
+    if not business:
+        return jsonify({'error': 'Business not found'}), 404
+
+    limit = (f'feedback-batch:{business.id}:{client_ip()}',
+             current_app.config['FEEDBACK_BATCH_PER_MINUTE'], 60)
+    allowed, retry_after = rate_limiter.hit(*limit)
+    if not allowed:
+        return too_many_requests(retry_after)
+
+    now = datetime.utcnow()
+    max_age = timedelta(days=current_app.config['FEEDBACK_BATCH_MAX_AGE_DAYS'])
+    results, rows, keys = [], [], {}
+    for index, item in enumerate(submissions):
+        result = {'index': index}
+        if isinstance(item, dict) and item.get('client_id') is not None:
+            result['client_id'] = item['client_id']
+        results.append(result)
+
+        if not isinstance(item, dict):
+            result.update(status='rejected', error='Submission must be an object')
+            continue
+        try:
+            key = idempotency.parse_key(item.get('client_id'))
+        except idempotency.InvalidKey as e:
+            result.update(status='rejected', error=str(e))
+            continue
+        if key in keys:
+            result.update(status='rejected', error='Duplicate client_id in batch')
+            continue
+        values, error = feedback_values(item)
+        if not error:
+            timestamp, error = client_timestamp(item.get('timestamp'), now, max_age)
+        if error:
+            result.update(status='rejected', error=error)
+            continue
+
+        values.update(business_id=business.id, timestamp=timestamp, reviewed=False)
+        rows.append((result, values, key))
+        if key:
+            keys[key] = result
+
+    ip_limit = feedback_ip_limit(business)
+    taken, limited = 0, []
     try:
-        last_time = datetime.fromisoformat(last_feedback)
-        cooldown = timedelta(minutes=5)
-        time_diff = datetime.utcnow() - last_time
-
-        if time_diff < cooldown:
-            minutes_left = 5 - int(time_diff.total_seconds() / 60)
-            return jsonify({
-                'can_submit': False,
-                'wait_minutes': minutes_left
-            })
-    except:
-        pass
+        # client_ids double as idempotency keys: items stored by an earlier
+        # attempt of this batch (or by /api/feedback, whose payload differs)
+        # get their original result back
+        replayed = idempotency.lookup_many(business.id, keys)
+        for key, (_, payload) in replayed.items():
+            keys[key].update(status='created', feedback_id=payload.get('feedback_id'),
+                             replayed=True)
+        rows = [row for row in rows if not row[0].get('replayed')]
+
+        # Each new item spends from the same per-IP bucket as single
+        # submissions; items over the limit stay queued on the kiosk
+        if rows and ip_limit:
+            taken, retry_after = rate_limiter.take_up_to(*ip_limit, cost=len(rows))
+            rows, limited = rows[:taken], rows[taken:]
+            for result, _, _ in limited:
+                result.update(status='limited', error='Too many submissions, retry later',
+                              retry_after=math.ceil(retry_after))
+
+        if rows:
+            stmt = insert(Feedback).returning(Feedback.id, sort_by_parameter_order=True)
+            ids = db.session.scalars(stmt, [values for _, values, _ in rows]).all()
+            rollup.record_rows(SimpleNamespace(**values) for _, values, _ in rows)
+
+            for (result, _, _), feedback_id in zip(rows, ids):
+                result.update(status='created', feedback_id=feedback_id)
+            idempotency.remember_many(business.id, [
+                (key, 201, {'status': 'created', 'feedback_id': feedback_id}, feedback_id)
+                for (_, _, key), feedback_id in zip(rows, ids)
+                if key
+            ])
+        db.session.commit()
+        if rows:
+            result_cache.invalidate(business.id)
+            broker.publish(business.id)
+    except IntegrityError:
+        # Another attempt of the same batch committed first; retrying replays it
+        db.session.rollback()
+        rate_limiter.refund([ip_limit] if ip_limit else [], taken)
+        return jsonify({'error': 'Batch is already being processed, please retry'}), 409
+    except Exception as e:
+        db.session.rollback()
+        rate_limiter.refund([ip_limit] if ip_limit else [], taken)
+        print(f"Error submitting feedback batch: {e}")
+        return jsonify({'error': 'An error occurred while submitting feedback'}), 500
+
+    response = jsonify({
+        'success': True,
+        'created': len(rows),
+        'replayed': len(replayed),
+        'limited': len(limited),
+        'rejected': len(submissions) - len(rows) - len(replayed) - len(limited),
+        'results': results
+    })
+    if limited:
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        if not rows:
+            response.status_code = 429
+    return response
+
+@tenant_route('/api/feedback/check-limit', methods=['GET'])
+def check_limit(slug):
+    """Check if user can submit feedback (rate limiting check)"""
+    business = tenant_cache.resolve(slug)
+    if not business:
+        return jsonify({'can_submit': True, 'wait_minutes': 0})
+
+    retry_after = rate_limiter.retry_after(feedback_limits(business))
+    if retry_after:
+        return jsonify({
+            'can_submit': False,
+            'wait_minutes': wait_minutes(retry_after)
+        })
 
     return jsonify({'can_submit': True, 'wait_minutes': 0})
 
-@feedback_bp.route('/api/feedback/stats', methods=['GET'])
-def public_stats():
+def _tenant_id(slug):
+    tenant = tenant_cache.resolve(slug)
+    return tenant.id if tenant else None
+
+def _public_cache_control():
+    return f"public, max-age={current_app.config['PUBLIC_STATS_MAX_AGE']}"
+
+@tenant_route('/api/feedback/stats', methods=['GET'])
+@conditional(_tenant_id, cache_control=_public_cache_control)
+def public_stats(slug):
     """
     Optional: Public statistics endpoint
     Shows aggregate statistics without revealing individual feedback
     """
-    business = Business.query.first()
+    business = tenant_cache.resolve(slug)
     if not business:
         return jsonify({'error': 'Business not found'}), 404
 
+    payload = result_cache.get_or_compute(
+        'public_stats', business.id, (), lambda: _public_stats(business)
+    )
+    return jsonify(payload)
+
+def _public_stats(business):
     # Get last 30 days of feedback
     thirty_days_ago = datetime.utcnow() - timedelta(days=30)
     feedback_list = Feedback.query.filter(
@@ -150,11 +418,11 @@ def public_stats():
     ).all()
 
     if not feedback_list:
-        return jsonify({
+        return {
             'total_responses': 0,
             'average_rating': 0,
             'response_message': 'Be the first to leave feedback!'
-        })
+        }
 
     # Calculate average overall rating
     avg_rating = sum(f.overall_rating for f in feedback_list) / len(feedback_list)
@@ -167,9 +435,9 @@ def public_stats():
         detractors = len([s for s in nps_scores if s <= 6])
         nps = round(((promoters - detractors) / len(nps_scores)) * 100, 1)
 
-    return jsonify({
+    return {
         'total_responses': len(feedback_list),
         'average_rating': round(avg_rating, 2),
         'nps_score': nps,
         'business_name': business.name
-    })
+    }
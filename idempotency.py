@@ -0,0 +1,123 @@
+"""
+Idempotency keys for feedback submission
+
+Clients may send an Idempotency-Key header with /api/feedback (and a
+client_id per item with /api/feedback/batch). The key is stored in the same
+transaction as the feedback row together with the response that was sent,
+so a retry that reaches the server again gets that response back instead of
+creating a duplicate. Lookups go through the (business_id, key) unique index.
+
+Keys are kept for IDEMPOTENCY_KEY_TTL_HOURS; purge_expired() deletes older
+ones (run cleanup_idempotency_keys.py from cron).
+"""
+
+import json
+import re
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, insert, select
+
+from models import db, IdempotencyKey
+
+_VALID_KEY = re.compile(r"^[A-Za-z0-9_.:-]{1,64}$")
+
+
+class InvalidKey(ValueError):
+    pass
+
+
+def parse_key(value):
+    """Validated key from a header/field value, or None when not supplied"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not _VALID_KEY.match(value):
+        raise InvalidKey("Idempotency keys must be 1-64 letters, digits or -_.:")
+    return value
+
+
+def cutoff(now=None):
+    """Keys created before this are expired"""
+    hours = current_app.config["IDEMPOTENCY_KEY_TTL_HOURS"]
+    return (now or datetime.utcnow()) - timedelta(hours=hours)
+
+
+def lookup_many(business_id, keys, now=None):
+    """
+    Map each recorded key to (status code, response payload)
+
+    Expired keys that have not been purged yet are deleted in the current
+    transaction so the key can be recorded again.
+    """
+    if not keys:
+        return {}
+
+    rows = db.session.execute(
+        select(
+            IdempotencyKey.id,
+            IdempotencyKey.key,
+            IdempotencyKey.status_code,
+            IdempotencyKey.response_json,
+            IdempotencyKey.created_at,
+        ).where(
+            IdempotencyKey.business_id == business_id,
+            IdempotencyKey.key.in_(list(keys)),
+        )
+    ).all()
+
+    expires = cutoff(now)
+    found, expired = {}, []
+    for row in rows:
+        if row.created_at < expires:
+            expired.append(row.id)
+        else:
+            found[row.key] = (row.status_code, json.loads(row.response_json))
+    if expired:
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired)))
+    return found
+
+
+def lookup(business_id, key, now=None):
+    """(status code, response payload) recorded for key, or None"""
+    return lookup_many(business_id, [key], now).get(key)
+
+
+def remember(business_id, key, status_code, payload, feedback_id=None):
+    """
+    Record the response for a key in the current transaction
+
+    Committing raises IntegrityError when a concurrent request recorded the
+    same key first.
+    """
+    remember_many(business_id, [(key, status_code, payload, feedback_id)])
+
+
+def remember_many(business_id, entries):
+    """Record (key, status code, payload, feedback id) tuples in one statement"""
+    if not entries:
+        return
+    now = datetime.utcnow()
+    db.session.execute(
+        insert(IdempotencyKey),
+        [
+            {
+                "business_id": business_id,
+                "key": key,
+                "feedback_id": feedback_id,
+                "status_code": status_code,
+                "response_json": json.dumps(payload),
+                "created_at": now,
+            }
+            for key, status_code, payload, feedback_id in entries
+        ],
+    )
+
+
+def purge_expired(now=None):
+    """Delete expired keys and return how many were removed"""
+    result = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < cutoff(now))
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,213 @@
+"""
+Write-behind ingestion for customer feedback
+
+With FEEDBACK_INGEST_MODE = "queue", submit_feedback validates a submission,
+puts it on a bounded in-process queue and answers 202 straight away. A
+background writer flushes the queue in batches (one multi-row INSERT and one
+rollup update per day per batch) when FEEDBACK_INGEST_BATCH rows are waiting
+or FEEDBACK_INGEST_INTERVAL seconds have passed.
+
+When the queue is full, enqueue() declines the submission and
+submit_feedback writes it synchronously instead. Batches that cannot be
+written (database error, shutdown timeout) are appended to a local spill
+file and replayed on the next start. A hard kill can still lose up to one
+flush interval of submissions.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+
+from models import db, Feedback
+from cache import result_cache
+from events import broker
+import rollup
+
+_STOP = object()
+_COLUMNS = [column.key for column in Feedback.__table__.columns if column.key != "id"]
+
+
+def _full_row(values):
+    """Column values with every optional column present"""
+    row = {key: values.get(key) for key in _COLUMNS}
+    row["reviewed"] = bool(row["reviewed"])
+    return row
+
+
+class IngestQueue:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 200
+        self.flush_interval = 0.5
+        self.spill_path = None
+        self.flushed = 0
+        self.spilled = 0
+        self._queue = None
+        self._thread = None
+        self._spill_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get("FEEDBACK_INGEST_BATCH", self.batch_size)
+        self.flush_interval = app.config.get(
+            "FEEDBACK_INGEST_INTERVAL", self.flush_interval
+        )
+        self.spill_path = app.config.get("FEEDBACK_INGEST_SPILL") or os.path.join(
+            app.instance_path, "ingest_spill.ndjson"
+        )
+        os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+        if app.config.get("FEEDBACK_INGEST_MODE") == "queue":
+            self.start(app.config.get("FEEDBACK_INGEST_QUEUE_SIZE", 10000))
+
+    def start(self, maxsize=10000):
+        if self.enabled:
+            return
+        self.replay_spill()
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(
+            target=self._run, name="feedback-ingest", daemon=True
+        )
+        self._thread.start()
+        self.enabled = True
+        atexit.register(self.stop)
+
+    def stop(self, timeout=10):
+        """Flush everything still queued, spilling what cannot be written"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        if leftovers:
+            self._spill(leftovers)
+
+    def enqueue(self, values):
+        """
+        Queue one validated feedback row (a dict of Feedback column values)
+
+        Returns a provisional id, or None when the queue is full and the
+        caller should write the row itself.
+        """
+        values = _full_row(values)
+        values["timestamp"] = values["timestamp"] or datetime.utcnow()
+        try:
+            self._queue.put_nowait(values)
+        except queue.Full:
+            return None
+        return uuid.uuid4().hex
+
+    def pending(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def _run(self):
+        while True:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            stopping = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(
+                        timeout=max(deadline - time.monotonic(), 0.001)
+                    )
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self.write_batch(batch)
+            if stopping:
+                # Drain anything queued before the stop marker
+                rest = []
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        rest.append(item)
+                for i in range(0, len(rest), self.batch_size):
+                    self.write_batch(rest[i : i + self.batch_size])
+                return
+
+    def write_batch(self, batch):
+        """Insert a batch of rows in one transaction, spilling it on failure"""
+        batch = [_full_row(values) for values in batch]
+        with self.app.app_context():
+            try:
+                db.session.execute(insert(Feedback), batch)
+                rollup.record_rows(SimpleNamespace(**values) for values in batch)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error writing feedback batch: {e}")
+                self._spill(batch)
+                return False
+
+        for business_id in {values["business_id"] for values in batch}:
+            result_cache.invalidate(business_id)
+            broker.publish(business_id)
+        self.flushed += len(batch)
+        return True
+
+    def _spill(self, batch):
+        with self._spill_lock:
+            with open(self.spill_path, "a") as f:
+                for values in batch:
+                    record = dict(values, timestamp=values["timestamp"].isoformat())
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self.spilled += len(batch)
+
+    def replay_spill(self):
+        """Write rows left in the spill file by an earlier run"""
+        if not self.spill_path or not os.path.exists(self.spill_path):
+            return 0
+
+        # Workers starting together race for the file; one wins, the others
+        # find it gone
+        replay_path = f"{self.spill_path}.replay-{os.getpid()}"
+        with self._spill_lock:
+            try:
+                os.replace(self.spill_path, replay_path)
+            except FileNotFoundError:
+                return 0
+
+        with open(replay_path) as f:
+            batch = [json.loads(line) for line in f if line.strip()]
+        for values in batch:
+            values["timestamp"] = datetime.fromisoformat(values["timestamp"])
+
+        written = 0
+        for i in range(0, len(batch), self.batch_size):
+            chunk = batch[i : i + self.batch_size]
+            if self.write_batch(chunk):
+                written += len(chunk)
+        os.remove(replay_path)
+        if written:
+            print(f"✓ Replayed {written} spilled feedback submission(s)")
+        return written
+
+
+ingest_queue = IngestQueue()
@@ -1,5 +1,6 @@
 from app import app, db
 from models import Business
+from migrations import run_migrations
 
 
 def init_database():
@@ -8,6 +9,7 @@ def init_database():
         # Create all tables
         db.create_all()
         print("✓ Database tables created successfully")
+        run_migrations()
 
         # Check if business exists
         business_count = Business.query.count()
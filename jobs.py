@@ -0,0 +1,190 @@
+"""
+Background jobs
+
+Long-running work (large exports) runs on a small thread pool instead of
+holding a gunicorn worker for the whole request. Job state lives in JSON
+files under the instance directory so any worker can report a job's status
+and serve its output, whichever worker ran it.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class TooManyJobs(Exception):
+    pass
+
+
+class JobStore:
+    """Job records stored as <job id>.json files in one directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id):
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def output_path(self, job_id, extension):
+        return os.path.join(self.directory, f"{job_id}.{extension}")
+
+    def get(self, job_id):
+        if not _JOB_ID.match(job_id or ""):
+            return None
+        try:
+            with open(self._path(job_id)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, job):
+        job["updated_at"] = time.time()
+        tmp = self._path(job["id"]) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp, self._path(job["id"]))
+        return job
+
+    def update(self, job_id, **fields):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.update(fields)
+        return self.save(job)
+
+    def all(self):
+        jobs = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                job = self.get(name[: -len(".json")])
+                if job:
+                    jobs.append(job)
+        return jobs
+
+    def active(self, business_id, kind, stale_after=600):
+        """Queued/running jobs of a kind, ignoring ones that stopped reporting"""
+        now = time.time()
+        return [
+            job
+            for job in self.all()
+            if job["business_id"] == business_id
+            and job["kind"] == kind
+            and job["status"] in ("queued", "running")
+            and now - job["updated_at"] < stale_after
+        ]
+
+    def cleanup(self, max_age):
+        """Delete finished jobs (and their output) older than max_age seconds"""
+        now = time.time()
+        removed = 0
+        for job in self.all():
+            # Running jobs refresh updated_at as they report progress
+            if now - job["updated_at"] < max_age:
+                continue
+            if job.get("output"):
+                try:
+                    os.remove(os.path.join(self.directory, job["output"]))
+                except OSError:
+                    pass
+            try:
+                os.remove(self._path(job["id"]))
+            except OSError:
+                pass
+            removed += 1
+        return removed
+
+
+class JobRunner:
+    """Thread pool that runs job functions inside an app context"""
+
+    def __init__(self):
+        self.app = None
+        self.store = None
+        self.max_per_business = 2
+        self.ttl = 24 * 3600
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.store = JobStore(
+            app.config.get("JOB_DIR") or os.path.join(app.instance_path, "jobs")
+        )
+        self.max_per_business = app.config.get("JOBS_PER_BUSINESS", 2)
+        self.ttl = app.config.get("JOB_TTL_HOURS", 24) * 3600
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get("JOB_WORKERS", 2),
+            thread_name_prefix="feedback-job",
+        )
+
+    def submit(self, kind, business_id, params, fn):
+        """
+        Queue fn(job) and return the new job record
+
+        Raises TooManyJobs when the business already has max_per_business
+        jobs of this kind queued or running.
+        """
+        self.store.cleanup(self.ttl)
+
+        with self._lock:
+            if len(self.store.active(business_id, kind)) >= self.max_per_business:
+                raise TooManyJobs(
+                    f"Only {self.max_per_business} {kind} job(s) can run at once"
+                )
+            job = self.store.save(
+                {
+                    "id": uuid.uuid4().hex,
+                    "kind": kind,
+                    "business_id": business_id,
+                    "params": params,
+                    "status": "queued",
+                    "progress": 0,
+                    "total": None,
+                    "output": None,
+                    "error": None,
+                    "created_at": datetime.utcnow().isoformat(),
+                    "finished_at": None,
+                }
+            )
+
+        future = self._executor.submit(self._run, job["id"], fn)
+        self._futures[job["id"]] = future
+        future.add_done_callback(lambda f: self._futures.pop(job["id"], None))
+        return job
+
+    def _run(self, job_id, fn):
+        with self.app.app_context():
+            job = self.store.update(job_id, status="running")
+            try:
+                fn(job)
+                self.store.update(
+                    job_id, status="done", finished_at=datetime.utcnow().isoformat()
+                )
+            except Exception as e:
+                print(f"Error running job {job_id}: {e}")
+                traceback.print_exc()
+                self.store.update(
+                    job_id,
+                    status="failed",
+                    error=str(e),
+                    finished_at=datetime.utcnow().isoformat(),
+                )
+
+    def wait(self, job_id, timeout=None):
+        """Block until a job started by this process finishes (for tests/scripts)"""
+        future = self._futures.get(job_id)
+        if future:
+            future.result(timeout)
+
+
+job_runner = JobRunner()
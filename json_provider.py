@@ -0,0 +1,62 @@
+"""
+Faster JSON responses
+
+jsonify() goes through app.json. When orjson is installed, FastJSONProvider
+encodes with it instead of the standard library; otherwise it behaves like
+Flask's DefaultJSONProvider. Values orjson would encode differently from
+Flask (datetimes, which Flask writes as HTTP dates) and values it does not
+know (Decimal, __html__ objects) go through the same default() hook, so
+responses keep their meaning either way.
+
+Unlike the stdlib output, keys are not sorted and non-ASCII text is written
+as UTF-8 rather than \\u escapes. Both decode to the same values.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+def dumps_bytes(obj, default=DefaultJSONProvider.default):
+    """Compact UTF-8 JSON for obj, with orjson when available"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=ORJSON_OPTIONS)
+    return json.dumps(
+        obj, default=default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider that encodes with orjson when it is installed"""
+
+    ensure_ascii = False
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        # Formatting options (indent, separators, ...) need the stdlib
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return dumps_bytes(obj, self.default).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            dumps_bytes(obj, self.default) + b"\n", mimetype=self.mimetype
+        )
@@ -0,0 +1,154 @@
+"""
+Versioned schema migrations
+
+db.create_all() only creates missing tables; it never changes existing ones.
+Schema changes to existing tables are registered here with @migration and
+applied once, in version order, by run_migrations(). Applied versions are
+recorded in the schema_migrations table.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Business, Feedback, FeedbackDailyRollup, unique_slug
+import rollup
+import search
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+
+    return register
+
+
+def _create_index(name):
+    """Create one of the indexes declared on the Feedback model, if missing"""
+    index = next(i for i in Feedback.__table__.indexes if i.name == name)
+    index.create(db.session.connection(), checkfirst=True)
+
+
+# ==================== MIGRATIONS ====================
+
+
+@migration(1, "Backfill feedback_daily_rollup for existing feedback")
+def backfill_rollups():
+    if FeedbackDailyRollup.query.first() is None and Feedback.query.first() is not None:
+        rollup.rebuild()
+
+
+@migration(2, "Composite and partial indexes for dashboard queries")
+def dashboard_indexes():
+    for name in (
+        "ix_feedback_business_timestamp",
+        "ix_feedback_business_rating_timestamp",
+        "ix_feedback_unreviewed",
+    ):
+        _create_index(name)
+
+
+@migration(3, "Business slugs for multi-tenant customer URLs")
+def business_slugs():
+    conn = db.session.connection()
+    columns = {c["name"] for c in inspect(conn).get_columns("business")}
+    if "slug" not in columns:
+        conn.execute(text("ALTER TABLE business ADD COLUMN slug VARCHAR(80)"))
+    index = next(i for i in Business.__table__.indexes if i.name == "ix_business_slug")
+    index.create(conn, checkfirst=True)
+
+    rows = conn.execute(
+        text("SELECT id, name FROM business WHERE slug IS NULL ORDER BY id")
+    ).all()
+    for business_id, name in rows:
+        conn.execute(
+            text("UPDATE business SET slug = :slug WHERE id = :id"),
+            {"slug": unique_slug(conn, name), "id": business_id},
+        )
+
+
+@migration(4, "Business auth_version for session revocation")
+def business_auth_version():
+    conn = db.session.connection()
+    columns = {c["name"] for c in inspect(conn).get_columns("business")}
+    if "auth_version" not in columns:
+        conn.execute(
+            text(
+                "ALTER TABLE business ADD COLUMN auth_version INTEGER NOT NULL DEFAULT 0"
+            )
+        )
+
+
+@migration(5, "Feedback (business_id, id) index for high-water marks")
+def feedback_business_id_index():
+    _create_index("ix_feedback_business_id")
+
+
+@migration(6, "Full-text index for comment search")
+def comment_search_index():
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        _create_index("ix_feedback_comment_search")
+    else:
+        search.install(conn)
+
+
+# ==================== RUNNER ====================
+
+
+def applied_versions():
+    if not inspect(db.engine).has_table("schema_migrations"):
+        return set()
+    return {
+        row[0]
+        for row in db.session.execute(text("SELECT version FROM schema_migrations"))
+    }
+
+
+def run_migrations(verbose=True):
+    """Apply pending migrations in order. Returns the versions applied."""
+    db.session.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, "
+            "description VARCHAR(200) NOT NULL, "
+            "applied_at TIMESTAMP NOT NULL)"
+        )
+    )
+    db.session.commit()
+
+    done = applied_versions()
+    applied = []
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            fn()
+            db.session.execute(
+                text(
+                    "INSERT INTO schema_migrations (version, description, applied_at) "
+                    "VALUES (:version, :description, :applied_at)"
+                ),
+                {
+                    "version": version,
+                    "description": description,
+                    "applied_at": datetime.utcnow(),
+                },
+            )
+            db.session.commit()
+        except IntegrityError:
+            # Another worker applied this version while we were starting up
+            db.session.rollback()
+            continue
+        except Exception:
+            db.session.rollback()
+            raise
+        applied.append(version)
+        if verbose:
+            print(f"✓ Migration {version}: {description}")
+    return applied
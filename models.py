@@ -1,8 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, select
+from sqlalchemy.orm import object_session
 from datetime import datetime
 import json
+import re
 
 db = SQLAlchemy()
 
@@ -16,26 +19,73 @@ class Business(UserMixin, db.Model):
     password_hash = db.Column(db.String(200), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     settings_json = db.Column(db.Text, default="{}")
+    # Public identifier in customer URLs (/b/<slug>/) and QR codes. Assigned
+    # on insert and kept when the business is renamed so printed codes work.
+    slug = db.Column(db.String(80), unique=True, index=True)
+    # Bumped when the password or login email changes; sessions carry the
+    # version they were issued for (see principals.py)
+    auth_version = db.Column(db.Integer, nullable=False, default=0)
 
     # Relationship
     feedback = db.relationship(
         "Feedback", backref="business", lazy=True, cascade="all, delete-orphan"
     )
 
+    def get_id(self):
+        return f"{self.id}:{self.auth_version or 0}"
+
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+    @property
+    def settings(self):
+        """Typed settings with defaults filled in (see business_settings.py)"""
+        from business_settings import parse_settings
+
+        return parse_settings(self.settings_json)
+
     def get_settings(self):
-        try:
-            return json.loads(self.settings_json)
-        except:
-            return {}
+        return self.settings.to_dict()
 
     def set_settings(self, settings_dict):
-        self.settings_json = json.dumps(settings_dict)
+        """Replace all settings; raises SettingsError for invalid values"""
+        from business_settings import validate_patch
+
+        cleaned = validate_patch(settings_dict)
+        self.settings_json = json.dumps(
+            {name: value for name, value in cleaned.items() if value is not None}
+        )
+
+
+def slugify(name):
+    slug = re.sub(r"[^a-z0-9]+", "-", (name or "").lower()).strip("-")
+    return slug[:60] or "business"
+
+
+def unique_slug(connection, name, reserved=()):
+    """A slug for name that no business uses (or is about to use) yet"""
+    base = slugify(name)
+    taken = set(reserved) | set(
+        connection.execute(
+            select(Business.slug).where(Business.slug.like(base + "%"))
+        ).scalars()
+    )
+    slug, n = base, 2
+    while slug in taken:
+        slug, n = f"{base}-{n}", n + 1
+    return slug
+
+
+@event.listens_for(Business, "before_insert")
+def _assign_slug(mapper, connection, business):
+    if not business.slug:
+        # Businesses inserted in the same flush are not in the table yet
+        pending = object_session(business).new
+        reserved = {b.slug for b in pending if isinstance(b, Business) and b.slug}
+        business.slug = unique_slug(connection, business.name, reserved)
 
 
 class Feedback(db.Model):
@@ -60,6 +110,33 @@ class Feedback(db.Model):
     # Management
     reviewed = db.Column(db.Boolean, default=False)
 
+    # Every dashboard query filters on business_id first. Existing databases
+    # get these through migrations.py.
+    __table_args__ = (
+        db.Index("ix_feedback_business_timestamp", business_id, timestamp),
+        # MAX(id) per business: live stream high-water marks and ETags
+        db.Index("ix_feedback_business_id", business_id, id),
+        db.Index(
+            "ix_feedback_business_rating_timestamp",
+            business_id,
+            overall_rating,
+            timestamp,
+        ),
+        db.Index(
+            "ix_feedback_unreviewed",
+            business_id,
+            timestamp,
+            sqlite_where=reviewed == db.false(),
+            postgresql_where=reviewed == db.false(),
+        ),
+        # Comment search (see search.py); SQLite uses an FTS5 table instead
+        db.Index(
+            "ix_feedback_comment_search",
+            db.text("to_tsvector('english', coalesce(comment, ''))"),
+            postgresql_using="gin",
+        ).ddl_if(dialect="postgresql"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -74,3 +151,74 @@ class Feedback(db.Model):
             "comment": self.comment,
             "reviewed": self.reviewed,
         }
+
+
+# Rating categories collected alongside the overall rating
+CATEGORIES = ["food", "service", "staff", "cleanliness", "value"]
+
+# overall_rating value -> sentiment bucket
+SENTIMENT = {3: "happy", 2: "neutral", 1: "sad"}
+
+
+class FeedbackDailyRollup(db.Model):
+    """
+    Per-business, per-day (UTC) aggregates of the feedback table.
+
+    Kept up to date by the routes that write feedback (see rollup.py) so the
+    dashboard can read one small row per day instead of every feedback row.
+    Weekday counts are not stored: every row of a day shares the same weekday.
+    """
+
+    __tablename__ = "feedback_daily_rollup"
+
+    business_id = db.Column(db.Integer, db.ForeignKey("business.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    rating_sum = db.Column(db.Integer, nullable=False, default=0)
+    happy = db.Column(db.Integer, nullable=False, default=0)
+    neutral = db.Column(db.Integer, nullable=False, default=0)
+    sad = db.Column(db.Integer, nullable=False, default=0)
+    reviewed = db.Column(db.Integer, nullable=False, default=0)
+
+
+# Category sums/counts (food_sum, food_count, ...), the NPS histogram
+# (nps_0 .. nps_10) and the hour-of-day histogram (hour_0 .. hour_23)
+ROLLUP_COUNTERS = ["count", "rating_sum", "happy", "neutral", "sad", "reviewed"]
+for _name in (
+    [f"{cat}_{part}" for cat in CATEGORIES for part in ("sum", "count")]
+    + [f"nps_{i}" for i in range(11)]
+    + [f"hour_{i}" for i in range(24)]
+):
+    setattr(
+        FeedbackDailyRollup, _name, db.Column(db.Integer, nullable=False, default=0)
+    )
+    ROLLUP_COUNTERS.append(_name)
+del _name
+
+
+class IdempotencyKey(db.Model):
+    """
+    Response recorded for a client-supplied Idempotency-Key
+
+    A retried submission with the same key gets this response back instead of
+    creating another feedback row. Keys are unique per business and are
+    purged after IDEMPOTENCY_KEY_TTL_HOURS (see idempotency.py).
+    """
+
+    __tablename__ = "idempotency_key"
+
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey("business.id"), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    # Not a foreign key: the response stays replayable after the feedback
+    # row itself is deleted
+    feedback_id = db.Column(db.Integer)
+    status_code = db.Column(db.Integer, nullable=False)
+    response_json = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(business_id, key, name="uq_idempotency_business_key"),
+        db.Index("ix_idempotency_created_at", created_at),
+    )
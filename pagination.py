@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination for feedback listings
+
+A cursor is an opaque token holding the sort mode and the sort-key values of
+the last row on the previous page. The next page is fetched with a WHERE
+clause on those values instead of an OFFSET, so every page costs the same
+no matter how deep it is.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from models import Feedback
+
+# sort mode -> [(column, descending)], always ending in the unique id
+SORT_KEYS = {
+    "newest": [(Feedback.timestamp, True), (Feedback.id, True)],
+    "oldest": [(Feedback.timestamp, False), (Feedback.id, False)],
+    "rating_high": [
+        (Feedback.overall_rating, True),
+        (Feedback.timestamp, True),
+        (Feedback.id, True),
+    ],
+    "rating_low": [
+        (Feedback.overall_rating, False),
+        (Feedback.timestamp, True),
+        (Feedback.id, True),
+    ],
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def order_by_clauses(sort_order):
+    keys = SORT_KEYS.get(sort_order, SORT_KEYS["newest"])
+    return [column.desc() if desc else column.asc() for column, desc in keys]
+
+
+def encode_cursor(sort_order, row):
+    values = []
+    for column, _ in SORT_KEYS[sort_order]:
+        value = getattr(row, column.key)
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    token = json.dumps({"s": sort_order, "k": values}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(token.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort_order, cursor):
+    """Return the key values stored in cursor, validated against sort_order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        keys = SORT_KEYS[data["s"]]
+        if data["s"] != sort_order or len(data["k"]) != len(keys):
+            raise InvalidCursor("Cursor does not match the requested sort order")
+        return [
+            (
+                datetime.fromisoformat(value)
+                if column is Feedback.timestamp
+                else int(value)
+            )
+            for (column, _), value in zip(keys, data["k"])
+        ]
+    except InvalidCursor:
+        raise
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def after_cursor(sort_order, values):
+    """WHERE clause selecting the rows that sort after values"""
+    keys = SORT_KEYS[sort_order]
+    clauses = []
+    for i, (column, desc) in enumerate(keys):
+        equal = [keys[j][0] == values[j] for j in range(i)]
+        beyond = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
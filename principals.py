@@ -0,0 +1,103 @@
+"""
+Cached principals for authenticated dashboard requests
+
+Flask-Login calls load_user on every request, and dashboard.js makes several
+API calls per page. Instead of loading the full Business row each time,
+load_user returns a Principal: a snapshot of the fields the dashboard reads,
+cached per process for PRINCIPAL_CACHE_TTL seconds. Routes that write load
+the ORM object themselves (see current_business in dashboard_routes.py).
+
+Session ids have the form "<business id>:<auth_version>". Changing the
+password or login email bumps auth_version, so sessions issued before the
+change stop loading (on other workers once their cached snapshot expires).
+Ids without a version, from sessions created before versioning, count as
+version 0.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+
+from models import db, Business
+
+_FIELDS = ("id", "name", "email", "slug", "created_at", "auth_version")
+
+
+class Principal(UserMixin):
+    """Read-only view of the logged-in business"""
+
+    def __init__(self, id, name, email, slug, created_at, auth_version):
+        self.id = id
+        self.name = name
+        self.email = email
+        self.slug = slug
+        self.created_at = created_at
+        self.auth_version = auth_version
+
+    def get_id(self):
+        return f"{self.id}:{self.auth_version}"
+
+    def check_password(self, password):
+        return db.session.get(Business, self.id).check_password(password)
+
+
+def parse_user_id(user_id):
+    """(business id, auth version) from a session id"""
+    business_id, _, version = str(user_id).partition(":")
+    return int(business_id), int(version or 0)
+
+
+class PrincipalCache:
+    """LRU + TTL cache of business id -> Principal"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("PRINCIPAL_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("PRINCIPAL_CACHE_TTL", self.ttl)
+
+    def get(self, business_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(business_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(business_id)
+                return entry[1]
+
+        row = (
+            Business.query.with_entities(*(getattr(Business, f) for f in _FIELDS))
+            .filter(Business.id == business_id)
+            .first()
+        )
+        principal = Principal(*row) if row else None
+
+        with self._lock:
+            self._entries[business_id] = (now + self.ttl, principal)
+            self._entries.move_to_end(business_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return principal
+
+    def load_user(self, user_id):
+        """Flask-Login user loader: None when the session's version is stale"""
+        try:
+            business_id, version = parse_user_id(user_id)
+        except ValueError:
+            return None
+        principal = self.get(business_id)
+        if principal is None or principal.auth_version != version:
+            return None
+        return principal
+
+    def invalidate(self, business_id):
+        with self._lock:
+            self._entries.pop(business_id, None)
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,190 @@
+"""
+Chunked deletes: the danger-zone delete-all and the retention policy
+
+One DELETE of every matching row holds SQLite's write lock (blocking
+customer submissions) until it finishes, and on PostgreSQL makes one huge
+transaction. delete_in_chunks() instead deletes PURGE_CHUNK_SIZE rows per
+transaction, each through bulk.delete_rows() so the rollup stays exact, and
+pauses PURGE_CHUNK_PAUSE seconds between chunks to let other writers in.
+An interrupted run leaves a consistent, partially purged table; running it
+again finishes the job.
+
+Delete-all runs as a background job (kind "delete") and only removes rows
+that existed when it was requested, so feedback arriving meanwhile is kept.
+
+The retention policy (purge_old_feedback.py, meant for cron) removes
+feedback older than RETENTION_MONTHS. With RETENTION_MODE=archive the rows
+are first appended to a gzipped NDJSON file per business under
+RETENTION_ARCHIVE_DIR, in the export's row format. The archive is written
+before each chunk commits, so a failed commit can leave rows that are both
+archived and still present; the next run archives them again.
+"""
+
+import gzip
+import os
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from cache import result_cache
+from json_provider import dumps_bytes
+from models import db, Business, Feedback
+import bulk
+import events
+import exports
+
+# Deleted rows carry the export columns (for archives) plus business_id (for
+# the rollup)
+DELETE_COLUMNS = exports.EXPORT_COLUMNS + [Feedback.business_id]
+
+
+def delete_in_chunks(business_id, conditions, progress=None, archive=None):
+    """
+    Delete a business's feedback matching conditions, one chunk at a time
+
+    progress is called with the running total after each chunk; archive is
+    a binary file that deleted rows are appended to as NDJSON. Returns the
+    number of rows deleted.
+    """
+    chunk_size = current_app.config["PURGE_CHUNK_SIZE"]
+    pause = current_app.config["PURGE_CHUNK_PAUSE"]
+
+    deleted = 0
+    while True:
+        chunk = (
+            select(Feedback.id)
+            .where(Feedback.business_id == business_id, *conditions)
+            .limit(chunk_size)
+        )
+        rows = bulk.delete_rows(
+            business_id, [Feedback.id.in_(chunk.scalar_subquery())], DELETE_COLUMNS
+        )
+        if archive is not None and rows:
+            archive.write(
+                b"".join(
+                    dumps_bytes(exports.row_dict(row[: len(exports.EXPORT_COLUMNS)]))
+                    + b"\n"
+                    for row in rows
+                )
+            )
+            archive.flush()
+        db.session.commit()
+
+        deleted += len(rows)
+        if rows:
+            result_cache.invalidate(business_id, rewrite=True)
+            if progress is not None:
+                progress(deleted)
+        if len(rows) < chunk_size:
+            return deleted
+        time.sleep(pause)
+
+
+# ==================== DELETE-ALL JOB ====================
+
+
+def delete_all_params(business_id):
+    """Job params for deleting a business's feedback as of now"""
+    max_id = db.session.execute(
+        select(func.max(Feedback.id)).where(Feedback.business_id == business_id)
+    ).scalar()
+    return {"max_id": max_id or 0}
+
+
+def run_delete_all_job(job):
+    """Background job: delete a business's feedback up to params["max_id"]"""
+    from jobs import job_runner
+
+    store = job_runner.store
+    business_id = job["business_id"]
+    scope = [Feedback.id <= job["params"]["max_id"]]
+
+    total = db.session.execute(
+        select(func.count()).where(Feedback.business_id == business_id, *scope)
+    ).scalar()
+    store.update(job["id"], total=total)
+
+    deleted = 0
+
+    def progress(count):
+        nonlocal deleted
+        deleted = count
+        store.update(job["id"], progress=count)
+
+    try:
+        delete_in_chunks(business_id, scope, progress=progress)
+    except Exception as e:
+        # Committed chunks stay deleted; only the failed one is rolled back
+        db.session.rollback()
+        raise RuntimeError(
+            f"Deleted {deleted} of {total} feedback items before failing: {e}"
+        ) from e
+    finally:
+        events.broker.publish(business_id, events.RESYNC)
+
+
+# ==================== RETENTION ====================
+
+
+def retention_cutoff(months, now=None):
+    """The same day and time months calendar months before now"""
+    now = now or datetime.utcnow()
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    month += 1
+    # Clamp to the last day of a shorter month (e.g. 31 March -> 28 February)
+    next_month = datetime(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - datetime(year, month, 1)).days
+    return now.replace(year=year, month=month, day=min(now.day, last_day))
+
+
+def archive_path(business_id, cutoff):
+    directory = current_app.config.get("RETENTION_ARCHIVE_DIR") or os.path.join(
+        current_app.instance_path, "archive"
+    )
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(
+        directory, f"feedback-{business_id}-before-{cutoff:%Y-%m-%d}.ndjson.gz"
+    )
+
+
+def purge_old_feedback(now=None):
+    """
+    Apply the retention policy to every business
+
+    Returns {business_id: rows removed} for businesses that had old
+    feedback; an empty dict when RETENTION_MONTHS is 0. Raises ValueError
+    for an unknown RETENTION_MODE.
+    """
+    months = current_app.config["RETENTION_MONTHS"]
+    if not months:
+        return {}
+    mode = current_app.config["RETENTION_MODE"]
+    if mode not in ("delete", "archive"):
+        # Never fall back to deleting when archiving was probably meant
+        raise ValueError(f"RETENTION_MODE must be delete or archive, not {mode!r}")
+    cutoff = retention_cutoff(months, now)
+    scope = [Feedback.timestamp < cutoff]
+    archiving = mode == "archive"
+
+    removed = {}
+    for business_id in db.session.execute(select(Business.id)).scalars().all():
+        has_old = db.session.execute(
+            select(Feedback.id)
+            .where(Feedback.business_id == business_id, *scope)
+            .limit(1)
+        ).first()
+        if not has_old:
+            continue
+
+        if archiving:
+            # Appending adds a gzip member; readers see one continuous file
+            with gzip.open(archive_path(business_id, cutoff), "ab") as archive:
+                removed[business_id] = delete_in_chunks(
+                    business_id, scope, archive=archive
+                )
+        else:
+            removed[business_id] = delete_in_chunks(business_id, scope)
+        events.broker.publish(business_id, events.RESYNC)
+    return removed
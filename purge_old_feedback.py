@@ -0,0 +1,20 @@
+from app import app
+import purge
+
+
+def purge_old_feedback():
+    """Apply the RETENTION_MONTHS / RETENTION_MODE retention policy"""
+    with app.app_context():
+        if not app.config["RETENTION_MONTHS"]:
+            print("✓ RETENTION_MONTHS is 0, keeping all feedback")
+            return
+        removed = purge.purge_old_feedback()
+        verb = "archived" if app.config["RETENTION_MODE"] == "archive" else "deleted"
+        print(
+            f"✓ {sum(removed.values())} feedback item(s) {verb} "
+            f"for {len(removed)} business(es)"
+        )
+
+
+if __name__ == "__main__":
+    purge_old_feedback()
@@ -0,0 +1,242 @@
+"""
+Server-side rate limiting
+
+Each limited action keeps a token bucket per key (for example one business
+and one device). A bucket holds `limit` tokens and refills completely over
+`window` seconds, so limit=1 is a plain cooldown and larger limits allow
+short bursts. A bucket is two numbers, so a check is O(1), and buckets that
+have refilled completely carry no state and are dropped.
+
+Buckets live either in process memory or in a small SQLite file shared by
+every worker on the host (RATE_LIMIT_BACKEND=sqlite).
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+
+_DEVICE_TOKEN = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def _refill(tokens, updated_at, limit, window, now):
+    return min(limit, tokens + (now - updated_at) * limit / window)
+
+
+def _take(tokens, limit, window, cost):
+    """
+    (allowed, tokens left, seconds until allowed) for a bucket
+
+    A negative cost gives tokens back, up to the bucket's limit.
+    """
+    if tokens >= cost:
+        return True, min(limit, tokens - cost), 0
+    return False, tokens, (cost - tokens) * window / limit
+
+
+class MemoryLimiterStore:
+    """Per-process buckets, least recently used first"""
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, limit, window, cost, now, spend=True, partial=False):
+        with self._lock:
+            # Buckets untouched for longer than their window are full again
+            while self._buckets:
+                oldest = next(iter(self._buckets.values()))
+                if now - oldest[1] < oldest[2]:
+                    break
+                self._buckets.popitem(last=False)
+
+            tokens, updated_at, _ = self._buckets.get(key, (limit, now, window))
+            tokens = _refill(tokens, updated_at, limit, window, now)
+            if partial:
+                cost = min(cost, math.floor(tokens))
+            allowed, tokens, retry_after = _take(tokens, limit, window, cost)
+            if allowed and spend:
+                self._buckets[key] = (tokens, now, window)
+                self._buckets.move_to_end(key)
+            return (cost if partial else allowed), retry_after
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+
+class SQLiteLimiterStore:
+    """Buckets shared between worker processes through a SQLite file"""
+
+    def __init__(self, path, purge_every=500):
+        self.path = path
+        self.purge_every = purge_every
+        self._calls = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, "
+                "tokens REAL NOT NULL, updated_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_rate_limits_expires_at "
+                "ON rate_limits (expires_at)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5, isolation_level=None)
+
+    def consume(self, key, limit, window, cost, now, spend=True, partial=False):
+        conn = self._connect()
+        try:
+            # Take the write lock up front so concurrent workers serialize
+            conn.execute("BEGIN IMMEDIATE")
+            self._calls += 1
+            if self._calls % self.purge_every == 0:
+                conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limits WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = _refill(*row, limit, window, now) if row else limit
+            if partial:
+                cost = min(cost, math.floor(tokens))
+            allowed, tokens, retry_after = _take(tokens, limit, window, cost)
+            if allowed and spend:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tokens, updated_at, expires_at) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                    "tokens = excluded.tokens, updated_at = excluded.updated_at, "
+                    "expires_at = excluded.expires_at",
+                    (key, tokens, now, now + window),
+                )
+            conn.execute("COMMIT")
+            return (cost if partial else allowed), retry_after
+        except Exception:
+            # BEGIN IMMEDIATE itself may have failed (e.g. database is locked)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def reset(self, key=None):
+        with self._connect() as conn:
+            if key is None:
+                conn.execute("DELETE FROM rate_limits")
+            else:
+                conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+class RateLimiter:
+    """Token-bucket rate limiter with a pluggable bucket store"""
+
+    def __init__(self):
+        self.enabled = True
+        self.store = MemoryLimiterStore()
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RATE_LIMIT_ENABLED", True)
+
+        if app.config.get("RATE_LIMIT_BACKEND") == "sqlite":
+            path = app.config.get("RATE_LIMIT_PATH") or os.path.join(
+                app.instance_path, "rate_limits.db"
+            )
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.store = SQLiteLimiterStore(path)
+
+    def hit(self, key, limit, window, cost=1):
+        """
+        Spend cost tokens from the bucket for key
+
+        Returns (allowed, retry_after seconds). Nothing is spent when the
+        bucket does not hold enough tokens.
+        """
+        if not self.enabled:
+            return True, 0
+        return self.store.consume(key, limit, window, cost, time.time())
+
+    def peek(self, key, limit, window):
+        """Whether a hit would be allowed now, without spending anything"""
+        if not self.enabled:
+            return True, 0
+        return self.store.consume(key, limit, window, 1, time.time(), spend=False)
+
+    def retry_after(self, limits):
+        """
+        Seconds until every (key, limit, window) bucket allows a hit
+
+        0 when all of them allow one now. Only for display: checking with
+        retry_after() and spending later lets concurrent requests through
+        together, so limited actions use acquire().
+        """
+        return max((self.peek(*limit)[1] for limit in limits), default=0)
+
+    def acquire(self, limits, cost=1):
+        """
+        Spend cost tokens from every (key, limit, window) bucket, or none
+
+        Each bucket is checked and spent in one step, so concurrent requests
+        cannot all pass on the same token. Returns 0 when allowed, otherwise
+        the seconds until the refusing bucket allows it; buckets already
+        spent from are refunded.
+        """
+        for i, limit in enumerate(limits):
+            allowed, retry_after = self.hit(*limit, cost=cost)
+            if not allowed:
+                self.refund(limits[:i], cost)
+                return retry_after
+        return 0
+
+    def take_up_to(self, key, limit, window, cost):
+        """
+        Spend as many of cost tokens as the bucket holds, in one step
+
+        Returns (tokens taken, seconds until the next token when fewer
+        than cost were taken, else 0).
+        """
+        if not self.enabled:
+            return cost, 0
+        taken, _ = self.store.consume(
+            key, limit, window, cost, time.time(), partial=True
+        )
+        if taken == cost:
+            return taken, 0
+        return taken, self.peek(key, limit, window)[1]
+
+    def refund(self, limits, cost=1):
+        """Give back tokens spent by acquire() for an attempt that should not count"""
+        for limit in limits:
+            self.hit(*limit, cost=-cost)
+
+    def reset(self, key=None):
+        """Forget one bucket (or all of them)"""
+        self.store.reset(key)
+
+
+def client_ip():
+    """Address of the client (see PROXY_COUNT for deployments behind proxies)"""
+    return request.remote_addr or "unknown"
+
+
+def client_key():
+    """The device token sent by kiosks/browsers, falling back to the client IP"""
+    token = request.headers.get("X-Device-Token", "")
+    if _DEVICE_TOKEN.match(token):
+        return "device:" + token
+    return "ip:" + client_ip()
+
+
+def wait_minutes(retry_after):
+    return max(1, math.ceil(retry_after / 60))
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,15 @@
+from app import app
+from models import Business
+import rollup
+
+
+def rebuild_rollups():
+    """Recompute feedback_daily_rollup from the raw feedback table"""
+    with app.app_context():
+        for business in Business.query.all():
+            days = rollup.rebuild(business.id)
+            print(f"✓ {business.name}: {days} day(s) rolled up")
+
+
+if __name__ == "__main__":
+    rebuild_rollups()
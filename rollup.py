@@ -0,0 +1,317 @@
+"""
+Daily feedback rollups
+
+Every write to the feedback table goes through one of the helpers below in
+the same transaction, so feedback_daily_rollup always matches the raw rows.
+The read helpers return per-day "buckets" (plain dicts of counters) that the
+dashboard endpoints aggregate instead of loading Feedback objects.
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    db,
+    Feedback,
+    FeedbackDailyRollup,
+    CATEGORIES,
+    SENTIMENT,
+    ROLLUP_COUNTERS,
+)
+
+# Feedback columns needed to compute a row's contribution
+ROW_COLUMNS = [
+    Feedback.business_id,
+    Feedback.timestamp,
+    Feedback.overall_rating,
+    Feedback.food_rating,
+    Feedback.service_rating,
+    Feedback.staff_rating,
+    Feedback.cleanliness_rating,
+    Feedback.value_rating,
+    Feedback.nps_score,
+    Feedback.reviewed,
+]
+
+
+def empty_bucket():
+    return dict.fromkeys(ROLLUP_COUNTERS, 0)
+
+
+def feedback_deltas(f, sign=1):
+    """Counter deltas contributed by one feedback row (ORM object or row tuple)"""
+    deltas = {"count": sign, "rating_sum": sign * f.overall_rating}
+
+    sentiment = SENTIMENT.get(f.overall_rating)
+    if sentiment:
+        deltas[sentiment] = sign
+
+    for cat in CATEGORIES:
+        value = getattr(f, f"{cat}_rating")
+        if value is not None:
+            deltas[f"{cat}_sum"] = sign * value
+            deltas[f"{cat}_count"] = sign
+
+    if f.nps_score is not None:
+        deltas[f"nps_{f.nps_score}"] = sign
+
+    deltas[f"hour_{f.timestamp.hour}"] = sign
+
+    if f.reviewed:
+        deltas["reviewed"] = sign
+
+    return deltas
+
+
+def add_to_bucket(bucket, deltas):
+    for key, value in deltas.items():
+        bucket[key] += value
+
+
+# ==================== WRITE PATH ====================
+
+
+def apply_deltas(business_id, day, deltas):
+    """Add deltas to the (business_id, day) rollup row, creating it if needed"""
+    values = {
+        key: getattr(FeedbackDailyRollup, key) + value for key, value in deltas.items()
+    }
+    stmt = (
+        update(FeedbackDailyRollup)
+        .where(
+            FeedbackDailyRollup.business_id == business_id,
+            FeedbackDailyRollup.day == day,
+        )
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.session.execute(stmt).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            row = FeedbackDailyRollup(business_id=business_id, day=day)
+            for key in ROLLUP_COUNTERS:
+                setattr(row, key, deltas.get(key, 0))
+            db.session.add(row)
+    except IntegrityError:
+        # Another transaction created the row first
+        db.session.execute(stmt)
+
+
+def record_feedback(feedback, sign=1):
+    """Account for a newly inserted (sign=1) or deleted (sign=-1) feedback row"""
+    apply_deltas(
+        feedback.business_id,
+        feedback.timestamp.date(),
+        feedback_deltas(feedback, sign),
+    )
+
+
+def record_rows(rows, sign=1):
+    """Account for many inserted/deleted rows, one rollup update per day"""
+    buckets = {}
+    for row in rows:
+        key = (row.business_id, row.timestamp.date())
+        if key not in buckets:
+            buckets[key] = empty_bucket()
+        add_to_bucket(buckets[key], feedback_deltas(row, sign))
+
+    for (business_id, day), bucket in buckets.items():
+        deltas = {key: value for key, value in bucket.items() if value}
+        if deltas:
+            apply_deltas(business_id, day, deltas)
+
+
+def record_review_toggle(feedback):
+    """Account for a reviewed flag that has just been flipped on feedback"""
+    apply_deltas(
+        feedback.business_id,
+        feedback.timestamp.date(),
+        {"reviewed": 1 if feedback.reviewed else -1},
+    )
+
+
+def record_review_changes(rows, reviewed):
+    """
+    Account for reviewed flags set to reviewed on many rows at once
+
+    rows need business_id and timestamp, and must only include rows whose
+    flag actually changed. One rollup update per day.
+    """
+    days = {}
+    for row in rows:
+        key = (row.business_id, row.timestamp.date())
+        days[key] = days.get(key, 0) + 1
+
+    sign = 1 if reviewed else -1
+    for (business_id, day), count in days.items():
+        apply_deltas(business_id, day, {"reviewed": sign * count})
+
+
+def clear_business(business_id):
+    FeedbackDailyRollup.query.filter_by(business_id=business_id).delete()
+
+
+def rebuild(business_id=None, batch_size=1000):
+    """
+    Recompute rollups from the raw feedback table
+
+    Returns the number of rollup rows written.
+    """
+    rollup_query = FeedbackDailyRollup.query
+    feedback_query = db.session.query(*ROW_COLUMNS)
+    if business_id is not None:
+        rollup_query = rollup_query.filter_by(business_id=business_id)
+        feedback_query = feedback_query.filter(Feedback.business_id == business_id)
+
+    buckets = {}
+    for row in feedback_query.yield_per(batch_size):
+        key = (row.business_id, row.timestamp.date())
+        if key not in buckets:
+            buckets[key] = empty_bucket()
+        add_to_bucket(buckets[key], feedback_deltas(row))
+
+    rollup_query.delete()
+    db.session.bulk_insert_mappings(
+        FeedbackDailyRollup,
+        [
+            dict(bucket, business_id=bid, day=day)
+            for (bid, day), bucket in buckets.items()
+        ],
+    )
+    db.session.commit()
+    return len(buckets)
+
+
+# ==================== READ PATH ====================
+
+
+def _row_to_bucket(row):
+    return {key: getattr(row, key) for key in ROLLUP_COUNTERS}
+
+
+def _is_midnight(dt):
+    return dt == datetime.combine(dt.date(), datetime.min.time())
+
+
+def partial_day_bucket(business_id, start):
+    """Aggregate raw feedback from start until the end of start's day"""
+    bucket = empty_bucket()
+    end = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+    rows = db.session.query(*ROW_COLUMNS).filter(
+        Feedback.business_id == business_id,
+        Feedback.timestamp >= start,
+        Feedback.timestamp < end,
+    )
+    for row in rows:
+        add_to_bucket(bucket, feedback_deltas(row))
+    return bucket
+
+
+def daily_buckets(business_id, start):
+    """
+    Per-day buckets covering feedback with timestamp >= start
+
+    Returns an OrderedDict of date -> bucket in ascending day order. Days
+    without a rollup row are omitted. When start is not midnight its day is
+    only partially in the window, so that bucket is computed from raw rows.
+    """
+    buckets = OrderedDict()
+    query = FeedbackDailyRollup.query.filter(
+        FeedbackDailyRollup.business_id == business_id
+    )
+
+    if _is_midnight(start):
+        query = query.filter(FeedbackDailyRollup.day >= start.date())
+    else:
+        partial = partial_day_bucket(business_id, start)
+        if partial["count"]:
+            buckets[start.date()] = partial
+        query = query.filter(FeedbackDailyRollup.day > start.date())
+
+    for row in query.order_by(FeedbackDailyRollup.day.asc()):
+        if row.count:
+            buckets[row.day] = _row_to_bucket(row)
+    return buckets
+
+
+def daily_counts(business_id, start):
+    """
+    Like daily_buckets, but only each day's feedback count
+
+    Reads two columns per rollup row instead of every counter.
+    """
+    counts = OrderedDict()
+    query = db.session.query(FeedbackDailyRollup.day, FeedbackDailyRollup.count).filter(
+        FeedbackDailyRollup.business_id == business_id
+    )
+
+    if _is_midnight(start):
+        query = query.filter(FeedbackDailyRollup.day >= start.date())
+    else:
+        end = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+        partial = (
+            db.session.query(func.count())
+            .filter(
+                Feedback.business_id == business_id,
+                Feedback.timestamp >= start,
+                Feedback.timestamp < end,
+            )
+            .scalar()
+        )
+        if partial:
+            counts[start.date()] = partial
+        query = query.filter(FeedbackDailyRollup.day > start.date())
+
+    for day, count in query.order_by(FeedbackDailyRollup.day.asc()):
+        if count:
+            counts[day] = count
+    return counts
+
+
+def window_totals(business_id, start):
+    """Summed bucket for feedback with timestamp >= start, aggregated in SQL"""
+    query = db.session.query(
+        *[
+            func.coalesce(func.sum(getattr(FeedbackDailyRollup, key)), 0)
+            for key in ROLLUP_COUNTERS
+        ]
+    ).filter(FeedbackDailyRollup.business_id == business_id)
+
+    if _is_midnight(start):
+        query = query.filter(FeedbackDailyRollup.day >= start.date())
+        totals = empty_bucket()
+    else:
+        query = query.filter(FeedbackDailyRollup.day > start.date())
+        totals = partial_day_bucket(business_id, start)
+
+    add_to_bucket(totals, dict(zip(ROLLUP_COUNTERS, query.one())))
+    return totals
+
+
+def sum_buckets(buckets):
+    totals = empty_bucket()
+    for bucket in buckets:
+        add_to_bucket(totals, bucket)
+    return totals
+
+
+def nps_score(bucket):
+    """Net Promoter Score for a bucket (0 when nobody answered)"""
+    answered = sum(bucket[f"nps_{i}"] for i in range(11))
+    if not answered:
+        return 0
+    promoters = bucket["nps_9"] + bucket["nps_10"]
+    detractors = sum(bucket[f"nps_{i}"] for i in range(7))
+    return round(((promoters - detractors) / answered) * 100, 1)
+
+
+def average(bucket, field="rating"):
+    """Average overall rating ("rating") or category rating for a bucket"""
+    count = bucket["count"] if field == "rating" else bucket[f"{field}_count"]
+    return round(bucket[f"{field}_sum"] / count, 2) if count else 0
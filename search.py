@@ -0,0 +1,120 @@
+"""
+Full-text search over feedback comments
+
+SQLite keeps an FTS5 index in the feedback_fts virtual table. It is an
+external-content table over feedback.comment, kept in sync by triggers, so
+every write path (the feedback form, batches, the ingest queue, deletes)
+updates it without knowing about it. PostgreSQL uses a GIN index on
+to_tsvector('english', comment) and needs no upkeep.
+
+Queries are reduced to their words, all of which must match (in any
+order); the last word also matches as a prefix, so partial input finds
+results while typing. Both backends stem English words, so "waiters"
+matches "waiter". Matches are ranked by relevance: bm25 on SQLite,
+ts_rank on PostgreSQL.
+"""
+
+import re
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    func,
+    literal_column,
+    select,
+    text,
+)
+
+from models import db, Feedback
+
+# Words of a query; everything else (FTS5/tsquery operators included) is
+# dropped, so user input can never be a syntax error
+WORD = re.compile(r"\w+")
+MAX_TERMS = 8
+
+FTS_TABLE = Table(
+    "feedback_fts",
+    MetaData(),
+    Column("rowid", Integer, primary_key=True),
+    Column("comment", Text),
+)
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts USING fts5("
+    "comment, content='feedback', content_rowid='id', "
+    "tokenize='porter unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_insert AFTER INSERT ON feedback "
+    "BEGIN "
+    "INSERT INTO feedback_fts (rowid, comment) VALUES (new.id, new.comment); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_delete AFTER DELETE ON feedback "
+    "BEGIN "
+    "INSERT INTO feedback_fts (feedback_fts, rowid, comment) "
+    "VALUES ('delete', old.id, old.comment); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS feedback_fts_update AFTER UPDATE OF comment "
+    "ON feedback BEGIN "
+    "INSERT INTO feedback_fts (feedback_fts, rowid, comment) "
+    "VALUES ('delete', old.id, old.comment); "
+    "INSERT INTO feedback_fts (rowid, comment) VALUES (new.id, new.comment); "
+    "END",
+]
+
+
+def install(conn):
+    """Create the SQLite index and its triggers and index existing comments"""
+    if conn.dialect.name != "sqlite":
+        return
+    for statement in SQLITE_DDL:
+        conn.execute(text(statement))
+    conn.execute(text("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')"))
+
+
+def terms(q):
+    """The words of a search query (at most MAX_TERMS), lowercased"""
+    return [word.lower() for word in WORD.findall(q or "")][:MAX_TERMS]
+
+
+def _tsvector():
+    # Must match the ix_feedback_comment_search expression for the index
+    # to be used
+    return func.to_tsvector(
+        literal_column("'english'"),
+        func.coalesce(Feedback.comment, literal_column("''")),
+    )
+
+
+def apply(query, words):
+    """
+    Restrict a Feedback query to comments matching words
+
+    Returns (query, rank): rank is an expression to order by for relevance,
+    best matches first when sorted ascending.
+    """
+    if db.session.get_bind().dialect.name == "postgresql":
+        tsquery = func.to_tsquery(
+            literal_column("'english'"),
+            " & ".join(words[:-1] + [words[-1] + ":*"]),
+        )
+        return (
+            query.filter(_tsvector().op("@@")(tsquery)),
+            -func.ts_rank(_tsvector(), tsquery),
+        )
+
+    # FTS5: quoted strings are plain terms; * makes the last one a prefix
+    match = " ".join(f'"{word}"' for word in words) + "*"
+    matches = (
+        # bm25() directly costs less per match than the rank column
+        select(
+            FTS_TABLE.c.rowid, func.bm25(literal_column("feedback_fts")).label("rank")
+        )
+        .where(literal_column("feedback_fts").op("MATCH")(match))
+        .subquery("matches")
+    )
+    # "+ 0" keeps SQLite from looking matches up by rowid, one feedback row
+    # at a time (which it picks for COUNT(*)): the MATCH always drives the
+    # join and feedback rows are then found by primary key
+    return query.join(matches, matches.c.rowid + 0 == Feedback.id), matches.c.rank
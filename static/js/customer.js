@@ -11,6 +11,37 @@ let feedbackData = {
 
 let currentQuestion = 0;
 
+// '' on the bare URLs, '/b/<slug>' when the page is served for one business
+const API_BASE = document.querySelector('[data-api-base]')?.dataset.apiBase || '';
+
+// Sent as the Idempotency-Key so a retried submission is only stored once
+const submissionKey = newClientId();
+
+// Identifies this device to the server-side cooldown, so kiosks sharing the
+// restaurant's IP address are limited separately
+const deviceToken = getDeviceToken();
+
+function getDeviceToken() {
+    try {
+        let token = localStorage.getItem('feedback-device-token');
+        if (!token) {
+            token = newClientId();
+            localStorage.setItem('feedback-device-token', token);
+        }
+        return token;
+    } catch (error) {
+        return null;
+    }
+}
+
+function requestHeaders(extra = {}) {
+    const headers = { 'Content-Type': 'application/json', ...extra };
+    if (deviceToken) {
+        headers['X-Device-Token'] = deviceToken;
+    }
+    return headers;
+}
+
 function startFeedback() {
     showQuestion(1);
 }
@@ -132,11 +163,9 @@ async function submitFeedback() {
     console.log('Submitting feedback:', feedbackData); // Debug log
     
     try {
-        const response = await fetch('/api/feedback', {
+        const response = await fetch(`${API_BASE}/api/feedback`, {
             method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
+            headers: requestHeaders({ 'Idempotency-Key': submissionKey }),
             body: JSON.stringify(feedbackData)
         });
         
@@ -148,16 +177,132 @@ async function submitFeedback() {
         document.getElementById('loading').classList.add('hidden');
         
         if (response.ok) {
-            document.querySelectorAll('.feedback-card').forEach(card => {
-                card.classList.add('hidden');
-            });
-            document.getElementById('thank-you').classList.remove('hidden');
+            showThankYou();
         } else {
             alert(result.error || 'Something went wrong. Please try again.');
         }
     } catch (error) {
         console.error('Error submitting feedback:', error); // Debug log
         document.getElementById('loading').classList.add('hidden');
-        alert('Network error. Please check your connection and try again.');
+        
+        // Offline: keep the feedback on this device and send it later
+        try {
+            await queueOfflineFeedback(feedbackData, submissionKey);
+            showThankYou();
+        } catch (queueError) {
+            console.error('Error queueing feedback:', queueError);
+            alert('Network error. Please check your connection and try again.');
+        }
     }
 }
+
+function showThankYou() {
+    document.querySelectorAll('.feedback-card').forEach(card => {
+        card.classList.add('hidden');
+    });
+    document.getElementById('thank-you').classList.remove('hidden');
+}
+
+// ---------------------------------------------------------------------------
+// Offline queue
+//
+// Feedback that cannot be sent is stored in IndexedDB with the time it was
+// given, then replayed through /api/feedback/batch when the kiosk is back
+// online. Entries are removed once the server has stored them (now or on an
+// earlier attempt) or rejected them; network and server errors leave them
+// queued for the next attempt.
+// ---------------------------------------------------------------------------
+
+const OFFLINE_DB = 'feedback-hero';
+const OFFLINE_STORE = 'pending-feedback';
+const OFFLINE_BATCH_SIZE = 50;
+const OFFLINE_RETRY_MS = 60000;
+
+let flushingOfflineQueue = false;
+
+function openOfflineDB() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(OFFLINE_DB, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(OFFLINE_STORE, { keyPath: 'client_id' });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function offlineTransaction(mode, work) {
+    return openOfflineDB().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(OFFLINE_STORE, mode);
+        const result = work(tx.objectStore(OFFLINE_STORE));
+        tx.oncomplete = () => {
+            db.close();
+            resolve(result && 'result' in result ? result.result : undefined);
+        };
+        tx.onerror = () => {
+            db.close();
+            reject(tx.error);
+        };
+    }));
+}
+
+function newClientId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+}
+
+function queueOfflineFeedback(data, clientId) {
+    // The request may have reached the server before the connection dropped;
+    // reusing its key as client_id keeps the replay from storing it twice
+    const entry = {
+        ...data,
+        client_id: clientId,
+        timestamp: new Date().toISOString()
+    };
+    return offlineTransaction('readwrite', store => store.put(entry));
+}
+
+async function flushOfflineQueue() {
+    if (flushingOfflineQueue || !navigator.onLine || !window.indexedDB) return;
+    flushingOfflineQueue = true;
+    
+    try {
+        while (true) {
+            const pending = await offlineTransaction('readonly', store =>
+                store.getAll(null, OFFLINE_BATCH_SIZE)
+            );
+            if (!pending || pending.length === 0) break;
+            
+            const response = await fetch(`${API_BASE}/api/feedback/batch`, {
+                method: 'POST',
+                headers: requestHeaders(),
+                body: JSON.stringify({ submissions: pending })
+            });
+            if (!response.ok) {
+                console.error('Offline feedback batch failed:', response.status);
+                break;
+            }
+            
+            const result = await response.json();
+            const done = result.results
+                .filter(item => item.status === 'created' || item.status === 'rejected')
+                .map(item => item.client_id);
+            await offlineTransaction('readwrite', store => {
+                done.forEach(clientId => store.delete(clientId));
+            });
+            
+            console.log(`Sent ${result.created} queued feedback entries`); // Debug log
+            if (done.length === 0) break;
+        }
+    } catch (error) {
+        console.error('Error sending queued feedback:', error);
+    } finally {
+        flushingOfflineQueue = false;
+    }
+}
+
+window.addEventListener('online', flushOfflineQueue);
+window.addEventListener('load', flushOfflineQueue);
+setInterval(flushOfflineQueue, OFFLINE_RETRY_MS);
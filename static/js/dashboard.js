@@ -11,68 +11,25 @@ if (dateElement) {
 
 let chart = null;
 
+// One request for everything a page needs on load; see /dashboard/api/bootstrap
+async function fetchBootstrap(sections) {
+    const response = await fetch(`/dashboard/api/bootstrap?sections=${sections}`);
+    
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    
+    return response.json();
+}
+
 async function loadDashboardData() {
     try {
         console.log('Loading dashboard data...'); // Debug log
-        const response = await fetch('/dashboard/api/stats');
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
-        }
-        
-        const data = await response.json();
+        const data = await fetchBootstrap('stats');
         console.log('Dashboard data received:', data); // Debug log
         
-        // Update stats
-        document.getElementById('today-count').textContent = data.today.count;
-        document.getElementById('today-avg').textContent = data.today.avg_rating.toFixed(1);
-        
-        document.getElementById('week-count').textContent = data.week.count;
-        document.getElementById('week-avg').textContent = data.week.avg_rating.toFixed(1);
-        
-        document.getElementById('nps-score').textContent = data.nps;
-        const npsLabel = document.getElementById('nps-label');
-        if (data.nps > 50) {
-            npsLabel.textContent = 'Excellent';
-            npsLabel.style.color = '#10b981';
-        } else if (data.nps > 0) {
-            npsLabel.textContent = 'Good';
-            npsLabel.style.color = '#f59e0b';
-        } else {
-            npsLabel.textContent = 'Needs Improvement';
-            npsLabel.style.color = '#ef4444';
-        }
-        
-        document.getElementById('total-count').textContent = data.total_responses;
-        
-        // Update categories
-        const categories = ['food', 'service', 'staff', 'cleanliness', 'value'];
-        categories.forEach(cat => {
-            const rating = data.categories[cat];
-            const ratingElement = document.getElementById(`cat-${cat}`);
-            if (ratingElement) {
-                ratingElement.textContent = rating.toFixed(1);
-            }
-            
-            const starsContainer = document.getElementById(`stars-${cat}`);
-            if (starsContainer) {
-                const fullStars = Math.floor(rating);
-                const hasHalf = rating % 1 >= 0.5;
-                let starsHTML = '';
-                
-                for (let i = 0; i < fullStars; i++) {
-                    starsHTML += '★';
-                }
-                if (hasHalf && fullStars < 5) {
-                    starsHTML += '☆';
-                }
-                
-                starsContainer.textContent = starsHTML;
-            }
-        });
-        
-        // Create chart
-        createWeekChart(data.daily_chart);
+        renderDashboard(data.stats);
+        return data;
         
     } catch (error) {
         console.error('Error loading dashboard data:', error);
@@ -80,10 +37,70 @@ async function loadDashboardData() {
     }
 }
 
+function renderDashboard(data) {
+    // Update stats
+    document.getElementById('today-count').textContent = data.today.count;
+    document.getElementById('today-avg').textContent = data.today.avg_rating.toFixed(1);
+    
+    document.getElementById('week-count').textContent = data.week.count;
+    document.getElementById('week-avg').textContent = data.week.avg_rating.toFixed(1);
+    
+    document.getElementById('nps-score').textContent = data.nps;
+    const npsLabel = document.getElementById('nps-label');
+    if (data.nps > 50) {
+        npsLabel.textContent = 'Excellent';
+        npsLabel.style.color = '#10b981';
+    } else if (data.nps > 0) {
+        npsLabel.textContent = 'Good';
+        npsLabel.style.color = '#f59e0b';
+    } else {
+        npsLabel.textContent = 'Needs Improvement';
+        npsLabel.style.color = '#ef4444';
+    }
+    
+    document.getElementById('total-count').textContent = data.total_responses;
+    
+    // Update categories
+    const categories = ['food', 'service', 'staff', 'cleanliness', 'value'];
+    categories.forEach(cat => {
+        const rating = data.categories[cat];
+        const ratingElement = document.getElementById(`cat-${cat}`);
+        if (ratingElement) {
+            ratingElement.textContent = rating.toFixed(1);
+        }
+        
+        const starsContainer = document.getElementById(`stars-${cat}`);
+        if (starsContainer) {
+            const fullStars = Math.floor(rating);
+            const hasHalf = rating % 1 >= 0.5;
+            let starsHTML = '';
+            
+            for (let i = 0; i < fullStars; i++) {
+                starsHTML += '★';
+            }
+            if (hasHalf && fullStars < 5) {
+                starsHTML += '☆';
+            }
+            
+            starsContainer.textContent = starsHTML;
+        }
+    });
+    
+    // Create chart
+    createWeekChart(data.daily_chart);
+}
+
 function createWeekChart(dailyData) {
     const ctx = document.getElementById('weekChart');
     if (!ctx) return;
     
+    // Live updates only change the counts; update in place to avoid a redraw
+    if (chart && chart.data.labels.join() === dailyData.map(d => d.date).join()) {
+        chart.data.datasets[0].data = dailyData.map(d => d.count);
+        chart.update('none');
+        return;
+    }
+    
     if (chart) {
         chart.destroy();
     }
@@ -121,16 +138,167 @@ function createWeekChart(dailyData) {
     });
 }
 
+// ==================== LIVE UPDATES ====================
+// /dashboard/api/stream sends one event per new feedback row after last_id
+// (and a fresh stats snapshot after deletes). Event ids are feedback ids, so
+// EventSource reconnects resume where they left off.
+
+const LIVE_CATEGORIES = ['food', 'service', 'staff', 'cleanliness', 'value'];
+let liveSource = null;
+let liveStats = null;
+
+function openStream(query, handlers) {
+    if (liveSource) {
+        liveSource.close();
+    }
+    liveSource = new EventSource(`/dashboard/api/stream${query}`);
+    Object.entries(handlers).forEach(([event, handler]) => {
+        liveSource.addEventListener(event, e => handler(JSON.parse(e.data)));
+    });
+    return liveSource;
+}
+
+function average(sum, count) {
+    return count ? Math.round((sum / count) * 100) / 100 : 0;
+}
+
+function utcDate(date) {
+    return date.toISOString().slice(0, 10);
+}
+
+// Stats payload, in the /api/stats layout, from the raw counters
+function statsFromCounters(stats) {
+    const c = stats.counters;
+    const nps = c.nps.count
+        ? Math.round(((c.nps.promoters - c.nps.detractors) / c.nps.count) * 1000) / 10
+        : 0;
+    const categories = {};
+    LIVE_CATEGORIES.forEach(cat => {
+        categories[cat] = average(c.categories[cat].sum, c.categories[cat].count);
+    });
+    const dailyChart = stats.daily_chart.slice();
+    const last = dailyChart.length - 1;
+    dailyChart[last] = {
+        ...dailyChart[last],
+        count: c.today.count,
+        avg_rating: average(c.today.rating_sum, c.today.count)
+    };
+    return {
+        ...stats,
+        today: { count: c.today.count, avg_rating: average(c.today.rating_sum, c.today.count) },
+        week: { count: c.week.count, avg_rating: average(c.week.rating_sum, c.week.count) },
+        month: { count: c.month.count, avg_rating: average(c.month.rating_sum, c.month.count) },
+        categories: categories,
+        nps: nps,
+        daily_chart: dailyChart
+    };
+}
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+// Feedback timestamps are naive UTC ISO strings
+function parseUtc(timestamp) {
+    return new Date(/[zZ]|[+-]\d\d:\d\d$/.test(timestamp) ? timestamp : timestamp + 'Z');
+}
+
+// Add one new feedback row to the counters whose window it falls in.
+// Offline-batch rows keep their original (possibly old) timestamps.
+function applyFeedback(stats, f) {
+    const c = stats.counters;
+    const rating = f.overall_rating;
+    const submitted = parseUtc(f.timestamp);
+    const now = Date.now();
+    const buckets = [];
+    if (utcDate(submitted) === c.today_date) buckets.push(c.today);
+    if (submitted.getTime() >= now - 7 * DAY_MS) buckets.push(c.week);
+    stats.total_responses += 1;
+    // NPS and category averages cover the same 30 days as the month
+    if (submitted.getTime() < now - 30 * DAY_MS) return;
+    buckets.push(c.month);
+    buckets.forEach(bucket => {
+        bucket.count += 1;
+        bucket.rating_sum += rating;
+    });
+    if (f.nps_score !== null) {
+        c.nps.count += 1;
+        if (f.nps_score >= 9) c.nps.promoters += 1;
+        if (f.nps_score <= 6) c.nps.detractors += 1;
+    }
+    LIVE_CATEGORIES.forEach(cat => {
+        const value = f[`${cat}_rating`];
+        if (value !== null) {
+            c.categories[cat].sum += value;
+            c.categories[cat].count += 1;
+        }
+    });
+}
+
+async function startLiveDashboard() {
+    const data = await loadDashboardData();
+    if (!data || !window.EventSource) return;
+    liveStats = data.stats;
+    // Resume after the rows the bootstrap stats cover
+    openStream(`?last_id=${data.last_id}`, {
+        snapshot: data => {
+            liveStats = data;
+            renderDashboard(data);
+        },
+        feedback: f => {
+            if (!liveStats) return;
+            applyFeedback(liveStats, f);
+            renderDashboard(statsFromCounters(liveStats));
+        }
+    });
+}
+
+// The counters cover a UTC day and rolling 7/30-day windows; start over
+// from a fresh bootstrap when the day changes
+setInterval(() => {
+    if (liveStats && utcDate(new Date()) !== liveStats.counters.today_date) {
+        liveStats = null;
+        startLiveDashboard();
+    }
+}, 60000);
+
+function startLiveFeedbackList(lastId) {
+    if (!window.EventSource) return;
+    openStream(`?last_id=${lastId}`, {
+        feedback: f => {
+            const tbody = document.getElementById('feedback-body');
+            if (!tbody || feedbackPage !== 1 || tbody.querySelector(`[data-id="${f.id}"]`)) return;
+            const placeholder = tbody.querySelector('.loading-cell');
+            if (placeholder) {
+                placeholder.parentNode.remove();
+            }
+            tbody.insertBefore(feedbackRow(f), tbody.firstChild);
+            while (tbody.children.length > feedbackPerPage) {
+                tbody.lastChild.remove();
+            }
+        }
+    });
+}
+
+let feedbackPage = 1;
+let feedbackPerPage = 20;
+
 async function loadFeedbackList(page = 1) {
     try {
         console.log(`Loading feedback list page ${page}...`); // Debug log
-        const response = await fetch(`/dashboard/api/feedback?page=${page}`);
-        
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        let data;
+        if (page === 1 && !liveSource) {
+            // First load: the page and the stream's starting point together
+            const bootstrap = await fetchBootstrap('feedback');
+            data = bootstrap.feedback;
+            startLiveFeedbackList(bootstrap.last_id);
+        } else {
+            const response = await fetch(`/dashboard/api/feedback?page=${page}`);
+            
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            
+            data = await response.json();
         }
-        
-        const data = await response.json();
         console.log('Feedback list received:', data); // Debug log
         
         const tbody = document.getElementById('feedback-body');
@@ -139,41 +307,16 @@ async function loadFeedbackList(page = 1) {
         tbody.innerHTML = '';
         
         if (data.feedback.length === 0) {
-            tbody.innerHTML = '<tr><td colspan="10" class="loading-cell">No feedback yet</td></tr>';
+            tbody.innerHTML = '<tr><td colspan="11" class="loading-cell">No feedback yet</td></tr>';
+            feedbackPage = data.current_page;
             return;
         }
         
-        data.feedback.forEach(f => {
-            const row = document.createElement('tr');
-            
-            const date = new Date(f.timestamp);
-            const ratingClass = f.overall_rating === 3 ? 'rating-high' : 
-                               f.overall_rating === 2 ? 'rating-mid' : 'rating-low';
-            
-            const emojiMap = {1: '😞', 2: '😐', 3: '😊'};
-            
-            row.innerHTML = `
-                <td data-label="Date">${date.toLocaleDateString()}<br><small>${date.toLocaleTimeString()}</small></td>
-                <td data-label="Overall"><span class="rating-badge ${ratingClass}">${emojiMap[f.overall_rating]}</span></td>
-                <td data-label="Food/Drink">${f.food_rating || '-'}</td>
-                <td data-label="Service">${f.service_rating || '-'}</td>
-                <td data-label="Staff">${f.staff_rating || '-'}</td>
-                <td data-label="Clean">${f.cleanliness_rating || '-'}</td>
-                <td data-label="Value">${f.value_rating || '-'}</td>
-                <td data-label="NPS">${f.nps_score !== null ? f.nps_score : '-'}</td>
-                <td  data-label="Comment" style="max-width: 200px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">
-                    ${f.comment || '-'}
-                </td>
-                <td data-label="Status">
-                    <button class="review-btn ${f.reviewed ? 'reviewed' : ''}" 
-                            onclick="toggleReviewed(${f.id})">
-                        ${f.reviewed ? '✓ Reviewed' : 'Mark Reviewed'}
-                    </button>
-                </td>
-            `;
-            
-            tbody.appendChild(row);
-        });
+        data.feedback.forEach(f => tbody.appendChild(feedbackRow(f)));
+        updateBulkBar();
+        
+        feedbackPage = data.current_page;
+        feedbackPerPage = data.per_page;
         
         // Update pagination
         createPagination(data.current_page, data.pages);
@@ -182,11 +325,44 @@ async function loadFeedbackList(page = 1) {
         console.error('Error loading feedback:', error);
         const tbody = document.getElementById('feedback-body');
         if (tbody) {
-            tbody.innerHTML = '<tr><td colspan="10" class="loading-cell">Error loading feedback. Check console.</td></tr>';
+            tbody.innerHTML = '<tr><td colspan="11" class="loading-cell">Error loading feedback. Check console.</td></tr>';
         }
     }
 }
 
+function feedbackRow(f) {
+    const row = document.createElement('tr');
+    row.dataset.id = f.id;
+    
+    const date = new Date(f.timestamp);
+    const ratingClass = f.overall_rating === 3 ? 'rating-high' : 
+                       f.overall_rating === 2 ? 'rating-mid' : 'rating-low';
+    
+    const emojiMap = {1: '😞', 2: '😐', 3: '😊'};
+    
+    row.innerHTML = `
+        <td data-label="Select"><input type="checkbox" class="select-feedback" value="${f.id}" onchange="updateBulkBar()"></td>
+        <td data-label="Date">${date.toLocaleDateString()}<br><small>${date.toLocaleTimeString()}</small></td>
+        <td data-label="Overall"><span class="rating-badge ${ratingClass}">${emojiMap[f.overall_rating]}</span></td>
+        <td data-label="Food/Drink">${f.food_rating || '-'}</td>
+        <td data-label="Service">${f.service_rating || '-'}</td>
+        <td data-label="Staff">${f.staff_rating || '-'}</td>
+        <td data-label="Clean">${f.cleanliness_rating || '-'}</td>
+        <td data-label="Value">${f.value_rating || '-'}</td>
+        <td data-label="NPS">${f.nps_score !== null ? f.nps_score : '-'}</td>
+        <td  data-label="Comment" style="max-width: 200px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap;">
+            ${f.comment || '-'}
+        </td>
+        <td data-label="Status">
+            <button class="review-btn ${f.reviewed ? 'reviewed' : ''}" 
+                    onclick="toggleReviewed(${f.id})">
+                ${f.reviewed ? '✓ Reviewed' : 'Mark Reviewed'}
+            </button>
+        </td>
+    `;
+    return row;
+}
+
 function createPagination(current, total) {
     const pagination = document.getElementById('pagination');
     if (!pagination || total <= 1) return;
@@ -216,6 +392,73 @@ async function toggleReviewed(feedbackId) {
     }
 }
 
+// Bulk actions on the feedback list; see /dashboard/api/feedback/bulk/*
+function selectedFeedbackIds() {
+    return Array.from(document.querySelectorAll('.select-feedback:checked'))
+        .map(box => parseInt(box.value, 10));
+}
+
+function updateBulkBar() {
+    const bar = document.getElementById('bulk-bar');
+    if (!bar) return;
+    const count = selectedFeedbackIds().length;
+    document.getElementById('bulk-count').textContent = `${count} selected`;
+    bar.classList.toggle('has-selection', count > 0);
+    const all = document.querySelectorAll('.select-feedback');
+    const selectAll = document.getElementById('select-all');
+    selectAll.checked = all.length > 0 && count === all.length;
+    selectAll.indeterminate = count > 0 && count < all.length;
+}
+
+function selectAllFeedback(checked) {
+    document.querySelectorAll('.select-feedback').forEach(box => {
+        box.checked = checked;
+    });
+    updateBulkBar();
+}
+
+async function bulkAction(action, body) {
+    try {
+        const response = await fetch(`/dashboard/api/feedback/bulk/${action}`, {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(body)
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            alert('Error: ' + data.error);
+            return null;
+        }
+        loadFeedbackList(feedbackPage);
+        return data;
+    } catch (error) {
+        console.error(`Error in bulk ${action}:`, error);
+        return null;
+    }
+}
+
+function bulkReview(reviewed) {
+    const ids = selectedFeedbackIds();
+    if (ids.length) {
+        bulkAction('review', {ids, reviewed});
+    }
+}
+
+function bulkDelete() {
+    const ids = selectedFeedbackIds();
+    if (ids.length && confirm(`Delete ${ids.length} feedback entries? This cannot be undone!`)) {
+        bulkAction('delete', {ids});
+    }
+}
+
+async function reviewAllUnreviewed() {
+    if (!confirm('Mark every unreviewed feedback entry as reviewed?')) return;
+    const data = await bulkAction('review', {filter: {reviewed: false}});
+    if (data) {
+        alert(`${data.updated} feedback entries marked as reviewed.`);
+    }
+}
+
 // Add this to your dashboard.js or create a new mobile-menu.js
 
 // Mobile menu functionality - Fixed version
@@ -0,0 +1,561 @@
+"""
+SQL-side aggregation for the dashboard statistics endpoints
+
+Queries here return plain rows of counts and sums; averages and ratios are
+computed in Python so SQLite and PostgreSQL produce identical numbers (their
+AVG() return types differ).
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, or_, select, true
+
+import rollup
+from models import db, Feedback, FeedbackDailyRollup, CATEGORIES, SENTIMENT
+
+
+def _sum_if(condition, value=1):
+    return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+
+def _avg(total, count):
+    return round(total / count, 2) if count else 0
+
+
+def _day_aligned(start):
+    return start == start.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+SUMMARY_FIELDS = ["count", "rating_sum", "happy", "neutral", "sad"]
+
+# Start of the summary's "all_time" window
+ALL_TIME_START = datetime(2020, 1, 1)
+
+
+def _feedback_groups(business_id, now, max_id=None):
+    """
+    Per-day sums over the last 30 days, in one query
+
+    Returns (days, month): the per-day rows keyed by 'YYYY-MM-DD' and their
+    sums over the 30-day window (including the rolling 7-day "week_"
+    columns). All-time totals come from the rollup (_all_time_totals).
+    """
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+
+    in_month = Feedback.timestamp >= month_ago
+    rows = select(
+        func.date(Feedback.timestamp).label("day"),
+        Feedback.timestamp,
+        Feedback.overall_rating,
+        Feedback.nps_score,
+        *[getattr(Feedback, f"{cat}_rating") for cat in CATEGORIES],
+    ).where(Feedback.business_id == business_id, in_month)
+    if max_id is not None:
+        rows = rows.where(Feedback.id <= max_id)
+    rows = rows.subquery()
+
+    in_week = rows.c.timestamp >= week_ago
+    sentiments = {"happy": 3, "neutral": 2, "sad": 1}
+
+    # Grouping on the subquery's column (rather than repeating the CASE
+    # expression) keeps PostgreSQL happy about bound parameters in GROUP BY
+    query = select(
+        rows.c.day,
+        func.count().label("count"),
+        func.coalesce(func.sum(rows.c.overall_rating), 0).label("rating_sum"),
+        *[
+            _sum_if(rows.c.overall_rating == rating).label(name)
+            for name, rating in sentiments.items()
+        ],
+        _sum_if(in_week).label("week_count"),
+        _sum_if(in_week, rows.c.overall_rating).label("week_rating_sum"),
+        *[
+            _sum_if(in_week & (rows.c.overall_rating == rating)).label(f"week_{name}")
+            for name, rating in sentiments.items()
+        ],
+        func.count(rows.c.nps_score).label("nps_count"),
+        func.count().filter(rows.c.nps_score >= 9).label("promoters"),
+        func.count().filter(rows.c.nps_score <= 6).label("detractors"),
+        *[
+            func.coalesce(func.sum(rows.c[f"{cat}_rating"]), 0).label(f"{cat}_sum")
+            for cat in CATEGORIES
+        ],
+        *[
+            func.count(rows.c[f"{cat}_rating"]).label(f"{cat}_count")
+            for cat in CATEGORIES
+        ],
+    ).group_by(rows.c.day)
+
+    month = dict.fromkeys(
+        SUMMARY_FIELDS
+        + ["week_count", "week_rating_sum"]
+        + [f"week_{name}" for name in sentiments]
+        + ["nps_count", "promoters", "detractors"]
+        + [f"{cat}_{part}" for cat in CATEGORIES for part in ("sum", "count")],
+        0,
+    )
+    days = {}
+
+    for row in db.session.execute(query).mappings():
+        # SQLite returns a 'YYYY-MM-DD' string, PostgreSQL a date
+        days[str(row["day"])] = row
+        for key in month:
+            month[key] += row[key]
+
+    return days, month
+
+
+def _all_time_totals(business_id, max_id=None):
+    """
+    SUMMARY_FIELDS sums over the summary's all-time window, from the rollup
+
+    With max_id, rows above it (committed after the caller's high-water
+    mark) are subtracted from the rollup sums. That delta reads only the
+    newest rows, and comes from the same statement so both parts see the
+    same data.
+    """
+    rollup_sums = (
+        select(
+            *[
+                func.coalesce(func.sum(getattr(FeedbackDailyRollup, field)), 0).label(
+                    field
+                )
+                for field in SUMMARY_FIELDS
+            ]
+        )
+        .where(
+            FeedbackDailyRollup.business_id == business_id,
+            FeedbackDailyRollup.day >= ALL_TIME_START.date(),
+        )
+        .subquery()
+    )
+    if max_id is None:
+        return dict(db.session.execute(select(rollup_sums)).mappings().one())
+
+    newer = (
+        select(
+            func.count().label("count"),
+            func.coalesce(func.sum(Feedback.overall_rating), 0).label("rating_sum"),
+            *[
+                _sum_if(Feedback.overall_rating == rating).label(name)
+                for rating, name in SENTIMENT.items()
+            ],
+        )
+        .where(
+            Feedback.business_id == business_id,
+            Feedback.id > max_id,
+            Feedback.timestamp >= ALL_TIME_START,
+        )
+        .subquery()
+    )
+    # Both subqueries return one row; join them unconditionally
+    query = select(
+        *[
+            (rollup_sums.c[field] - newer.c[field]).label(field)
+            for field in SUMMARY_FIELDS
+        ]
+    ).select_from(rollup_sums.join(newer, true()))
+    return dict(db.session.execute(query).mappings().one())
+
+
+def dashboard_stats(business_id, now=None, max_id=None, counters=False):
+    """
+    Payload for /dashboard/api/stats, computed with a single GROUP BY query
+
+    The live stream (events.py) passes max_id to count only rows up to its
+    high-water mark, and counters=True to get the sums and counts behind the
+    averages so the dashboard can apply new rows itself. total_responses
+    comes from the daily rollup rather than the raw rows.
+    """
+    now = now or datetime.utcnow()
+    days, month = _feedback_groups(business_id, now, max_id)
+    totals = _all_time_totals(business_id, max_id)
+    return _stats_payload(days, month, totals, now, counters)
+
+
+def _stats_payload(days, month, totals, now, counters):
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = days.get(today_start.strftime("%Y-%m-%d"))
+
+    # Daily breakdown for chart (last 7 days)
+    daily_chart = []
+    for i in range(7):
+        day = today_start - timedelta(days=6 - i)
+        data = days.get(day.strftime("%Y-%m-%d"))
+        daily_chart.append(
+            {
+                "date": day.strftime("%a %m/%d"),
+                "count": data["count"] if data else 0,
+                "avg_rating": _avg(data["rating_sum"], data["count"]) if data else 0,
+            }
+        )
+
+    if month["nps_count"]:
+        nps = round(
+            ((month["promoters"] - month["detractors"]) / month["nps_count"]) * 100, 1
+        )
+    else:
+        nps = 0
+
+    payload = {
+        "today": {
+            "count": today["count"] if today else 0,
+            "avg_rating": _avg(today["rating_sum"], today["count"]) if today else 0,
+        },
+        "week": {
+            "count": month["week_count"],
+            "avg_rating": _avg(month["week_rating_sum"], month["week_count"]),
+        },
+        "month": {
+            "count": month["count"],
+            "avg_rating": _avg(month["rating_sum"], month["count"]),
+        },
+        "daily_chart": daily_chart,
+        "categories": {
+            cat: _avg(month[f"{cat}_sum"], month[f"{cat}_count"]) for cat in CATEGORIES
+        },
+        "nps": nps,
+        "total_responses": totals["count"],
+    }
+    if counters:
+        payload["counters"] = {
+            "today_date": today_start.strftime("%Y-%m-%d"),
+            "today": {
+                "count": today["count"] if today else 0,
+                "rating_sum": today["rating_sum"] if today else 0,
+            },
+            "week": {
+                "count": month["week_count"],
+                "rating_sum": month["week_rating_sum"],
+            },
+            "month": {"count": month["count"], "rating_sum": month["rating_sum"]},
+            "nps": {
+                "count": month["nps_count"],
+                "promoters": month["promoters"],
+                "detractors": month["detractors"],
+            },
+            "categories": {
+                cat: {"sum": month[f"{cat}_sum"], "count": month[f"{cat}_count"]}
+                for cat in CATEGORIES
+            },
+        }
+    return payload
+
+
+def summary(business_id, now=None):
+    """
+    Payload for /dashboard/api/summary
+
+    All five windows are summed in one conditional-aggregate query over the
+    daily rollup. Windows that start mid-day (this_week, this_month) add
+    their partial first day from a second query over just those raw rows.
+    "yesterday" keeps its meaning of "since yesterday 00:00".
+    """
+    now = now or datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    windows = {
+        "today": today_start,
+        "yesterday": today_start - timedelta(days=1),
+        "this_week": now - timedelta(days=7),
+        "this_month": now - timedelta(days=30),
+        "all_time": ALL_TIME_START,
+    }
+
+    rollup_columns = []
+    raw_columns = []
+    partial_ranges = []
+    for name, start in windows.items():
+        if _day_aligned(start):
+            in_window = FeedbackDailyRollup.day >= start.date()
+        else:
+            in_window = FeedbackDailyRollup.day > start.date()
+            day_end = datetime.combine(
+                start.date() + timedelta(days=1), datetime.min.time()
+            )
+            in_partial = (Feedback.timestamp >= start) & (Feedback.timestamp < day_end)
+            partial_ranges.append(in_partial)
+            raw_columns += [
+                _sum_if(in_partial).label(f"{name}_count"),
+                _sum_if(in_partial, Feedback.overall_rating).label(
+                    f"{name}_rating_sum"
+                ),
+                _sum_if(in_partial & (Feedback.overall_rating == 3)).label(
+                    f"{name}_happy"
+                ),
+                _sum_if(in_partial & (Feedback.overall_rating == 2)).label(
+                    f"{name}_neutral"
+                ),
+                _sum_if(in_partial & (Feedback.overall_rating == 1)).label(
+                    f"{name}_sad"
+                ),
+            ]
+        rollup_columns += [
+            _sum_if(in_window, getattr(FeedbackDailyRollup, field)).label(
+                f"{name}_{field}"
+            )
+            for field in SUMMARY_FIELDS
+        ]
+
+    totals = dict(
+        db.session.execute(
+            select(*rollup_columns).where(
+                FeedbackDailyRollup.business_id == business_id,
+                FeedbackDailyRollup.day >= min(windows.values()).date(),
+            )
+        )
+        .mappings()
+        .one()
+    )
+
+    if partial_ranges:
+        partial = (
+            db.session.execute(
+                select(*raw_columns).where(
+                    Feedback.business_id == business_id, or_(*partial_ranges)
+                )
+            )
+            .mappings()
+            .one()
+        )
+        for key, value in partial.items():
+            totals[key] += value
+
+    return {
+        name: {
+            "count": totals[f"{name}_count"],
+            "avg_rating": _avg(totals[f"{name}_rating_sum"], totals[f"{name}_count"]),
+            "happy": totals[f"{name}_happy"],
+            "neutral": totals[f"{name}_neutral"],
+            "sad": totals[f"{name}_sad"],
+        }
+        for name in windows
+    }
+
+
+def overview(business_id, now=None, max_id=None):
+    """
+    Payload for /dashboard/api/bootstrap: stats (with counters) and summary
+
+    Both come from the one dashboard_stats query, which already covers the
+    today, week and month windows; its per-sentiment sums make up the
+    summary. The all-time totals (summary all_time and total_responses) are
+    summed from the daily rollup like summary()'s, so the payload shows one
+    total.
+    """
+    now = now or datetime.utcnow()
+    days, month = _feedback_groups(business_id, now, max_id)
+    totals = _all_time_totals(business_id, max_id)
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = days.get(today_start.strftime("%Y-%m-%d"))
+    yesterday = days.get((today_start - timedelta(days=1)).strftime("%Y-%m-%d"))
+
+    windows = {
+        "today": [today] if today else [],
+        "yesterday": [row for row in (today, yesterday) if row],
+        "this_week": [{f: month[f"week_{f}"] for f in SUMMARY_FIELDS}],
+        "this_month": [month],
+        "all_time": [totals],
+    }
+    summary_payload = {}
+    for name, rows in windows.items():
+        sums = {f: sum(row[f] for row in rows) for f in SUMMARY_FIELDS}
+        summary_payload[name] = {
+            "count": sums["count"],
+            "avg_rating": _avg(sums["rating_sum"], sums["count"]),
+            "happy": sums["happy"],
+            "neutral": sums["neutral"],
+            "sad": sums["sad"],
+        }
+
+    return {
+        "stats": _stats_payload(days, month, totals, now, counters=True),
+        "summary": summary_payload,
+    }
+
+
+ANALYTICS_FIELDS = (
+    "sentiment",
+    "trends",
+    "nps_distribution",
+    "category_trends",
+    "activity",
+    "recent_comments",
+)
+
+
+def analytics(business_id, period="30", now=None, fields=ANALYTICS_FIELDS):
+    """
+    Payload for /dashboard/api/analytics
+
+    period is a number of days or "all"; fields picks the sections to
+    compute (default: all of ANALYTICS_FIELDS). Sentiment, the NPS
+    distribution and the hour histogram come from one SQL sum over the daily
+    rollup. Only the trend charts load per-day buckets, and only for the days
+    they show; only the recent comments read the feedback table. Periods of
+    up to a month that need per-day data load their buckets once instead.
+    """
+    now = now or datetime.utcnow()
+    fields = set(fields)
+    start_date = period_start(period, now)
+
+    per_day = fields & {"trends", "category_trends", "activity"}
+    if per_day and period != "all" and int(period) <= 31:
+        # Short periods: one pass over the period's buckets serves every
+        # section, which beats separate queries for a handful of days
+        buckets = rollup.daily_buckets(business_id, start_date)
+        totals = rollup.sum_buckets(buckets.values())
+    else:
+        buckets = None
+        totals = rollup.window_totals(business_id, start_date)
+
+    if not totals["count"]:
+        return empty_analytics(fields)
+
+    payload = {}
+
+    if "sentiment" in fields:
+        payload["sentiment"] = {
+            "happy": totals["happy"],
+            "neutral": totals["neutral"],
+            "sad": totals["sad"],
+        }
+
+    if "trends" in fields or "category_trends" in fields:
+        # Both charts cover the last N days (at most 30), in one pass over
+        # just those days' buckets
+        days_to_show, first_day = trend_days(period, now)
+        trend_buckets = (
+            buckets
+            if buckets is not None
+            else rollup.daily_buckets(business_id, first_day)
+        )
+        trends = []
+        category_trends = []
+
+        for i in range(days_to_show):
+            day = first_day + timedelta(days=i)
+            data = trend_buckets.get(day.date(), rollup.empty_bucket())
+            label = day.strftime("%m/%d")
+            trends.append({"date": label, "avg_rating": rollup.average(data)})
+            category_trends.append(
+                dict(
+                    {"date": label},
+                    **{cat: rollup.average(data, cat) for cat in CATEGORIES},
+                )
+            )
+
+        if "trends" in fields:
+            payload["trends"] = trends
+        if "category_trends" in fields:
+            payload["category_trends"] = category_trends
+
+    if "nps_distribution" in fields:
+        payload["nps_distribution"] = [totals[f"nps_{i}"] for i in range(11)]
+
+    if "activity" in fields:
+        # Walk the days in order so ties resolve to the earliest day (and
+        # hour) seen, as they did when iterating raw feedback
+        day_counts = defaultdict(int)
+        if buckets is not None:
+            counts = {day: bucket["count"] for day, bucket in buckets.items()}
+        else:
+            counts = rollup.daily_counts(business_id, start_date)
+        for day, count in counts.items():
+            day_counts[day.strftime("%A")] += count
+        busiest_day = max(day_counts.items(), key=lambda x: x[1])[0]
+
+        busiest_hour = _busiest_hour(business_id, start_date, totals, buckets)
+
+        # Calculate days in period
+        days_in_period = (now - start_date).days or 1
+
+        payload["activity"] = {
+            "busiest_day": busiest_day,
+            "busiest_hour": f"{busiest_hour}:00 - {busiest_hour + 1}:00",
+            "avg_per_day": round(totals["count"] / days_in_period, 1),
+            # Share of feedback marked as reviewed
+            "response_rate": round((totals["reviewed"] / totals["count"]) * 100),
+        }
+
+    if "recent_comments" in fields:
+        payload["recent_comments"] = recent_comments(business_id, start_date)
+
+    return payload
+
+
+def _busiest_hour(business_id, start_date, totals, buckets=None):
+    """
+    The hour with the most feedback; ties go to the hour seen first
+
+    Per-day buckets are only needed (and loaded when missing) for a tie.
+    """
+    top = max(totals[f"hour_{hour}"] for hour in range(24))
+    tied = [hour for hour in range(24) if totals[f"hour_{hour}"] == top]
+    if len(tied) == 1:
+        return tied[0]
+
+    if buckets is None:
+        buckets = rollup.daily_buckets(business_id, start_date)
+    for bucket in buckets.values():
+        for hour in tied:
+            if bucket[f"hour_{hour}"]:
+                return hour
+    return tied[0]
+
+
+def period_start(period, now):
+    """Start of an analytics period: a number of days or "all" """
+    if period == "all":
+        return datetime(2020, 1, 1)
+    return now - timedelta(days=int(period))
+
+
+def trend_days(period, now):
+    """(number of days, first midnight) shown by the analytics trend charts"""
+    days_to_show = min(int(period) if period != "all" else 30, 30)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return days_to_show, today - timedelta(days=days_to_show - 1)
+
+
+def empty_analytics(fields=ANALYTICS_FIELDS):
+    """Analytics sections for a period without feedback"""
+    empty = {
+        "sentiment": {"happy": 0, "neutral": 0, "sad": 0},
+        "trends": [],
+        "nps_distribution": [0] * 11,
+        "category_trends": [],
+        "activity": {
+            "busiest_day": "N/A",
+            "busiest_hour": "N/A",
+            "avg_per_day": 0,
+            "response_rate": 0,
+        },
+        "recent_comments": [],
+    }
+    return {name: value for name, value in empty.items() if name in fields}
+
+
+def recent_comments(business_id, start_date, limit=10):
+    """The newest non-blank comments since start_date"""
+    rows = (
+        db.session.query(Feedback.comment, Feedback.overall_rating, Feedback.timestamp)
+        .filter(
+            Feedback.business_id == business_id,
+            Feedback.timestamp >= start_date,
+            Feedback.comment.isnot(None),
+            func.trim(Feedback.comment) != "",
+        )
+        .order_by(Feedback.timestamp.desc(), Feedback.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "comment": f.comment,
+            "rating": f.overall_rating,
+            "timestamp": f.timestamp.isoformat(),
+        }
+        for f in rows
+    ]
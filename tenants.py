@@ -0,0 +1,82 @@
+"""
+Tenant resolution for the customer-facing pages
+
+Customer URLs identify the business by slug (/b/<slug>/...); the bare URLs
+(/, /api/feedback, ...) keep serving the first business, as single-tenant
+installs always did. Resolved businesses, with their parsed settings, are
+kept as small immutable Tenant records in a per-process cache, so the
+customer path neither queries the business table nor parses settings JSON
+once warm. Routes that change a business call
+tenant_cache.invalidate(); other workers pick the change up within
+TENANT_CACHE_TTL seconds.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from business_settings import parse_settings
+from models import Business
+
+Tenant = namedtuple("Tenant", "id name slug settings")
+
+# Cache key for the business served on the bare URLs
+DEFAULT = ""
+
+
+class TenantCache:
+    """LRU + TTL cache of slug -> Tenant (or None for unknown slugs)"""
+
+    def __init__(self, maxsize=1024, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("TENANT_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("TENANT_CACHE_TTL", self.ttl)
+
+    def resolve(self, slug=None):
+        """The Tenant for a URL slug (None for the bare URLs), or None"""
+        key = slug or DEFAULT
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                return entry[1]
+
+        tenant = self._load(key)
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, tenant)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return tenant
+
+    def _load(self, key):
+        query = Business.query.with_entities(
+            Business.id, Business.name, Business.slug, Business.settings_json
+        )
+        if key == DEFAULT:
+            row = query.order_by(Business.id).first()
+        else:
+            row = query.filter(Business.slug == key).first()
+        if row is None:
+            return None
+        return Tenant(row.id, row.name, row.slug, parse_settings(row.settings_json))
+
+    def invalidate(self):
+        """
+        Forget cached tenants after a business is added or changed
+
+        Everything is dropped, not just the changed business: the default
+        tenant and cached misses can change too.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+tenant_cache = TenantCache()
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from flask import g
+from sqlalchemy import event
+
+from conftest import seed_feedback
+from models import db, Feedback
+import rollup
+import stats
+
+
+def bootstrap(client, query=""):
+    # The test app context outlives requests; forget the user it cached
+    g.pop("_login_user", None)
+    return client.get(f"/dashboard/api/bootstrap{query}")
+
+
+def test_overview_matches_stats_and_summary(business):
+    seed_feedback(business.id, 500, days=60)
+    now = datetime.utcnow()
+
+    overview = stats.overview(business.id, now=now)
+    assert overview["stats"] == stats.dashboard_stats(
+        business.id, now=now, counters=True
+    )
+    assert overview["summary"] == stats.summary(business.id, now=now)
+
+
+def test_overview_has_one_all_time_total(business):
+    seed_feedback(business.id, 50, days=60)
+    # Older than the summary's all-time window
+    db.session.add(
+        Feedback(
+            business_id=business.id,
+            timestamp=datetime(2019, 6, 1),
+            overall_rating=3,
+        )
+    )
+    db.session.commit()
+    rollup.rebuild(business.id)
+
+    overview = stats.overview(business.id)
+    all_time = stats.summary(business.id)["all_time"]
+    assert overview["summary"]["all_time"] == all_time
+    assert overview["stats"]["total_responses"] == all_time["count"] == 50
+
+
+def test_bootstrap_returns_all_sections(client, business):
+    seed_feedback(business.id, 30, days=10)
+    response = bootstrap(client)
+    assert response.status_code == 200
+    data = response.get_json()
+
+    assert set(data) == {"last_id", "stats", "summary", "feedback"}
+    assert data["stats"]["total_responses"] == 30
+    assert data["summary"]["all_time"]["count"] == 30
+    assert len(data["feedback"]["feedback"]) == 20
+    assert data["last_id"] == max(f["id"] for f in data["feedback"]["feedback"])
+
+
+def test_bootstrap_sections(client, business):
+    seed_feedback(business.id, 5, days=10)
+    data = bootstrap(client, "?sections=feedback&per_page=2").get_json()
+    assert set(data) == {"last_id", "feedback"}
+    assert data["feedback"]["per_page"] == 2
+
+    assert set(bootstrap(client, "?sections=summary").get_json()) == {
+        "last_id",
+        "summary",
+    }
+    assert bootstrap(client, "?sections=stats,bogus").status_code == 400
+
+
+def test_bootstrap_stats_take_one_aggregate_query(client, business):
+    seed_feedback(business.id, 30, days=10)
+    bootstrap(client, "?sections=feedback")
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM feedback" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert bootstrap(client, "?sections=stats,summary").status_code == 200
+        # Served from the result cache the second time
+        assert bootstrap(client, "?sections=stats,summary").status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    # The high-water mark and one GROUP BY for both sections, plus the
+    # all-time totals from the rollup (less rows above the high-water mark)
+    assert len(statements) == 3
+    assert ["feedback_daily_rollup" in s for s in statements] == [False, False, True]
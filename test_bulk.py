@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+
+from flask import g
+from sqlalchemy import event
+
+from conftest import seed_feedback
+from models import db, Business, Feedback, FeedbackDailyRollup, ROLLUP_COUNTERS
+import rollup
+
+
+def post(client, url, body):
+    g.pop("_login_user", None)
+    return client.post(url, json=body)
+
+
+def rollup_rows(business_id):
+    return {
+        row.day: {key: getattr(row, key) for key in ROLLUP_COUNTERS}
+        for row in FeedbackDailyRollup.query.filter_by(business_id=business_id)
+        if row.count
+    }
+
+
+def assert_rollup_consistent(business_id):
+    """The incrementally maintained rollup equals one rebuilt from scratch"""
+    maintained = rollup_rows(business_id)
+    rollup.rebuild(business_id)
+    assert rollup_rows(business_id) == maintained
+
+
+def feedback_writes(client, url, body):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        words = statement.split()
+        if words[0] in ("UPDATE", "DELETE") and "feedback" in words[:3]:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = post(client, url, body)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_bulk_review_by_filter(client, business):
+    rows = seed_feedback(business.id, 300)
+    unreviewed_sad = sum(
+        1 for r in rows if r["overall_rating"] == 1 and not r["reviewed"]
+    )
+
+    response, statements = feedback_writes(
+        client,
+        "/dashboard/api/feedback/bulk/review",
+        {"filter": {"rating": 1, "reviewed": False}},
+    )
+    assert response.get_json() == {
+        "success": True,
+        "updated": unreviewed_sad,
+        "reviewed": True,
+    }
+    assert len(statements) == 1
+    assert Feedback.query.filter_by(overall_rating=1, reviewed=False).count() == 0
+    assert_rollup_consistent(business.id)
+
+    # Nothing left to change
+    response = post(
+        client, "/dashboard/api/feedback/bulk/review", {"filter": {"rating": 1}}
+    )
+    assert response.get_json()["updated"] == 0
+
+    response = post(
+        client,
+        "/dashboard/api/feedback/bulk/review",
+        {"filter": {"rating": 1}, "reviewed": False},
+    )
+    assert response.get_json()["updated"] == sum(
+        1 for r in rows if r["overall_rating"] == 1
+    )
+    assert_rollup_consistent(business.id)
+
+
+def test_bulk_operations_are_scoped_to_the_business(client, business):
+    other = Business(name="Other", email="other@example.com", password_hash="x")
+    db.session.add(other)
+    db.session.commit()
+    seed_feedback(other.id, 20, seed=2)
+    theirs = [f.id for f in Feedback.query.filter_by(business_id=other.id)]
+    seed_feedback(business.id, 20)
+    ours = [f.id for f in Feedback.query.filter_by(business_id=business.id)][:5]
+
+    response = post(
+        client, "/dashboard/api/feedback/bulk/delete", {"ids": ours + theirs}
+    )
+    assert response.get_json() == {"success": True, "deleted": 5}
+    response = post(client, "/dashboard/api/feedback/bulk/review", {"ids": theirs})
+    assert response.get_json()["updated"] == 0
+    assert Feedback.query.filter_by(business_id=other.id).count() == 20
+    assert_rollup_consistent(business.id)
+    assert_rollup_consistent(other.id)
+
+
+def test_bulk_delete_by_date_range(client, business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 400, now=now, days=30)
+    first, last = (now - timedelta(days=20)).date(), (now - timedelta(days=10)).date()
+    in_range = Feedback.query.filter(
+        Feedback.timestamp >= datetime.combine(first, datetime.min.time()),
+        Feedback.timestamp
+        < datetime.combine(last + timedelta(days=1), datetime.min.time()),
+    ).count()
+
+    response, statements = feedback_writes(
+        client,
+        "/dashboard/api/feedback/bulk/delete",
+        {"filter": {"from": first.isoformat(), "to": last.isoformat()}},
+    )
+    assert response.get_json() == {"success": True, "deleted": in_range}
+    assert len(statements) == 1
+    assert Feedback.query.count() == 400 - in_range
+    assert_rollup_consistent(business.id)
+
+    g.pop("_login_user", None)
+    stats = client.get("/dashboard/api/analytics?period=30&fields=sentiment")
+    assert sum(stats.get_json()["sentiment"].values()) == 400 - in_range
+
+
+def test_bulk_requests_are_validated(client, business):
+    for body in (
+        None,
+        {},
+        {"ids": [1], "filter": {"rating": 1}},
+        {"ids": []},
+        {"ids": ["1"]},
+        {"ids": list(range(1001))},
+        {"filter": {}},
+        {"filter": {"rating": 4}},
+        {"filter": {"from": "last week"}},
+        {"filter": {"reviewed": "no"}},
+        {"filter": {"comment": "x"}},
+    ):
+        for url in (
+            "/dashboard/api/feedback/bulk/review",
+            "/dashboard/api/feedback/bulk/delete",
+        ):
+            assert post(client, url, body).status_code == 400, (url, body)
+
+    response = post(
+        client, "/dashboard/api/feedback/bulk/review", {"ids": [1], "reviewed": 1}
+    )
+    assert response.status_code == 400
+
+
+def test_without_returning_support(client, business, monkeypatch):
+    rows = seed_feedback(business.id, 100)
+    dialect = db.engine.dialect
+    monkeypatch.setattr(dialect, "update_returning", False)
+    monkeypatch.setattr(dialect, "delete_returning", False)
+
+    response = post(
+        client, "/dashboard/api/feedback/bulk/review", {"filter": {"reviewed": False}}
+    )
+    assert response.get_json()["updated"] == sum(1 for r in rows if not r["reviewed"])
+    response = post(
+        client, "/dashboard/api/feedback/bulk/delete", {"filter": {"rating": 2}}
+    )
+    assert response.get_json()["deleted"] == sum(
+        1 for r in rows if r["overall_rating"] == 2
+    )
+    assert_rollup_consistent(business.id)
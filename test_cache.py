@@ -0,0 +1,64 @@
+from cache import ResultCache, SQLiteVersionStore
+
+
+def test_versions_invalidate_entries():
+    cache = ResultCache(maxsize=8, ttl=60)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_compute("stats", 1, (), compute) == {"n": 1}
+    assert cache.get_or_compute("stats", 1, (), compute) == {"n": 1}
+    cache.invalidate(1)
+    assert cache.get_or_compute("stats", 1, (), compute) == {"n": 2}
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_eviction_and_ttl():
+    cache = ResultCache(maxsize=2, ttl=60)
+    for period in ("7", "30", "90"):
+        cache.get_or_compute("analytics", 1, (period,), dict)
+    assert len(cache._entries) == 2
+
+    cache.ttl = -1
+    cache.get_or_compute("stats", 1, (), dict)
+    cache.get_or_compute("stats", 1, (), dict)
+    assert cache.hits == 0
+
+
+def test_sqlite_versions_are_shared(tmp_path):
+    path = str(tmp_path / "versions.db")
+    worker_a, worker_b = SQLiteVersionStore(path), SQLiteVersionStore(path)
+
+    worker_a.bump(7)
+
+    assert worker_b.get(7) == 1
+    assert worker_b.get(8) == 0
+    version, changed_at = worker_b.stamp(7)
+    assert version == "1" and changed_at is not None
+    assert worker_b.stamp(8) == ("0", None)
+
+    # Rewrite versions live in their own table of the same file
+    rewrites = SQLiteVersionStore(path, table="rewrite_versions")
+    assert rewrites.get(7) == 0
+    rewrites.bump(7)
+    assert SQLiteVersionStore(path, table="rewrite_versions").get(7) == 1
+    assert worker_b.get(7) == 1
+
+
+def test_only_rewrites_bump_the_rewrite_version():
+    cache = ResultCache()
+    cache.invalidate(1)
+    assert (cache.versions.get(1), cache.rewrites.get(1)) == (1, 0)
+    cache.invalidate(1, rewrite=True)
+    assert (cache.versions.get(1), cache.rewrites.get(1)) == (2, 1)
+
+
+def test_submit_invalidates_dashboard_stats(client):
+    assert client.get("/dashboard/api/stats").get_json()["today"]["count"] == 0
+
+    client.post("/api/feedback", json={"overall_rating": 3})
+
+    assert client.get("/dashboard/api/stats").get_json()["today"]["count"] == 1
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from cache import result_cache
+from conftest import seed_feedback
+from models import db, Feedback
+import rollup
+import stats
+
+pytest.importorskip("numpy")
+import columnar  # noqa: E402
+
+PERIODS = ("7", "30", "90", "all")
+
+
+@pytest.fixture(autouse=True)
+def fresh_snapshots(app):
+    columnar.columnar_cache.invalidate()
+    yield
+    columnar.columnar_cache.invalidate()
+
+
+def assert_matches(business_id, now):
+    for period in PERIODS:
+        assert columnar.analytics(business_id, period, now=now) == stats.analytics(
+            business_id, period, now=now
+        ), period
+
+
+def test_matches_rollup_analytics(business):
+    now = datetime.utcnow()
+    for seed in (1, 2, 3):
+        seed_feedback(business.id, 700, now=now, seed=seed)
+        assert_matches(business.id, now)
+
+
+def test_sparse_fields(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 300, now=now)
+    assert columnar.analytics(business.id, "30", now=now, fields=["sentiment"]) == {
+        "sentiment": stats.analytics(business.id, "30", now=now)["sentiment"]
+    }
+    columnar.columnar_cache.invalidate()
+    Feedback.query.delete()
+    rollup.FeedbackDailyRollup.query.delete()
+    db.session.commit()
+    assert columnar.analytics(business.id, "all", now=now) == stats.empty_analytics()
+
+
+def test_snapshot_follows_writes(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 300, now=now)
+    assert_matches(business.id, now)
+
+    # A late row (offline kiosk replay) lands before existing timestamps
+    late = Feedback(
+        business_id=business.id,
+        timestamp=now - timedelta(days=3),
+        overall_rating=1,
+        food_rating=2,
+        nps_score=0,
+    )
+    db.session.add(late)
+    rollup.record_feedback(late)
+    db.session.commit()
+    result_cache.invalidate(business.id)
+    assert_matches(business.id, now)
+
+    # Deletes and review toggles reload the snapshot
+    victim = Feedback.query.filter_by(business_id=business.id).first()
+    rollup.record_feedback(victim, sign=-1)
+    db.session.delete(victim)
+    toggled = Feedback.query.filter_by(business_id=business.id, reviewed=False).first()
+    toggled.reviewed = True
+    rollup.record_review_toggle(toggled)
+    db.session.commit()
+    result_cache.invalidate(business.id, rewrite=True)
+    assert_matches(business.id, now)
+
+
+def test_offsetting_changes_reload_the_snapshot(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 300, now=now, days=60)
+    assert_matches(business.id, now)
+
+    # One row inside the 7-day period gets reviewed and one outside loses
+    # its flag: all-time totals are unchanged, the 7-day response rate is not
+    week_ago = now - timedelta(days=7)
+    marked = Feedback.query.filter(
+        Feedback.business_id == business.id,
+        Feedback.timestamp >= week_ago,
+        Feedback.reviewed.is_(False),
+    ).first()
+    unmarked = Feedback.query.filter(
+        Feedback.business_id == business.id,
+        Feedback.timestamp < week_ago,
+        Feedback.reviewed.is_(True),
+    ).first()
+    for feedback in (marked, unmarked):
+        feedback.reviewed = not feedback.reviewed
+        rollup.record_review_toggle(feedback)
+    db.session.commit()
+    result_cache.invalidate(business.id, rewrite=True)
+    assert_matches(business.id, now)
+
+
+def test_endpoint_uses_configured_engine(app, client, business):
+    seed_feedback(business.id, 100)
+    expected = client.get("/dashboard/api/analytics?period=all").get_json()
+
+    app.config["ANALYTICS_ENGINE"] = "columnar"
+    try:
+        response = client.get("/dashboard/api/analytics?period=all&fields=activity")
+    finally:
+        app.config["ANALYTICS_ENGINE"] = "rollup"
+    assert response.get_json() == {"activity": expected["activity"]}
+
+
+def test_busiest_hour_ties_go_to_the_hour_seen_first(business):
+    now = datetime.utcnow().replace(hour=23, minute=0)
+    day = now - timedelta(days=3)
+    for timestamp in (day.replace(hour=15), (day + timedelta(days=1)).replace(hour=9)):
+        db.session.add(
+            Feedback(business_id=business.id, timestamp=timestamp, overall_rating=3)
+        )
+    db.session.commit()
+    rollup.rebuild(business.id)
+
+    activity = columnar.analytics(business.id, "all", now=now, fields=["activity"])
+    assert activity["activity"]["busiest_hour"] == "15:00 - 16:00"
+    assert_matches(business.id, now)
+
+
+def test_inserts_are_appended_without_a_reload(business, monkeypatch):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 200, now=now)
+    assert_matches(business.id, now)
+
+    clears = []
+    clear = columnar.Snapshot.clear
+    monkeypatch.setattr(
+        columnar.Snapshot, "clear", lambda self: clears.append(1) or clear(self)
+    )
+    seed_feedback(business.id, 50, now=now, seed=2)
+    assert_matches(business.id, now)
+    assert clears == []
+
+    Feedback.query.filter_by(business_id=business.id).limit(1).one().reviewed = True
+    db.session.commit()
+    rollup.rebuild(business.id)
+    result_cache.invalidate(business.id, rewrite=True)
+    assert_matches(business.id, now)
+    assert clears == [1]
@@ -0,0 +1,88 @@
+from flask import g
+from sqlalchemy import event
+
+from conftest import seed_feedback
+from models import db, Feedback
+
+
+def get(client, url, **kwargs):
+    # The test app context outlives requests; forget the user it cached
+    g.pop("_login_user", None)
+    return client.get(url, **kwargs)
+
+
+def feedback_statements(client, url, **kwargs):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM feedback" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = get(client, url, **kwargs)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return response, statements
+
+
+def test_unchanged_stats_are_not_recomputed(client, business):
+    seed_feedback(business.id, 20)
+    for url in (
+        "/dashboard/api/stats",
+        "/dashboard/api/summary",
+        "/dashboard/api/analytics?period=7",
+    ):
+        first = get(client, url)
+        assert first.status_code == 200
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        etag = first.headers["ETag"]
+        assert not etag.startswith("W/")
+        assert first.last_modified is not None
+
+        # Only the data version query runs before the 304
+        response, statements = feedback_statements(
+            client, url, headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.headers["ETag"] == etag
+        assert len(statements) == 1
+
+        modified_since = first.headers["Last-Modified"]
+        response = get(client, url, headers={"If-Modified-Since": modified_since})
+        assert response.status_code == 304
+
+
+def test_writes_change_the_etag(client, business):
+    seed_feedback(business.id, 20)
+    etag = get(client, "/dashboard/api/stats").headers["ETag"]
+
+    client.post("/api/feedback", json={"overall_rating": 3})
+    response = get(client, "/dashboard/api/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # Deleting an older row leaves the newest id alone; the counter moves
+    oldest = db.session.query(db.func.min(Feedback.id)).scalar()
+    assert get(client, "/dashboard/api/stats").headers["ETag"] == etag
+    g.pop("_login_user", None)
+    assert client.delete(f"/dashboard/api/feedback/{oldest}").status_code == 200
+    response = get(client, "/dashboard/api/stats", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_public_stats_can_be_cached_by_proxies(app, business):
+    client = app.test_client()
+    response = client.get("/api/feedback/stats")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=10"
+
+    etag = response.headers["ETag"]
+    assert (
+        client.get(
+            f"/b/{business.slug}/api/feedback/stats", headers={"If-None-Match": etag}
+        ).status_code
+        == 304
+    )
+    assert client.get("/b/no-such-place/api/feedback/stats").status_code == 404
@@ -0,0 +1,108 @@
+import json
+
+from flask import g
+
+import events
+import rollup
+import stats
+from conftest import seed_feedback
+from jobs import job_runner
+from models import db, Feedback
+
+
+def parse(body):
+    """(event, id, data) for each event in an SSE body, skipping comments"""
+    parsed = []
+    for block in body.strip().split("\n\n"):
+        fields = {}
+        for line in block.split("\n"):
+            if line.startswith(":"):
+                continue
+            name, _, value = line.partition(": ")
+            fields[name] = value
+        if "event" in fields:
+            parsed.append(
+                (fields["event"], fields.get("id"), json.loads(fields["data"]))
+            )
+    return parsed
+
+
+def stream_events(client, **kwargs):
+    # The test app context outlives requests; forget the user it cached
+    g.pop("_login_user", None)
+    response = client.get("/dashboard/api/stream", **kwargs)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    return parse(response.get_data(as_text=True))
+
+
+def test_snapshot_matches_stats(app, business):
+    seed_feedback(business.id, 300, days=40)
+    last_id, event = events.snapshot(business.id)
+
+    ((name, event_id, payload),) = parse(event)
+    assert (name, event_id) == ("snapshot", str(last_id))
+    counters = payload.pop("counters")
+    assert payload == stats.dashboard_stats(business.id)
+    assert counters["month"]["count"] == payload["month"]["count"]
+    assert counters["today"]["count"] == payload["today"]["count"]
+
+
+def test_snapshot_stops_at_high_water_mark(app, business):
+    seed_feedback(business.id, 50, days=5)
+    last_id = events.latest_feedback_id(business.id)
+    late = Feedback(business_id=business.id, overall_rating=3)
+    db.session.add(late)
+    db.session.flush()
+    rollup.record_feedback(late)
+    db.session.commit()
+
+    capped = stats.dashboard_stats(business.id, max_id=last_id)
+    assert capped["total_responses"] == 50
+    assert stats.dashboard_stats(business.id)["total_responses"] == 51
+
+
+def test_stream_sends_snapshot_then_resumes_after_last_event_id(app, business, client):
+    app.config.update(STREAM_MAX_SECONDS=0.3, STREAM_POLL_SECONDS=0.1)
+    try:
+        seed_feedback(business.id, 10, days=5)
+        ((name, last_id, _),) = stream_events(client)
+        assert name == "snapshot"
+
+        ids = []
+        for rating in (1, 3):
+            response = client.post(
+                "/api/feedback",
+                json={"overall_rating": rating},
+                headers={"X-Device-Token": f"device-{rating}"},
+            )
+            ids.append(response.get_json()["feedback_id"])
+
+        resumed = stream_events(client, headers={"Last-Event-ID": last_id})
+        assert [(name, int(event_id)) for name, event_id, _ in resumed] == [
+            ("feedback", ids[0]),
+            ("feedback", ids[1]),
+        ]
+        assert [data["overall_rating"] for _, _, data in resumed] == [1, 3]
+    finally:
+        app.config.update(STREAM_MAX_SECONDS=25, STREAM_POLL_SECONDS=2)
+
+
+def test_stream_requires_login(app):
+    response = app.test_client().get("/dashboard/api/stream")
+    assert response.status_code == 302
+
+
+def test_writers_wake_subscribed_streams(app, business, client):
+    subscriber = events.broker.subscribe(business.id)
+    try:
+        client.post("/api/feedback", json={"overall_rating": 2})
+        assert subscriber.get_nowait() == events.NEW_FEEDBACK
+
+        g.pop("_login_user", None)
+        job = client.delete("/dashboard/api/feedback/delete-all").get_json()
+        job_runner.wait(job["job_id"], timeout=30)
+        assert subscriber.get_nowait() == events.RESYNC
+    finally:
+        events.broker.unsubscribe(business.id, subscriber)
+    assert events.broker.subscriber_count(business.id) == 0
@@ -0,0 +1,170 @@
+import csv
+import gzip
+import json
+from io import StringIO
+
+from conftest import seed_feedback
+from jobs import job_runner
+from models import db, Feedback
+import exports
+
+
+def legacy_csv(business_id):
+    """The original buffered export, as bytes"""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(
+        [
+            "ID",
+            "Date",
+            "Time",
+            "Overall Rating",
+            "Food",
+            "Service",
+            "Staff",
+            "Cleanliness",
+            "Value",
+            "NPS Score",
+            "Comment",
+            "Reviewed",
+        ]
+    )
+    for f in (
+        Feedback.query.filter_by(business_id=business_id)
+        .order_by(Feedback.timestamp.desc())
+        .all()
+    ):
+        writer.writerow(
+            [
+                f.id,
+                f.timestamp.strftime("%Y-%m-%d"),
+                f.timestamp.strftime("%H:%M:%S"),
+                f.overall_rating,
+                f.food_rating or "",
+                f.service_rating or "",
+                f.staff_rating or "",
+                f.cleanliness_rating or "",
+                f.value_rating or "",
+                f.nps_score if f.nps_score is not None else "",
+                f.comment or "",
+                "Yes" if f.reviewed else "No",
+            ]
+        )
+    return output.getvalue().encode("utf-8-sig")
+
+
+def test_streamed_csv_matches_legacy_export(client, business):
+    seed_feedback(business.id, 1234)
+
+    response = client.get("/dashboard/api/export?period=all")
+
+    assert response.is_streamed
+    assert response.mimetype == "text/csv"
+    assert (
+        "attachment; filename=feedback_all_" in response.headers["Content-Disposition"]
+    )
+    assert response.get_data() == legacy_csv(business.id)
+
+
+def test_csv_export_without_feedback(client, business):
+    response = client.get("/dashboard/api/export?period=today")
+
+    assert response.get_data() == legacy_csv(business.id)
+
+
+def test_csv_header_is_sent_before_rows_are_read():
+    def rows():
+        raise AssertionError("rows read before the header was sent")
+        yield
+
+    chunks = exports.csv_chunks(rows())
+    first = next(chunks).decode("utf-8")
+    assert first == "\ufeff" + ",".join(exports.CSV_HEADER) + "\r\n"
+
+
+def test_ndjson_export_streams_one_object_per_line(client, business):
+    seed_feedback(business.id, 700)
+
+    response = client.get("/dashboard/api/export?format=ndjson&period=month")
+
+    lines = response.get_data(as_text=True).splitlines()
+    expected = (
+        Feedback.query.filter(
+            Feedback.business_id == business.id,
+            Feedback.timestamp >= exports.period_start("month"),
+        )
+        .order_by(Feedback.timestamp.desc())
+        .all()
+    )
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line) for line in lines] == [f.to_dict() for f in expected]
+
+
+def test_gzip_exports(client, business):
+    seed_feedback(business.id, 2000)
+    legacy = legacy_csv(business.id)
+
+    gz_file = client.get("/dashboard/api/export?format=csv.gz")
+    assert gz_file.mimetype == "application/gzip"
+    assert ".csv.gz" in gz_file.headers["Content-Disposition"]
+    assert gzip.decompress(gz_file.get_data()) == legacy
+    assert len(gz_file.get_data()) * 3 < len(legacy)
+
+    negotiated = client.get(
+        "/dashboard/api/export", headers={"Accept-Encoding": "gzip, deflate"}
+    )
+    assert negotiated.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(negotiated.get_data()) == legacy
+
+    assert client.get("/dashboard/api/export?format=xml").status_code == 400
+
+
+def test_background_export_job(client, business):
+    seed_feedback(business.id, 1500)
+
+    response = client.post("/dashboard/api/export/jobs", json={"format": "csv.gz"})
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+    job_runner.wait(job_id, timeout=30)
+
+    status = client.get(f"/dashboard/api/export/jobs/{job_id}").get_json()
+    assert status["status"] == "done"
+    assert status["progress"] == status["total"] == 1500
+
+    download = client.get(status["download_url"])
+    assert download.mimetype == "application/gzip"
+    assert gzip.decompress(download.get_data()) == legacy_csv(business.id)
+
+
+def test_export_jobs_are_limited_and_scoped(client, business, monkeypatch):
+    monkeypatch.setattr(job_runner, "max_per_business", 0)
+    assert client.post("/dashboard/api/export/jobs").status_code == 429
+
+    assert client.get("/dashboard/api/export/jobs/" + "0" * 32).status_code == 404
+    assert client.get("/dashboard/api/export/jobs/../../etc").status_code == 404
+
+
+def test_listings_match_orm_serialization(client, business):
+    seed_feedback(business.id, 150)
+    late = Feedback(business_id=business.id, overall_rating=2, comment="Très bien ☕")
+    db.session.add(late)
+    db.session.commit()
+    expected = [
+        f.to_dict()
+        for f in Feedback.query.filter_by(business_id=business.id)
+        .order_by(Feedback.timestamp.desc())
+        .all()
+    ]
+
+    page = client.get("/dashboard/api/feedback?per_page=100").get_json()
+    assert page["feedback"] == expected[:100]
+    assert page["total"] == len(expected)
+
+    export = client.get("/dashboard/api/export?format=json").get_json()
+    assert export["feedback"] == expected
+    assert export["total"] == len(expected)
+
+    single = client.get(f"/dashboard/api/feedback/{late.id}")
+    assert single.get_json() == late.to_dict()
+    assert "Très bien ☕".encode() in single.get_data()
+    assert client.get("/dashboard/api/feedback/0").status_code == 404
@@ -0,0 +1,138 @@
+from datetime import datetime, timedelta
+
+from models import db, Feedback, IdempotencyKey
+import idempotency
+
+
+def test_retry_with_same_key_replays_original_response(app, business):
+    client = app.test_client()
+    headers = {"Idempotency-Key": "retry-1"}
+    first = client.post("/api/feedback", json={"overall_rating": 3}, headers=headers)
+    assert first.status_code == 201
+
+    # Same session, so without the key this would hit the cooldown
+    retry = client.post("/api/feedback", json={"overall_rating": 3}, headers=headers)
+    assert retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    assert Feedback.query.filter_by(business_id=business.id).count() == 1
+
+    other = app.test_client().post(
+        "/api/feedback",
+        json={"overall_rating": 1},
+        headers={"Idempotency-Key": "x", "X-Device-Token": "another-device"},
+    )
+    assert other.status_code == 201
+    assert Feedback.query.filter_by(business_id=business.id).count() == 2
+
+
+def test_invalid_key_is_rejected(app, business):
+    response = app.test_client().post(
+        "/api/feedback",
+        json={"overall_rating": 3},
+        headers={"Idempotency-Key": "not a valid key!"},
+    )
+    assert response.status_code == 400
+
+
+def test_expired_keys_are_reusable_and_purged(app, business):
+    client = app.test_client()
+    client.post(
+        "/api/feedback", json={"overall_rating": 2}, headers={"Idempotency-Key": "k"}
+    )
+    record = IdempotencyKey.query.filter_by(business_id=business.id, key="k").one()
+    record.created_at = datetime.utcnow() - timedelta(
+        hours=app.config["IDEMPOTENCY_KEY_TTL_HOURS"] + 1
+    )
+    db.session.commit()
+
+    again = app.test_client().post(
+        "/api/feedback",
+        json={"overall_rating": 2},
+        headers={"Idempotency-Key": "k", "X-Device-Token": "another-device"},
+    )
+    assert "Idempotent-Replayed" not in again.headers
+    assert Feedback.query.filter_by(business_id=business.id).count() == 2
+
+    later = datetime.utcnow() + timedelta(
+        hours=app.config["IDEMPOTENCY_KEY_TTL_HOURS"] + 1
+    )
+    assert idempotency.purge_expired(now=later) == 1
+    assert IdempotencyKey.query.count() == 0
+
+
+def test_replayed_batch_does_not_duplicate(app, business):
+    client = app.test_client()
+    batch = [
+        {"client_id": "one", "overall_rating": 3},
+        {"client_id": "two", "overall_rating": 1},
+    ]
+    first = client.post("/api/feedback/batch", json=batch).get_json()
+    assert first["created"] == 2
+
+    batch.append({"client_id": "three", "overall_rating": 2})
+    second = client.post("/api/feedback/batch", json=batch).get_json()
+    assert (second["created"], second["replayed"]) == (1, 2)
+    assert [r["feedback_id"] for r in second["results"][:2]] == [
+        r["feedback_id"] for r in first["results"]
+    ]
+    assert second["results"][0]["replayed"] is True
+    assert Feedback.query.filter_by(business_id=business.id).count() == 3
+
+
+def test_batch_replays_keys_stored_by_single_submit(app, business):
+    client = app.test_client()
+    single = client.post(
+        "/api/feedback",
+        json={"overall_rating": 3},
+        headers={"Idempotency-Key": "abc-123"},
+    )
+    assert single.status_code == 201
+
+    # The kiosk queued the same submission offline after a timeout
+    response = client.post(
+        "/api/feedback/batch",
+        json=[{"client_id": "abc-123", "overall_rating": 3}],
+    )
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["created"], body["replayed"], body["rejected"]) == (0, 1, 0)
+    assert body["results"] == [
+        {
+            "index": 0,
+            "client_id": "abc-123",
+            "status": "created",
+            "feedback_id": single.get_json()["feedback_id"],
+            "replayed": True,
+        }
+    ]
+    assert Feedback.query.filter_by(business_id=business.id).count() == 1
+
+
+def test_concurrent_retry_replays_instead_of_failing(app, business, monkeypatch):
+    # Another request stored the key between our lookup and our insert
+    idempotency.remember(
+        business.id,
+        "race-1",
+        201,
+        {"success": True, "message": "Thank you for your feedback!", "feedback_id": 7},
+        None,
+    )
+    db.session.commit()
+    lookup = idempotency.lookup
+    calls = []
+
+    def late_lookup(business_id, key, now=None):
+        calls.append(key)
+        return None if len(calls) == 1 else lookup(business_id, key, now)
+
+    monkeypatch.setattr(idempotency, "lookup", late_lookup)
+    response = app.test_client().post(
+        "/api/feedback",
+        json={"overall_rating": 3},
+        headers={"Idempotency-Key": "race-1"},
+    )
+    assert response.status_code == 201
+    assert response.headers["Idempotent-Replayed"] == "true"
+    assert response.get_json()["feedback_id"] == 7
+    assert Feedback.query.filter_by(business_id=business.id).count() == 0
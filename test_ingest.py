@@ -0,0 +1,150 @@
+import json
+from datetime import datetime, timedelta
+
+from models import db, Feedback
+import rollup
+import ingest
+from ingest import ingest_queue
+
+
+def test_queued_submissions_are_written_in_batches(app, business, tmp_path):
+    ingest_queue.spill_path = str(tmp_path / "spill.ndjson")
+    ingest_queue.start()
+    try:
+        for i, rating in enumerate((1, 2, 3, 3)):
+            response = app.test_client().post(
+                "/api/feedback",
+                json={"overall_rating": rating, "nps_score": 9, "comment": "ok"},
+                headers={"X-Device-Token": f"kiosk-device-{i}"},
+            )
+            assert response.status_code == 202
+            assert len(response.get_json()["provisional_id"]) == 32
+    finally:
+        ingest_queue.stop()
+
+    rows = Feedback.query.filter_by(business_id=business.id).all()
+    assert sorted(f.overall_rating for f in rows) == [1, 2, 3, 3]
+
+    totals = rollup.window_totals(business.id, rows[0].timestamp.replace(hour=0))
+    assert totals["count"] == 4
+    assert totals["happy"] == 2
+    assert totals["nps_9"] == 4
+
+
+def test_spilled_submissions_are_replayed(app, business, tmp_path):
+    spill = tmp_path / "spill.ndjson"
+    spill.write_text(
+        json.dumps(
+            {
+                "business_id": business.id,
+                "overall_rating": 2,
+                "comment": None,
+                "reviewed": False,
+                "timestamp": "2024-05-01T12:00:00",
+            }
+        )
+        + "\n"
+    )
+    ingest_queue.spill_path = str(spill)
+
+    assert ingest_queue.replay_spill() == 1
+    assert not spill.exists()
+    assert Feedback.query.filter_by(business_id=business.id).count() == 1
+
+
+def test_spill_claimed_by_another_worker(app, tmp_path, monkeypatch):
+    spill = tmp_path / "spill.ndjson"
+    spill.write_text("{}\n")
+    ingest_queue.spill_path = str(spill)
+
+    def claimed(src, dst):
+        raise FileNotFoundError(src)
+
+    monkeypatch.setattr(ingest.os, "replace", claimed)
+    assert ingest_queue.replay_spill() == 0
+
+
+def test_batch_endpoint_inserts_valid_submissions(app, business):
+    client = app.test_client()
+    now = datetime.utcnow()
+    response = client.post(
+        "/api/feedback/batch",
+        json={
+            "submissions": [
+                {
+                    "client_id": "a",
+                    "overall_rating": 3,
+                    "food_rating": 5,
+                    "timestamp": (now - timedelta(hours=2)).isoformat() + "Z",
+                },
+                {"client_id": "b", "overall_rating": 7},
+                {
+                    "client_id": "c",
+                    "overall_rating": 1,
+                    "timestamp": (now - timedelta(days=400)).isoformat(),
+                },
+                {"client_id": "d", "overall_rating": 2, "nps_score": 10},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert (payload["created"], payload["rejected"]) == (2, 2)
+    assert [r["status"] for r in payload["results"]] == [
+        "created",
+        "rejected",
+        "rejected",
+        "created",
+    ]
+    assert payload["results"][1]["error"] == "Invalid overall rating"
+
+    stored = db.session.get(Feedback, payload["results"][0]["feedback_id"])
+    assert stored.food_rating == 5
+    assert abs(stored.timestamp - (now - timedelta(hours=2))) < timedelta(seconds=1)
+    assert (
+        db.session.get(Feedback, payload["results"][3]["feedback_id"]).nps_score == 10
+    )
+
+    # Batches are not subject to the per-session cooldown
+    again = client.post("/api/feedback/batch", json=[{"overall_rating": 2}])
+    assert again.get_json()["created"] == 1
+
+
+def test_batch_endpoint_limits(app, business):
+    client = app.test_client()
+    assert (
+        client.post("/api/feedback/batch", json={"submissions": []}).status_code == 400
+    )
+    too_many = [{"overall_rating": 3}] * (app.config["FEEDBACK_BATCH_MAX"] + 1)
+    assert client.post("/api/feedback/batch", json=too_many).status_code == 413
+
+
+def test_batches_spend_the_per_ip_limit(app, business, monkeypatch):
+    monkeypatch.setitem(app.config, "FEEDBACK_COOLDOWN_MINUTES", 5)
+    monkeypatch.setitem(app.config, "FEEDBACK_IP_LIMIT", 5)
+    client = app.test_client()
+    batch = [{"client_id": f"item-{i}", "overall_rating": 3} for i in range(8)]
+
+    response = client.post("/api/feedback/batch", json=batch)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body["created"], body["limited"], body["rejected"]) == (5, 3, 0)
+    limited = [r for r in body["results"] if r["status"] == "limited"]
+    assert [r["index"] for r in limited] == [5, 6, 7]
+    assert all(r["retry_after"] > 0 for r in limited)
+    assert int(response.headers["Retry-After"]) > 0
+
+    # Resending the queue replays the stored items and is refused the rest
+    response = client.post("/api/feedback/batch", json=batch)
+    assert response.status_code == 429
+    body = response.get_json()
+    assert (body["created"], body["replayed"], body["limited"]) == (0, 5, 3)
+    assert Feedback.query.filter_by(business_id=business.id).count() == 5
+
+    # Single submissions share the bucket
+    single = client.post(
+        "/api/feedback",
+        json={"overall_rating": 3},
+        headers={"X-Device-Token": "another-device"},
+    )
+    assert single.status_code == 429
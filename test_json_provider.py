@@ -0,0 +1,45 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+import json_provider
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def encoder(request, monkeypatch):
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(json_provider, "orjson", None)
+    return request.param
+
+
+def test_encodes_like_flask(app, encoder):
+    payload = {
+        "when": datetime(2024, 3, 1, 12, 30),
+        "amount": Decimal("1.50"),
+        1: "non-string key",
+        "text": "café",
+    }
+    with app.test_request_context():
+        response = app.json.response(payload)
+    assert response.mimetype == "application/json"
+    assert response.get_data().endswith(b"\n")
+    assert app.json.loads(response.get_data()) == {
+        "when": "Fri, 01 Mar 2024 12:30:00 GMT",
+        "amount": "1.50",
+        "1": "non-string key",
+        "text": "café",
+    }
+    assert json_provider.dumps_bytes(payload) == response.get_data()[:-1]
+
+
+def test_debug_responses_stay_indented(app, encoder):
+    app.debug = True
+    try:
+        with app.test_request_context():
+            body = app.json.response({"a": [1, 2]}).get_data(as_text=True)
+    finally:
+        app.debug = False
+    assert body == '{\n  "a": [\n    1,\n    2\n  ]\n}\n'
@@ -0,0 +1,61 @@
+import pytest
+
+from conftest import seed_feedback
+from pagination import SORT_KEYS
+
+
+def _walk(client, **params):
+    """Follow next_cursor through every page and return the ids in order"""
+    ids, cursor = [], ""
+    while cursor is not None:
+        data = client.get(
+            "/dashboard/api/feedback", query_string=dict(params, cursor=cursor)
+        ).get_json()
+        ids += [f["id"] for f in data["feedback"]]
+        cursor = data["next_cursor"]
+    return ids
+
+
+@pytest.mark.parametrize("sort", sorted(SORT_KEYS))
+def test_cursor_pages_match_offset_pages(client, business, sort):
+    seed_feedback(business.id, 230)
+
+    offset_ids = []
+    for page in range(1, 4):
+        data = client.get(
+            "/dashboard/api/feedback",
+            query_string={"sort": sort, "page": page, "per_page": 100},
+        ).get_json()
+        offset_ids += [f["id"] for f in data["feedback"]]
+
+    assert _walk(client, sort=sort, per_page=40) == offset_ids
+    assert len(offset_ids) == 230
+
+
+def test_cursor_with_filter_and_counts(client, business):
+    rows = seed_feedback(business.id, 120)
+    happy = sum(1 for r in rows if r["overall_rating"] == 3)
+
+    assert len(_walk(client, filter=3, per_page=25)) == happy
+    for count in ("exact", "estimate"):
+        data = client.get(
+            "/dashboard/api/feedback",
+            query_string={"cursor": "", "filter": 3, "count": count},
+        ).get_json()
+        assert data["total"] == happy
+    assert client.get("/dashboard/api/feedback?cursor=").get_json()["total"] is None
+
+
+def test_per_page_is_capped_and_bad_cursor_rejected(client, business):
+    seed_feedback(business.id, 150)
+
+    data = client.get("/dashboard/api/feedback?per_page=100000").get_json()
+    assert data["per_page"] == 100
+    assert len(data["feedback"]) == 100
+
+    assert client.get("/dashboard/api/feedback?cursor=garbage").status_code == 400
+    cursor = client.get("/dashboard/api/feedback?cursor=&sort=oldest").get_json()[
+        "next_cursor"
+    ]
+    response = client.get(f"/dashboard/api/feedback?cursor={cursor}&sort=newest")
+    assert response.status_code == 400
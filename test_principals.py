@@ -0,0 +1,66 @@
+from flask import g
+from sqlalchemy import event
+
+from models import db
+from principals import principal_cache
+
+
+def fresh_request(client, *args, **kwargs):
+    # The test app context outlives requests; forget the user it cached
+    g.pop("_login_user", None)
+    return client.open(*args, **kwargs)
+
+
+def test_load_user_checks_version(app, business):
+    principal = principal_cache.load_user(f"{business.id}:{business.auth_version}")
+    assert principal.email == business.email
+    assert not hasattr(principal, "password_hash")
+    # Sessions created before versioning
+    assert principal_cache.load_user(str(business.id)).id == business.id
+    assert principal_cache.load_user(f"{business.id}:99") is None
+    assert principal_cache.load_user("nonsense") is None
+
+
+def test_dashboard_requests_skip_business_queries_when_warm(client, business):
+    fresh_request(client, "/dashboard/api/stats")
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM business" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        for url in ("/dashboard/api/stats", "/dashboard/api/summary"):
+            assert fresh_request(client, url).status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert statements == []
+
+
+def test_password_change_revokes_other_sessions(app, client, business):
+    other = app.test_client()
+    fresh_request(
+        other,
+        "/login",
+        method="POST",
+        data={"email": business.email, "password": "admin123"},
+    )
+    assert fresh_request(other, "/dashboard/api/stats").status_code == 200
+
+    form = {
+        "current_password": "admin123",
+        "new_password": "changed-password",
+        "confirm_password": "changed-password",
+    }
+    try:
+        fresh_request(client, "/dashboard/change-password", method="POST", data=form)
+        # The session that changed the password stays logged in
+        assert fresh_request(client, "/dashboard/api/stats").status_code == 200
+        assert fresh_request(other, "/dashboard/api/stats").status_code == 302
+    finally:
+        business = db.session.get(type(business), business.id)
+        business.set_password("admin123")
+        db.session.commit()
+        principal_cache.invalidate(business.id)
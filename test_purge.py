@@ -0,0 +1,183 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from conftest import seed_feedback
+from jobs import job_runner
+from models import db, Business, Feedback
+from test_bulk import assert_rollup_consistent
+import bulk
+import purge
+
+
+@pytest.fixture
+def small_chunks(app, monkeypatch):
+    monkeypatch.setitem(app.config, "PURGE_CHUNK_SIZE", 100)
+    monkeypatch.setitem(app.config, "PURGE_CHUNK_PAUSE", 0)
+
+
+@pytest.fixture
+def feedback_deletes():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("DELETE FROM feedback "):
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", record)
+
+
+def test_delete_all_runs_as_a_chunked_job(
+    client, business, small_chunks, feedback_deletes
+):
+    seed_feedback(business.id, 350)
+
+    g.pop("_login_user", None)
+    response = client.delete("/dashboard/api/feedback/delete-all")
+    assert response.status_code == 202
+    job = response.get_json()
+    job_runner.wait(job["job_id"], timeout=30)
+
+    g.pop("_login_user", None)
+    status = client.get(job["status_url"]).get_json()
+    assert status["status"] == "done"
+    assert status["success"] is True
+    assert (status["progress"], status["total"]) == (350, 350)
+    assert len(feedback_deletes) == 4
+    assert Feedback.query.count() == 0
+    assert_rollup_consistent(business.id)
+
+
+def test_failed_delete_all_reports_what_was_deleted(
+    client, business, small_chunks, monkeypatch
+):
+    seed_feedback(business.id, 250)
+    delete_rows = bulk.delete_rows
+    calls = []
+
+    def flaky(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OSError("disk I/O error")
+        return delete_rows(*args, **kwargs)
+
+    monkeypatch.setattr(bulk, "delete_rows", flaky)
+    g.pop("_login_user", None)
+    job = client.delete("/dashboard/api/feedback/delete-all").get_json()
+    job_runner.wait(job["job_id"], timeout=30)
+
+    g.pop("_login_user", None)
+    status = client.get(job["status_url"]).get_json()
+    assert status["status"] == "failed"
+    assert status["success"] is False
+    assert status["deleted"] == 100
+    assert status["error"].startswith("Deleted 100 of 250 feedback items")
+    assert Feedback.query.count() == 150
+    assert_rollup_consistent(business.id)
+
+
+def test_delete_all_errors_are_json(client, business, monkeypatch):
+    def broken(*args, **kwargs):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(job_runner, "submit", broken)
+    g.pop("_login_user", None)
+    response = client.delete("/dashboard/api/feedback/delete-all")
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Error deleting feedback"}
+
+
+def test_delete_all_keeps_feedback_submitted_meanwhile(app, business, small_chunks):
+    seed_feedback(business.id, 150)
+    params = purge.delete_all_params(business.id)
+    late = Feedback(business_id=business.id, overall_rating=3)
+    db.session.add(late)
+    db.session.commit()
+
+    job = job_runner.submit("delete", business.id, params, purge.run_delete_all_job)
+    job_runner.wait(job["id"], timeout=30)
+
+    assert job_runner.store.get(job["id"])["progress"] == 150
+    assert [f.id for f in Feedback.query] == [late.id]
+
+
+def test_delete_jobs_are_scoped(client, business, app):
+    other = Business(name="Other", email="other@example.com", password_hash="x")
+    db.session.add(other)
+    db.session.commit()
+    seed_feedback(other.id, 10, seed=2)
+    job = job_runner.submit(
+        "delete",
+        other.id,
+        purge.delete_all_params(other.id),
+        purge.run_delete_all_job,
+    )
+    job_runner.wait(job["id"], timeout=30)
+
+    g.pop("_login_user", None)
+    assert (
+        client.get(f"/dashboard/api/feedback/delete-all/{job['id']}").status_code == 404
+    )
+    g.pop("_login_user", None)
+    assert client.get("/dashboard/api/feedback/delete-all/nope").status_code == 404
+
+
+def test_retention_cutoff():
+    now = datetime(2024, 3, 31, 15, 30)
+    assert purge.retention_cutoff(1, now) == datetime(2024, 2, 29, 15, 30)
+    assert purge.retention_cutoff(3, now) == datetime(2023, 12, 31, 15, 30)
+    assert purge.retention_cutoff(14, now) == datetime(2023, 1, 31, 15, 30)
+
+
+def test_retention_deletes_old_feedback(app, business, small_chunks, monkeypatch):
+    now = datetime.utcnow()
+    rows = seed_feedback(business.id, 500, now=now, days=240)
+    cutoff = purge.retention_cutoff(6, now)
+    old = sum(1 for r in rows if r["timestamp"] < cutoff)
+
+    assert purge.purge_old_feedback(now) == {}
+
+    monkeypatch.setitem(app.config, "RETENTION_MONTHS", 6)
+    assert purge.purge_old_feedback(now) == {business.id: old}
+    assert Feedback.query.count() == 500 - old
+    assert Feedback.query.filter(Feedback.timestamp < cutoff).count() == 0
+    assert_rollup_consistent(business.id)
+
+    # Nothing left to purge
+    assert purge.purge_old_feedback(now) == {}
+
+    monkeypatch.setitem(app.config, "RETENTION_MODE", "archived")
+    with pytest.raises(ValueError):
+        purge.purge_old_feedback(now)
+
+
+def test_retention_archives_before_deleting(
+    app, business, small_chunks, monkeypatch, tmp_path
+):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 300, now=now, days=120)
+    cutoff = now - timedelta(days=60)
+    expected = {
+        f.id: f.to_dict() for f in Feedback.query.filter(Feedback.timestamp < cutoff)
+    }
+    monkeypatch.setitem(app.config, "RETENTION_MONTHS", 2)
+    monkeypatch.setitem(app.config, "RETENTION_MODE", "archive")
+    monkeypatch.setitem(app.config, "RETENTION_ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(purge, "retention_cutoff", lambda months, now: cutoff)
+
+    assert purge.purge_old_feedback(now) == {business.id: len(expected)}
+
+    (path,) = tmp_path.iterdir()
+    assert path.name == f"feedback-{business.id}-before-{cutoff:%Y-%m-%d}.ndjson.gz"
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        archived = [json.loads(line) for line in f]
+    assert {row["id"]: row for row in archived} == expected
+    assert len(archived) == len(expected)
+    assert Feedback.query.count() == 300 - len(expected)
+    assert_rollup_consistent(business.id)
@@ -0,0 +1,82 @@
+"""
+Fail when a dashboard query stops using an index on the feedback tables
+
+Every statement an endpoint runs is captured and re-run under EXPLAIN
+(EXPLAIN QUERY PLAN on SQLite). On PostgreSQL sequential scans are disabled
+first so the planner's preference for seq scans on tiny tables is ignored.
+"""
+
+import re
+
+import pytest
+from sqlalchemy import event
+
+from conftest import seed_feedback
+from models import db
+
+INDEXED_TABLES = ("feedback", "feedback_daily_rollup")
+
+DASHBOARD_URLS = [
+    "/dashboard/api/stats",
+    "/dashboard/api/summary",
+    "/dashboard/api/analytics?period=7",
+    "/dashboard/api/analytics?period=all",
+    "/dashboard/api/feedback",
+    "/dashboard/api/feedback?page=3&sort=oldest",
+    "/dashboard/api/feedback?filter=3&sort=rating_high",
+    "/dashboard/api/feedback?reviewed=0",
+    "/dashboard/api/feedback?cursor=&count=estimate",
+    "/dashboard/api/feedback?cursor=&sort=rating_low&count=exact",
+    "/dashboard/api/feedback?q=coffee",
+    "/dashboard/api/feedback?q=great+coffee&filter=3&sort=newest",
+    "/api/feedback/stats",
+]
+
+
+def capture_statements(client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return statements
+
+
+def full_scans(statement, parameters):
+    """Tables from INDEXED_TABLES that the plan reads with a full scan"""
+    conn = db.session.connection()
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = conn.exec_driver_sql("EXPLAIN " + statement, parameters).scalars()
+        pattern = r"Seq Scan on (\w+)"
+    else:
+        plan = [
+            row[-1]
+            for row in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )
+        ]
+        pattern = r"^SCAN (\w+)"
+    return {
+        match.group(1)
+        for line in plan
+        for match in [re.search(pattern, line.strip())]
+        if match and match.group(1) in INDEXED_TABLES
+    }
+
+
+@pytest.mark.parametrize("url", DASHBOARD_URLS)
+def test_dashboard_queries_use_indexes(client, business, url):
+    seed_feedback(business.id, 300)
+
+    statements = capture_statements(client, url)
+
+    assert statements
+    for statement, parameters in statements:
+        assert not full_scans(statement, parameters), statement
@@ -0,0 +1,154 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+import pytest
+
+from ratelimit import MemoryLimiterStore, RateLimiter, SQLiteLimiterStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLimiterStore()
+    return SQLiteLimiterStore(str(tmp_path / "limits.db"))
+
+
+def test_token_bucket_refills_over_window(store):
+    assert store.consume("k", 2, 60, 1, now=0) == (True, 0)
+    assert store.consume("k", 2, 60, 1, now=1)[0]
+    allowed, retry_after = store.consume("k", 2, 60, 1, now=2)
+    assert not allowed
+    assert retry_after == pytest.approx(28)
+    assert store.consume("k", 2, 60, 1, now=31)[0]
+    # Other keys are independent
+    assert store.consume("other", 2, 60, 1, now=31)[0]
+
+
+def test_peek_does_not_spend(store):
+    store.consume("k", 1, 60, 1, now=0)
+    assert store.consume("k", 1, 60, 1, now=30, spend=False) == (False, 30)
+    assert store.consume("k", 1, 60, 1, now=60, spend=False) == (True, 0)
+    assert store.consume("k", 1, 60, 1, now=60)[0]
+
+
+def test_memory_store_drops_full_buckets():
+    store = MemoryLimiterStore()
+    store.consume("a", 1, 60, 1, now=0)
+    store.consume("b", 1, 60, 1, now=30)
+    store.consume("c", 1, 60, 1, now=61)
+    assert list(store._buckets) == ["b", "c"]
+
+
+def test_sqlite_store_surfaces_lock_errors(tmp_path, monkeypatch):
+    path = str(tmp_path / "limits.db")
+    store = SQLiteLimiterStore(path)
+    monkeypatch.setattr(
+        store,
+        "_connect",
+        lambda: sqlite3.connect(path, timeout=0, isolation_level=None),
+    )
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        with pytest.raises(sqlite3.OperationalError, match="database is locked"):
+            store.consume("a", 1, 60, 1, now=0)
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+    assert store.consume("a", 1, 60, 1, now=0) == (True, 0)
+
+
+def concurrently(fn, times):
+    barrier = Barrier(times)
+
+    def run(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(times) as pool:
+        return list(pool.map(run, range(times)))
+
+
+def test_acquire_is_atomic_across_threads(store):
+    limiter = RateLimiter()
+    limiter.store = store
+    limits = [("device", 1, 300), ("ip", 3, 300)]
+
+    results = concurrently(lambda: limiter.acquire(limits), 16)
+    assert results.count(0) == 1
+
+    # The refused attempts were refunded from the IP bucket
+    limiter.refund(limits[:1])
+    assert limiter.acquire([("other-device", 1, 300), limits[1]]) == 0
+    assert limiter.acquire(limits) == 0
+    assert limiter.acquire(limits) > 0
+
+
+def test_take_up_to_spends_what_is_left(store):
+    limiter = RateLimiter()
+    limiter.store = store
+    assert limiter.take_up_to("ip", 5, 300, 3) == (3, 0)
+    taken, retry_after = limiter.take_up_to("ip", 5, 300, 3)
+    assert taken == 2 and 0 < retry_after <= 60
+    assert limiter.take_up_to("ip", 5, 300, 1)[0] == 0
+
+
+def test_feedback_cooldown_is_enforced_without_cookies(app, business):
+    app.config["FEEDBACK_COOLDOWN_MINUTES"] = 5
+    first = app.test_client().post("/api/feedback", json={"overall_rating": 3})
+    assert first.status_code == 201
+
+    # A fresh client (no session cookie) from the same address is still limited
+    client = app.test_client()
+    second = client.post("/api/feedback", json={"overall_rating": 3})
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) > 290
+    assert "5 more minute(s)" in second.get_json()["error"]
+    assert client.get("/api/feedback/check-limit").get_json() == {
+        "can_submit": False,
+        "wait_minutes": 5,
+    }
+
+    # Other devices behind the same address have their own cooldown
+    kiosk = {"X-Device-Token": "kiosk-device-1"}
+    assert client.get("/api/feedback/check-limit", headers=kiosk).get_json()[
+        "can_submit"
+    ]
+    ok = client.post("/api/feedback", json={"overall_rating": 2}, headers=kiosk)
+    assert ok.status_code == 201
+
+
+def test_rejected_submissions_do_not_start_the_cooldown(app, business):
+    app.config["FEEDBACK_COOLDOWN_MINUTES"] = 5
+    client = app.test_client()
+    typo = client.post("/api/feedback", json={"overall_rating": 7})
+    assert typo.status_code == 400
+
+    fixed = client.post("/api/feedback", json={"overall_rating": 3})
+    assert fixed.status_code == 201
+    again = client.post("/api/feedback", json={"overall_rating": 3})
+    assert again.status_code == 429
+
+
+def test_login_is_rate_limited(app, business):
+    client = app.test_client()
+    form = {"email": business.email, "password": "wrong"}
+    for _ in range(app.config["LOGIN_ATTEMPTS"]):
+        assert client.post("/login", data=form).status_code == 200
+    assert client.post("/login", data=form).status_code == 429
+
+    # Even the right password is refused until the bucket refills
+    form["password"] = "admin123"
+    assert client.post("/login", data=form).status_code == 429
+
+
+def test_parallel_login_guesses_share_the_limit(app, business):
+    form = {"email": business.email, "password": "wrong"}
+
+    def guess():
+        return app.test_client().post("/login", data=form).status_code
+
+    statuses = concurrently(guess, app.config["LOGIN_ATTEMPTS"] * 2)
+    assert statuses.count(200) == app.config["LOGIN_ATTEMPTS"]
+    assert statuses.count(429) == app.config["LOGIN_ATTEMPTS"]
@@ -0,0 +1,38 @@
+from flask import g
+
+from conftest import seed_feedback
+from models import Feedback
+from test_bulk import assert_rollup_consistent, rollup_rows
+
+
+def test_single_writes_keep_the_rollup_exact(app, client, business):
+    seed_feedback(business.id, 200)
+
+    customer = app.test_client()
+    for i, body in enumerate(
+        [
+            {"overall_rating": 3, "food_rating": 5, "nps_score": 10},
+            {"overall_rating": 1, "service_rating": 2, "comment": "Cold"},
+            {"overall_rating": 2},
+        ]
+    ):
+        response = customer.post(
+            "/api/feedback", json=body, headers={"X-Device-Token": f"device-{i}"}
+        )
+        assert response.status_code == 201
+    assert_rollup_consistent(business.id)
+
+    rows = Feedback.query.filter_by(business_id=business.id).limit(6).all()
+    for feedback in rows[:3]:
+        g.pop("_login_user", None)
+        response = client.post(f"/dashboard/api/feedback/{feedback.id}/review")
+        assert response.status_code == 200
+    assert_rollup_consistent(business.id)
+
+    for feedback in rows[3:]:
+        g.pop("_login_user", None)
+        response = client.delete(f"/dashboard/api/feedback/{feedback.id}")
+        assert response.status_code == 200
+    assert_rollup_consistent(business.id)
+
+    assert sum(day["count"] for day in rollup_rows(business.id).values()) == 200
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g
+from sqlalchemy import event
+
+from models import db, Business, Feedback
+import rollup
+
+NOW = datetime.utcnow()
+
+COMMENTS = [
+    # (comment, overall rating, hours ago)
+    ("The waiter was friendly and the coffee was great", 3, 1),
+    ("Coffee was cold, waiters ignored us", 1, 2),
+    ("Great coffee. Great cake. Great coffee again!", 3, 3),
+    ("Lovely terrace", 2, 4),
+    ("Crème brûlée was perfect", 3, 5),
+    (None, 2, 6),
+]
+
+
+@pytest.fixture
+def comments(business):
+    rows = []
+    for comment, rating, hours in COMMENTS:
+        row = Feedback(
+            business_id=business.id,
+            comment=comment,
+            overall_rating=rating,
+            timestamp=NOW - timedelta(hours=hours),
+        )
+        db.session.add(row)
+        rollup.record_feedback(row)
+        rows.append(row)
+    db.session.commit()
+    return rows
+
+
+def found(client, **params):
+    g.pop("_login_user", None)
+    response = client.get("/dashboard/api/feedback", query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return [f["comment"] for f in response.get_json()["feedback"]]
+
+
+def test_search_is_ranked_and_stemmed(client, comments):
+    # Repeated terms in a short comment rank first; "waiters" matches "waiter"
+    assert found(client, q="coffee") == [
+        COMMENTS[2][0],
+        COMMENTS[1][0],
+        COMMENTS[0][0],
+    ]
+    assert set(found(client, q="waiter")) == {COMMENTS[0][0], COMMENTS[1][0]}
+    assert found(client, q="coffee COLD") == [COMMENTS[1][0]]
+    # The last word is a prefix while typing; accents are ignored
+    assert found(client, q="terr") == [COMMENTS[3][0]]
+    assert found(client, q="creme brulee") == [COMMENTS[4][0]]
+    assert found(client, q="tea") == []
+
+
+def test_search_combines_with_filters_and_sorting(client, comments):
+    assert found(client, q="coffee", filter=3, sort="oldest") == [
+        COMMENTS[2][0],
+        COMMENTS[0][0],
+    ]
+    assert found(client, q="coffee", sort="newest", per_page=1, page=2) == [
+        COMMENTS[1][0]
+    ]
+
+    g.pop("_login_user", None)
+    page = client.get(
+        "/dashboard/api/feedback",
+        query_string={
+            "q": "coffee",
+            "sort": "newest",
+            "cursor": "",
+            "per_page": 2,
+            "count": "estimate",
+        },
+    ).get_json()
+    assert page["total"] == 3
+    assert [f["comment"] for f in page["feedback"]] == [
+        COMMENTS[0][0],
+        COMMENTS[1][0],
+    ]
+
+    g.pop("_login_user", None)
+    response = client.get(
+        "/dashboard/api/feedback", query_string={"q": "coffee", "cursor": ""}
+    )
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Cursor pagination cannot sort by relevance"
+
+
+def test_search_syntax_is_not_interpreted(client, comments):
+    for q in ('"coffee', "(coffee)", "coffee + cake", "cake*", "-cold", "^great"):
+        assert found(client, q=q), q
+    # No words at all: plain listing
+    assert len(found(client, q="!!")) == len(COMMENTS)
+
+
+def test_index_follows_writes(client, business, comments):
+    other = Business(name="Other", email="other@example.com", password_hash="x")
+    db.session.add(other)
+    db.session.flush()
+    db.session.add(
+        Feedback(business_id=other.id, comment="coffee everywhere", overall_rating=3)
+    )
+    db.session.commit()
+    assert len(found(client, q="coffee")) == 3
+
+    g.pop("_login_user", None)
+    client.post("/api/feedback", json={"overall_rating": 3, "comment": "Cake!"})
+    assert len(found(client, q="cake")) == 2
+
+    comments[2].comment = "Fine"
+    db.session.commit()
+    assert found(client, q="cake") == ["Cake!"]
+
+    g.pop("_login_user", None)
+    assert client.delete(f"/dashboard/api/feedback/{comments[0].id}").status_code == 200
+    assert found(client, q="coffee") == [COMMENTS[1][0]]
+
+    check = "INSERT INTO feedback_fts (feedback_fts) VALUES ('integrity-check')"
+    db.session.execute(db.text(check))
+
+
+def test_matches_drive_the_join(client, comments):
+    if db.session.connection().dialect.name != "sqlite":
+        pytest.skip("FTS5 plans")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "feedback_fts" in statement:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        found(client, q="coffee")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+
+    # Page and count query; neither may look matches up by rowid ("=" in
+    # the FTS5 index string), which runs the MATCH once per feedback row
+    assert len(statements) == 2
+    conn = db.session.connection()
+    for statement, parameters in statements:
+        plan = [
+            row[-1]
+            for row in conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN " + statement, parameters
+            )
+        ]
+        assert plan[0].startswith("SCAN feedback_fts VIRTUAL TABLE INDEX 0:M"), plan
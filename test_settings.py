@@ -0,0 +1,72 @@
+from business_settings import BusinessSettings, parse_settings
+from models import db
+
+
+def test_parse_fills_defaults_and_ignores_bad_values():
+    settings = parse_settings(
+        '{"welcome_message": "Hi!", "categories": ["bogus"], "extra": 1}'
+    )
+    assert settings.welcome_message == "Hi!"
+    assert settings.categories == BusinessSettings().categories
+    assert parse_settings("not json") == BusinessSettings()
+    assert parse_settings(None) == BusinessSettings()
+
+
+def test_parse_is_memoized_per_version():
+    parse_settings.cache_clear()
+    parse_settings('{"feedback_cooldown_minutes": 2}')
+    parse_settings('{"feedback_cooldown_minutes": 2}')
+    info = parse_settings.cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+
+
+def test_patches_merge_into_stored_settings(client, business):
+    response = client.patch("/dashboard/api/settings", json={"welcome_message": "Hey"})
+    assert response.status_code == 200
+    response = client.patch(
+        "/dashboard/api/settings", json={"categories": ["food", "value", "food"]}
+    )
+    assert response.get_json()["welcome_message"] == "Hey"
+    assert response.get_json()["categories"] == ["food", "value"]
+
+    response = client.patch("/dashboard/api/settings", json={"welcome_message": None})
+    assert response.get_json()["welcome_message"] == BusinessSettings.welcome_message
+    db.session.expire_all()
+    assert '"welcome_message"' not in business.settings_json
+    assert client.get("/dashboard/api/settings").get_json()["categories"] == [
+        "food",
+        "value",
+    ]
+
+
+def test_invalid_patches_are_rejected(client, business):
+    for patch in (
+        {"nope": 1},
+        {"categories": []},
+        {"feedback_cooldown_minutes": "5"},
+        {"welcome_message": "x" * 201},
+        [],
+    ):
+        response = client.patch("/dashboard/api/settings", json=patch)
+        assert response.status_code == 400, patch
+
+
+def test_customer_page_uses_settings(app, client, business):
+    client.patch(
+        "/dashboard/api/settings",
+        json={
+            "welcome_message": "Tell us everything",
+            "categories": ["service"],
+            "feedback_cooldown_minutes": 0,
+        },
+    )
+    customer = app.test_client()
+    page = customer.get("/").get_data(as_text=True)
+    assert "Tell us everything" in page
+    assert 'data-category="service"' in page
+    assert 'data-category="food"' not in page
+
+    # A cooldown of 0 turns the limit off for this business
+    for _ in range(3):
+        response = customer.post("/api/feedback", json={"overall_rating": 3})
+        assert response.status_code == 201
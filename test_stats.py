@@ -0,0 +1,334 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from conftest import seed_feedback
+from models import db, Feedback
+import rollup
+import stats
+
+
+def legacy_dashboard_stats(business_id, now):
+    """The original ORM/Python implementation of /dashboard/api/stats"""
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+
+    query = Feedback.query.filter(Feedback.business_id == business_id)
+    today_feedback = query.filter(Feedback.timestamp >= today_start).all()
+    week_feedback = query.filter(Feedback.timestamp >= week_ago).all()
+    month_feedback = query.filter(Feedback.timestamp >= month_ago).all()
+
+    def calc_avg(feedback_list, field):
+        values = [
+            getattr(f, field) for f in feedback_list if getattr(f, field) is not None
+        ]
+        return round(sum(values) / len(values), 2) if values else 0
+
+    daily_data = defaultdict(lambda: {"count": 0, "avg_rating": []})
+    for f in week_feedback:
+        day_key = f.timestamp.strftime("%Y-%m-%d")
+        daily_data[day_key]["count"] += 1
+        if f.overall_rating:
+            daily_data[day_key]["avg_rating"].append(f.overall_rating)
+
+    daily_chart = []
+    for i in range(7):
+        day = today_start - timedelta(days=6 - i)
+        data = daily_data[day.strftime("%Y-%m-%d")]
+        avg = (
+            round(sum(data["avg_rating"]) / len(data["avg_rating"]), 2)
+            if data["avg_rating"]
+            else 0
+        )
+        daily_chart.append(
+            {
+                "date": day.strftime("%a %m/%d"),
+                "count": data["count"],
+                "avg_rating": avg,
+            }
+        )
+
+    nps_scores = [f.nps_score for f in month_feedback if f.nps_score is not None]
+    if nps_scores:
+        promoters = len([s for s in nps_scores if s >= 9])
+        detractors = len([s for s in nps_scores if s <= 6])
+        nps = round(((promoters - detractors) / len(nps_scores)) * 100, 1)
+    else:
+        nps = 0
+
+    return {
+        "today": {
+            "count": len(today_feedback),
+            "avg_rating": calc_avg(today_feedback, "overall_rating"),
+        },
+        "week": {
+            "count": len(week_feedback),
+            "avg_rating": calc_avg(week_feedback, "overall_rating"),
+        },
+        "month": {
+            "count": len(month_feedback),
+            "avg_rating": calc_avg(month_feedback, "overall_rating"),
+        },
+        "daily_chart": daily_chart,
+        "categories": {
+            "food": calc_avg(month_feedback, "food_rating"),
+            "service": calc_avg(month_feedback, "service_rating"),
+            "staff": calc_avg(month_feedback, "staff_rating"),
+            "cleanliness": calc_avg(month_feedback, "cleanliness_rating"),
+            "value": calc_avg(month_feedback, "value_rating"),
+        },
+        "nps": nps,
+        "total_responses": query.count(),
+    }
+
+
+def test_dashboard_stats_matches_legacy(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 2000, now=now)
+
+    assert stats.dashboard_stats(business.id, now) == legacy_dashboard_stats(
+        business.id, now
+    )
+
+
+def test_dashboard_stats_totals_come_from_the_rollup(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 200, now=now)
+    max_id = db.session.query(db.func.max(Feedback.id)).scalar()
+    late = Feedback(business_id=business.id, timestamp=now, overall_rating=1)
+    db.session.add(late)
+    db.session.flush()
+    rollup.record_feedback(late)
+    db.session.commit()
+
+    # Rows older than the 30-day windows are only counted through the rollup
+    db.session.execute(
+        db.delete(Feedback).where(Feedback.timestamp < now - timedelta(days=31))
+    )
+    db.session.commit()
+
+    capped = stats.dashboard_stats(business.id, now, max_id=max_id)
+    assert capped["total_responses"] == 200
+    full = stats.dashboard_stats(business.id, now)
+    assert full["total_responses"] == 201
+    assert (
+        stats.overview(business.id, now, max_id=max_id)["stats"]["total_responses"]
+        == 200
+    )
+
+
+def test_dashboard_stats_without_feedback(business):
+    now = datetime.utcnow()
+
+    assert stats.dashboard_stats(business.id, now) == legacy_dashboard_stats(
+        business.id, now
+    )
+
+
+def test_dashboard_stats_endpoint(client, business):
+    seed_feedback(business.id, 50)
+
+    response = client.get("/dashboard/api/stats")
+
+    assert response.status_code == 200
+    assert set(response.get_json()) == {
+        "today",
+        "week",
+        "month",
+        "daily_chart",
+        "categories",
+        "nps",
+        "total_responses",
+    }
+
+
+def legacy_summary(business_id, now):
+    """The original five-scan implementation of /dashboard/api/summary"""
+
+    def get_period_stats(start_date):
+        ratings = [
+            f.overall_rating
+            for f in Feedback.query.filter(
+                Feedback.business_id == business_id, Feedback.timestamp >= start_date
+            )
+        ]
+        if not ratings:
+            return {"count": 0, "avg_rating": 0, "happy": 0, "neutral": 0, "sad": 0}
+        return {
+            "count": len(ratings),
+            "avg_rating": round(sum(ratings) / len(ratings), 2),
+            "happy": ratings.count(3),
+            "neutral": ratings.count(2),
+            "sad": ratings.count(1),
+        }
+
+    midnight = dict(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "today": get_period_stats(now.replace(**midnight)),
+        "yesterday": get_period_stats((now - timedelta(days=1)).replace(**midnight)),
+        "this_week": get_period_stats(now - timedelta(days=7)),
+        "this_month": get_period_stats(now - timedelta(days=30)),
+        "all_time": get_period_stats(datetime(2020, 1, 1)),
+    }
+
+
+def test_summary_matches_legacy(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 2000, now=now)
+
+    assert stats.summary(business.id, now) == legacy_summary(business.id, now)
+
+
+def legacy_analytics(business_id, period, now):
+    """The original ORM/Python implementation of /dashboard/api/analytics"""
+    if period == "all":
+        start_date = datetime(2020, 1, 1)
+    else:
+        start_date = now - timedelta(days=int(period))
+
+    feedback_list = (
+        Feedback.query.filter(
+            Feedback.business_id == business_id,
+            Feedback.timestamp >= start_date,
+        )
+        .order_by(Feedback.timestamp.asc())
+        .all()
+    )
+
+    sentiment = {
+        "happy": len([f for f in feedback_list if f.overall_rating == 3]),
+        "neutral": len([f for f in feedback_list if f.overall_rating == 2]),
+        "sad": len([f for f in feedback_list if f.overall_rating == 1]),
+    }
+
+    daily_data = defaultdict(lambda: {"ratings": [], "count": 0})
+    category_daily = defaultdict(lambda: defaultdict(list))
+    for f in feedback_list:
+        day_key = f.timestamp.strftime("%Y-%m-%d")
+        daily_data[day_key]["ratings"].append(f.overall_rating)
+        daily_data[day_key]["count"] += 1
+        for cat in ("food", "service", "staff", "cleanliness", "value"):
+            if getattr(f, f"{cat}_rating"):
+                category_daily[day_key][cat].append(getattr(f, f"{cat}_rating"))
+
+    def avg(lst):
+        return round(sum(lst) / len(lst), 2) if lst else 0
+
+    days_to_show = min(int(period) if period != "all" else 30, 30)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    trends = []
+    category_trends = []
+    for i in range(days_to_show):
+        day = today - timedelta(days=days_to_show - 1 - i)
+        day_key = day.strftime("%Y-%m-%d")
+        trends.append(
+            {
+                "date": day.strftime("%m/%d"),
+                "avg_rating": avg(daily_data[day_key]["ratings"]),
+            }
+        )
+        category_trends.append(
+            {
+                "date": day.strftime("%m/%d"),
+                **{
+                    cat: avg(category_daily[day_key][cat])
+                    for cat in ("food", "service", "staff", "cleanliness", "value")
+                },
+            }
+        )
+
+    nps_distribution = [0] * 11
+    day_counts = defaultdict(int)
+    hour_counts = defaultdict(int)
+    for f in feedback_list:
+        if f.nps_score is not None:
+            nps_distribution[f.nps_score] += 1
+        day_counts[f.timestamp.strftime("%A")] += 1
+        hour_counts[f.timestamp.hour] += 1
+
+    busiest_day = max(day_counts.items(), key=lambda x: x[1])[0]
+    busiest_hour = max(hour_counts.items(), key=lambda x: x[1])[0]
+    days_in_period = (now - start_date).days or 1
+    reviewed_count = len([f for f in feedback_list if f.reviewed])
+
+    recent_with_comments = [
+        f for f in reversed(feedback_list) if f.comment and f.comment.strip()
+    ][:10]
+
+    return {
+        "sentiment": sentiment,
+        "trends": trends,
+        "nps_distribution": nps_distribution,
+        "category_trends": category_trends,
+        "activity": {
+            "busiest_day": busiest_day,
+            "busiest_hour": f"{busiest_hour}:00 - {busiest_hour + 1}:00",
+            "avg_per_day": round(len(feedback_list) / days_in_period, 1),
+            "response_rate": round((reviewed_count / len(feedback_list)) * 100),
+        },
+        "recent_comments": [
+            {
+                "comment": f.comment,
+                "rating": f.overall_rating,
+                "timestamp": f.timestamp.isoformat(),
+            }
+            for f in recent_with_comments
+        ],
+    }
+
+
+def test_analytics_matches_legacy(business):
+    now = datetime.utcnow()
+    seed_feedback(business.id, 2000, now=now)
+
+    for period in ("7", "30", "all"):
+        assert stats.analytics(business.id, period, now=now) == legacy_analytics(
+            business.id, period, now
+        ), period
+
+
+def test_analytics_sections_match_full_payload(business):
+    now = datetime.utcnow()
+    rows = seed_feedback(business.id, 1500, now=now)
+
+    for period in ("7", "30", "all"):
+        full = stats.analytics(business.id, period, now=now)
+        assert set(full) == set(stats.ANALYTICS_FIELDS)
+        for field in stats.ANALYTICS_FIELDS:
+            assert stats.analytics(business.id, period, now=now, fields=[field]) == {
+                field: full[field]
+            }
+
+    full = stats.analytics(business.id, "all", now=now)
+    assert full["sentiment"] == {
+        name: sum(r["overall_rating"] == rating for r in rows)
+        for name, rating in (("happy", 3), ("neutral", 2), ("sad", 1))
+    }
+    assert full["nps_distribution"] == [
+        sum(r["nps_score"] == score for r in rows) for score in range(11)
+    ]
+
+
+def test_analytics_fields_param(client, business):
+    seed_feedback(business.id, 50)
+
+    response = client.get("/dashboard/api/analytics?period=30&fields=activity,trends")
+    assert response.status_code == 200
+    assert set(response.get_json()) == {"activity", "trends"}
+
+    assert client.get("/dashboard/api/analytics?fields=charts").status_code == 400
+
+
+def test_busiest_hour_ties_go_to_the_hour_seen_first(business):
+    now = datetime.utcnow().replace(hour=23, minute=0)
+    day = now - timedelta(days=3)
+    for timestamp in (day.replace(hour=15), (day + timedelta(days=1)).replace(hour=9)):
+        db.session.add(
+            Feedback(business_id=business.id, timestamp=timestamp, overall_rating=3)
+        )
+    db.session.commit()
+    rollup.rebuild(business.id)
+
+    for period in ("7", "all"):
+        activity = stats.analytics(business.id, period, now=now, fields=["activity"])
+        assert activity["activity"]["busiest_hour"] == "15:00 - 16:00", period
@@ -0,0 +1,87 @@
+from sqlalchemy import event
+
+from models import db, Business, Feedback
+
+
+def business_queries(client, requests):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "FROM business" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        for method, url, kwargs in requests:
+            assert getattr(client, method)(url, **kwargs).status_code < 400
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    return statements
+
+
+def test_slugs_route_to_their_business(app, business):
+    other = Business(name="Café Két", email="cafe@example.com")
+    other.set_password("password123")
+    db.session.add(other)
+    db.session.commit()
+    assert other.slug == "caf-k-t"
+
+    client = app.test_client()
+    page = client.get(f"/b/{other.slug}/")
+    assert page.status_code == 200
+    assert "Café Két" in page.get_data(as_text=True)
+    assert f'data-api-base="/b/{other.slug}"' in page.get_data(as_text=True)
+
+    response = client.post(f"/b/{other.slug}/api/feedback", json={"overall_rating": 3})
+    assert response.status_code == 201
+    assert db.session.get(Feedback, response.get_json()["feedback_id"]).business_id == (
+        other.id
+    )
+
+    # The bare URLs still serve the first business
+    assert business.name in client.get("/").get_data(as_text=True)
+    assert client.get("/b/no-such-place/").status_code == 404
+    assert (
+        client.post(
+            "/b/no-such-place/api/feedback", json={"overall_rating": 3}
+        ).status_code
+        == 404
+    )
+
+
+def test_duplicate_names_get_distinct_slugs(app, business):
+    first = Business(name="Same Name", email="one@example.com", password_hash="x")
+    second = Business(name="Same Name", email="two@example.com", password_hash="x")
+    db.session.add_all([first, second])
+    db.session.commit()
+    assert (first.slug, second.slug) == ("same-name", "same-name-2")
+
+
+def test_customer_path_skips_business_queries_when_warm(app, business):
+    client = app.test_client()
+    requests = [
+        ("get", "/", {}),
+        ("get", "/api/feedback/check-limit", {}),
+        ("post", "/api/feedback", {"json": {"overall_rating": 3}}),
+        ("get", "/api/feedback/stats", {}),
+    ]
+    business_queries(client, requests[:1])
+
+    assert business_queries(client, requests) == []
+
+
+def test_update_business_invalidates_tenant_cache(client, business):
+    original = business.name
+    assert original in client.get("/").get_data(as_text=True)
+
+    def rename(name):
+        client.post(
+            "/dashboard/update-business",
+            data={"business_name": name, "email": business.email},
+        )
+
+    rename("Renamed Bistro")
+    try:
+        assert "Renamed Bistro" in client.get("/").get_data(as_text=True)
+    finally:
+        rename(original)